@@ -0,0 +1,59 @@
+"""
+Time of validating engineered data scaled up to '--n-rows' rows by repeating the titanic data (clipped into the bounds of the schemas, so that
+all validations pass), once with the pandera schemas and once with the single-pass batch validation, on all rows and on samples.
+
+Usage: pipenv run python -m benchmarks.batch_validation --n-rows 10000000
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from ml_project.batch_validation import validate_as_batch
+from ml_project.data_validation import engineered_data_schema, raw_data_schema
+from ml_project.utils import setup_logging
+from use_cases.use_case_config import config
+
+logger = logging.getLogger('standard')
+
+sample_sizes = [None, 1000000, 100000]
+
+
+def get_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Benchmark of the batch validation against the pandera validation")
+    parser.add_argument('--n-rows', type=int, default=10000000)
+
+    return parser.parse_args()
+
+
+def get_scaled_engineered_data(n_rows: int) -> pd.DataFrame:
+
+    data = pd.read_parquet(config.data_filepath, columns=list(raw_data_schema.columns)).dropna()
+    data['siblings_spouses_aboard'] = data['siblings_spouses_aboard'].clip(0, 5)
+    data['parents_children_aboard'] = data['parents_children_aboard'].clip(0, 5)
+    data['fare'] = data['fare'].clip(7., 263.)
+    data['relatives_aboard'] = data['siblings_spouses_aboard'] + data['parents_children_aboard']
+
+    return data.iloc[np.resize(np.arange(len(data)), n_rows)].reset_index(drop=True)
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+    arguments = get_arguments()
+
+    engineered_data = get_scaled_engineered_data(arguments.n_rows)
+    logger.info(f"Scaled-up engineered data: {len(engineered_data)} rows, {engineered_data.memory_usage(deep=True).sum() / 1024 ** 2:.0f} MB")
+
+    start_time = time.perf_counter()
+    raw_data_schema(engineered_data)
+    engineered_data_schema(engineered_data)
+    logger.info(f"pandera schemas:                {time.perf_counter() - start_time:.3f}s")
+
+    for sample_size in sample_sizes:
+        start_time = time.perf_counter()
+        report = validate_as_batch(engineered_data, [raw_data_schema, engineered_data_schema], sample_size=sample_size, target_col=config.target_col, min_n_target_classes=2)
+        logger.info(f"batch validation, sample {str(sample_size):>7}: {time.perf_counter() - start_time:.3f}s, {report['passed'].sum()} of {len(report)} checks passed")
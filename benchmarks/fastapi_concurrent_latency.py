@@ -0,0 +1,123 @@
+"""
+Latency of the fastapi prediction service under concurrent clients, with the prediction pipeline running
+directly on the event loop (before) and in the bounded prediction pool (after).
+Besides the /predict latencies, the latency of /health requests sent during the load shows how long the event loop is blocked.
+
+Usage: pipenv run python -m benchmarks.fastapi_concurrent_latency
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+import requests
+import uvicorn
+
+from ml_project.historic_data_retrieval import retrieve_historic_data
+from ml_project.utils import setup_logging
+from use_cases.use_case_config import config
+
+logger = logging.getLogger('standard')
+
+
+def run_server(use_prediction_executor: bool, port: int):
+
+    from deployment import prediction_service_fastapi
+
+    logging.getLogger('standard').setLevel(logging.WARNING)
+
+    if not use_prediction_executor:
+        prediction_service_fastapi.prediction_executor = None
+
+    uvicorn.run(prediction_service_fastapi.app, port=port, log_level='warning')
+
+
+def wait_for_server(url: str, timeout: float = 30.):
+
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < timeout:
+        try:
+            requests.get(url)
+            return
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+
+    raise(Exception(f"Server at {url} did not start within {timeout} seconds"))
+
+
+def run_client(url: str, payloads: List[Dict]) -> List[float]:
+
+    latencies = []
+    with requests.Session() as session:
+        for payload in payloads:
+            start_time = time.perf_counter()
+            response = session.post(url, json=payload)
+            latencies.append(time.perf_counter() - start_time)
+            response.raise_for_status()
+
+    return latencies
+
+
+def run_health_probe(url: str, stop_event: threading.Event, interval: float = 0.01) -> List[float]:
+
+    latencies = []
+    with requests.Session() as session:
+        while not stop_event.is_set():
+            start_time = time.perf_counter()
+            session.get(url).raise_for_status()
+            latencies.append(time.perf_counter() - start_time)
+            time.sleep(interval)
+
+    return latencies
+
+
+def measure_latencies(use_prediction_executor: bool, payloads: List[Dict], n_clients: int, port: int = 8123) -> Dict[str, float]:
+
+    process = multiprocessing.Process(target=run_server, args=(use_prediction_executor, port), daemon=True)
+    process.start()
+
+    try:
+        url = f"http://127.0.0.1:{port}"
+        wait_for_server(url)
+        run_client(f"{url}/predict", payloads[:10])  # warm up
+
+        stop_event = threading.Event()
+        with ThreadPoolExecutor(max_workers=n_clients + 1) as executor:
+            health_probe = executor.submit(run_health_probe, f"{url}/health", stop_event)
+
+            start_time = time.perf_counter()
+            client_latencies = list(executor.map(lambda client: run_client(f"{url}/predict", payloads), range(n_clients)))
+            duration = time.perf_counter() - start_time
+
+            stop_event.set()
+            health_latencies = np.array(health_probe.result()) * 1000
+    finally:
+        process.terminate()
+        process.join()
+
+    latencies = np.concatenate(client_latencies) * 1000
+
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'throughput_per_s': len(latencies) / duration,
+        'health_p99_ms': float(np.percentile(health_latencies, 99)),
+    }
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+
+    historic_data = retrieve_historic_data(config).drop(columns=config.target_col)
+    payloads = historic_data.to_dict(orient='records')[:20]
+
+    for n_clients in [1, 8, 32]:
+        for use_prediction_executor in [False, True]:
+            results = measure_latencies(use_prediction_executor, payloads, n_clients)
+            mode = "prediction pool" if use_prediction_executor else "event loop"
+            logger.info(f"{n_clients:>3} clients, {mode:<15}: " + ", ".join([f"{name}={value:.1f}" for name, value in results.items()]))
@@ -0,0 +1,73 @@
+"""
+Feature engineering of a large frame by the feature DAG: the processes run sequentially, with the independent processes of a level
+run concurrently in threads, fused into one numpy evaluation into preallocated blocks, on row chunks in worker processes,
+and pruned to the ones a model needs.
+
+Usage: pipenv run python -m benchmarks.feature_dag --n-rows 10000000 --max-workers 4 --chunk-size 1000000
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from ml_project.feature_engineering.feature_dag import FeatureDag
+from ml_project.feature_engineering.feature_processes import Feature1Feature2Ratio, Feature1Feature2Sum
+from ml_project.utils import setup_logging
+
+logger = logging.getLogger('standard')
+
+input_columns = ['age', 'siblings_spouses_aboard', 'parents_children_aboard', 'fare']
+
+
+def get_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Benchmark of the feature DAG execution")
+    parser.add_argument('--n-rows', type=int, default=10000000)
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=1000000)
+
+    return parser.parse_args()
+
+
+def get_feature_processes():
+    """
+    Sums and ratios of all pairs of input columns, and the ratio of each sum to the fare on a second level
+    """
+
+    feature_processes = []
+    for position, feature1_col in enumerate(input_columns):
+        for feature2_col in input_columns[position + 1:]:
+            feature_processes.append(Feature1Feature2Sum(feature1_col=feature1_col, feature2_col=feature2_col))
+            feature_processes.append(Feature1Feature2Ratio(feature1_col=feature1_col, feature2_col=feature2_col))
+
+    feature_processes.extend([Feature1Feature2Ratio(feature1_col=sum_process.column_name, feature2_col='fare')
+                              for sum_process in list(feature_processes) if isinstance(sum_process, Feature1Feature2Sum)])
+
+    return feature_processes
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+    arguments = get_arguments()
+
+    random_generator = np.random.default_rng(0)
+    data = pd.DataFrame({column: random_generator.uniform(0., 100., size=arguments.n_rows) for column in input_columns})
+    feature_dag = FeatureDag(get_feature_processes())
+    required_columns = [feature_dag.feature_processes[position].column_name for position in range(3)]
+
+    runs = {
+        'sequential': {},
+        f'{arguments.max_workers} threads': {'max_workers': arguments.max_workers, 'parallel_min_n_rows': 0},
+        'fused': {'fused': True},
+        f'chunks of {arguments.chunk_size} rows': {'chunk_workers': arguments.max_workers, 'chunk_size': arguments.chunk_size},
+        f'pruned to {len(required_columns)} features': {'required_columns': required_columns},
+    }
+
+    for name, execute_arguments in runs.items():
+        start_time = time.perf_counter()
+        _, engineered_columns, durations = feature_dag.execute(data.copy(), **execute_arguments)
+        duration = time.perf_counter() - start_time
+        logger.info(f"{name:<24}: {len(engineered_columns):>2} features in {duration:.2f} s, slowest process {max(durations.values()):.2f} s")
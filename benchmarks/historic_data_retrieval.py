@@ -0,0 +1,102 @@
+"""
+Time and peak memory of reading the historic data from a parquet file scaled up by repeating the titanic data ('--scale-factor' times),
+once by reading the whole file into pandas before selecting rows and columns, and once with the projection, filters and row limit
+pushed down into the pyarrow scanner ('retrieve_from_parquet'). Each read is measured in a fresh interpreter.
+
+Usage: pipenv run python -m benchmarks.historic_data_retrieval --scale-factor 5000
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict
+
+import pandas as pd
+
+from ml_project.data_validation import raw_data_schema
+from ml_project.utils import get_project_root, setup_logging
+from use_cases.use_case_config import config
+
+logger = logging.getLogger('standard')
+
+measurement_code = """
+import json, sys, time
+import pandas as pd
+from ml_project.historic_data_retrieval import retrieve_from_parquet
+
+def get_peak_memory_mb():
+    # high water mark of the resident memory, unlike 'ru_maxrss' it is not inherited from the forking parent process
+    with open('/proc/self/status') as file:
+        return [int(line.split()[1]) / 1024 for line in file if line.startswith('VmHWM')][0]
+
+filepath_parquet, method, columns, n_rows, filters = sys.argv[1], sys.argv[2], json.loads(sys.argv[3]), json.loads(sys.argv[4]), json.loads(sys.argv[5])
+filters = [tuple(condition) for condition in filters] if filters is not None else None
+memory_before = get_peak_memory_mb()
+
+start_time = time.perf_counter()
+if method == 'full_read':
+    data = pd.read_parquet(filepath_parquet)
+    if filters is not None:
+        data = data.query(" and ".join([f"{column} {operator} {value!r}" for column, operator, value in filters]))
+    data = data[columns]
+    data = data.iloc[:n_rows] if n_rows is not None else data
+else:
+    data = retrieve_from_parquet(filepath_parquet, columns=columns, n_rows=n_rows, filters=filters)
+duration = time.perf_counter() - start_time
+
+print(json.dumps({
+    'time_s': duration,
+    'peak_memory_increase_mb': get_peak_memory_mb() - memory_before,
+    'n_rows': len(data),
+}))
+"""
+
+# name: (n_rows, filters) of the read scenarios
+scenarios = {
+    'first_100_rows': (100, None),
+    'all_rows': (None, None),
+    'filtered_rows': (None, [('pclass', '==', 1), ('age', '>', 50)]),
+}
+
+
+def get_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Benchmark of the parquet retrieval of the historic data")
+    parser.add_argument('--scale-factor', type=int, default=2000, help="number of copies of the titanic data in the scaled-up file")
+    parser.add_argument('--row-group-size', type=int, default=100000)
+
+    return parser.parse_args()
+
+
+def measure_retrieval(filepath_parquet: str, method: str, n_rows, filters) -> Dict[str, float]:
+
+    arguments = [filepath_parquet, method, json.dumps(list(raw_data_schema.columns)), json.dumps(n_rows), json.dumps(filters)]
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', measurement_code, *arguments],
+                            cwd=get_project_root(), capture_output=True, text=True, check=True).stdout
+
+    return json.loads(output.splitlines()[-1])
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+    arguments = get_arguments()
+
+    # all columns of the original file are kept, including the 'name' column that is not part of the data schema
+    data = pd.read_parquet(config.data_filepath)
+    scaled_data = pd.concat([data] * arguments.scale_factor, ignore_index=True)
+
+    with tempfile.TemporaryDirectory() as folderpath:
+        filepath_parquet = os.path.join(folderpath, "historic_data.parquet")
+        scaled_data.to_parquet(filepath_parquet, row_group_size=arguments.row_group_size)
+        logger.info(f"Scaled-up data: {len(scaled_data)} rows, {os.path.getsize(filepath_parquet) / 1024 ** 2:.1f} MB parquet file")
+        del scaled_data
+
+        for scenario, (n_rows, filters) in scenarios.items():
+            for method in ['full_read', 'pushdown']:
+                results = measure_retrieval(filepath_parquet, method, n_rows, filters)
+                logger.info(f"{scenario:<15} {method:<10}: " + ", ".join([f"{name}={value:.3f}" if isinstance(value, float) else f"{name}={value}"
+                                                                         for name, value in results.items()]))
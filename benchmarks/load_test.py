@@ -0,0 +1,59 @@
+"""
+Load test of a locally running prediction service, e.g. started via 'python -m deployment.prediction_service_fastapi'.
+Replays the 'ProductionData' records of a json lines file, or synthetic records sampled within the bounds of 'raw_data_schema',
+at a target concurrency (closed loop) or at a target rate of requests per second (open loop).
+The latency percentiles, throughput and error rate are logged and appended as a json line to the results file.
+
+Usage: pipenv run python -m benchmarks.load_test --url http://127.0.0.1:8000/predict --concurrency 8 --n-requests 2000
+"""
+import argparse
+import logging
+import os
+
+from ml_project.load_testing import LoadGenerator, get_synthetic_records, read_records, save_load_test_results
+from ml_project.utils import get_project_root, setup_logging
+
+logger = logging.getLogger('standard')
+
+
+def get_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Load test of a prediction service")
+    parser.add_argument('--url', default="http://127.0.0.1:8000/predict", help="prediction endpoint, e.g. port 5000 for the flask service")
+    parser.add_argument('--records-filepath', default=None, help="json lines file with the records to replay, synthetic records if not provided")
+    parser.add_argument('--n-synthetic-records', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--n-requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=1, help="number of concurrent clients, or maximum requests in flight if a rate is given")
+    parser.add_argument('--rate', type=float, default=None, help="target requests per second")
+    parser.add_argument('--batch-size', type=int, default=1, help="records per request, for the '/predict_batch' endpoint")
+    parser.add_argument('--timeout', type=float, default=10.)
+    parser.add_argument('--label', default=None, help="name of the run in the results file")
+    parser.add_argument('--results-filepath', default=os.path.join(get_project_root(), "output/load_tests/results.jsonl"))
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+    arguments = get_arguments()
+
+    if arguments.records_filepath is not None:
+        records = read_records(arguments.records_filepath)
+    else:
+        records = get_synthetic_records(arguments.n_synthetic_records, seed=arguments.seed)
+
+    load_generator = LoadGenerator(url=arguments.url,
+                                   records=records,
+                                   concurrency=arguments.concurrency,
+                                   rate=arguments.rate,
+                                   batch_size=arguments.batch_size,
+                                   timeout=arguments.timeout,
+                                   )
+    summary = load_generator.run(arguments.n_requests)
+
+    logger.info(", ".join([f"{name}={value:.3f}" if isinstance(value, float) else f"{name}={value}" for name, value in summary.items()]))
+
+    settings = {'label': arguments.label, 'records_filepath': arguments.records_filepath, **load_generator.get_settings()}
+    save_load_test_results(arguments.results_filepath, settings, summary)
@@ -0,0 +1,92 @@
+"""
+Load time and memory of the model artifacts in the pickle format and in the memory-mapped 'mmap' format for forests of increasing size.
+Each load is measured in a fresh interpreter. The resident memory of the mmap format consists of file-backed pages that are shared
+between worker processes via the page cache, whereas the anonymous memory is private to each worker.
+
+Usage: pipenv run python -m benchmarks.model_artifacts_loading
+"""
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict
+
+from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
+from ml_project.historic_data_retrieval import retrieve_historic_data
+from ml_project.model_export import export_model_artifacts
+from ml_project.modelling_process.data_processing import get_processed_data
+from ml_project.modelling_process.model_functions import get_model, train_model
+from ml_project.utils import get_project_root, setup_logging
+from use_cases.use_case_config import config
+
+logger = logging.getLogger('standard')
+
+measurement_code = """
+import json, sys, time
+import pandas as pd
+
+def get_memory_mb():
+    memory = {}
+    with open('/proc/self/smaps_rollup') as file:
+        for line in file.readlines()[1:]:
+            name, value = line.split(':')
+            memory[name] = int(value.split()[0]) / 1024
+    return memory
+
+from ml_project.model_export import load_model_artifacts
+
+data = pd.read_parquet(sys.argv[2])
+memory_before = get_memory_mb()
+
+start_time = time.perf_counter()
+model, preprocessing_objects, _ = load_model_artifacts(sys.argv[1])
+load_time = time.perf_counter() - start_time
+
+start_time = time.perf_counter()
+model.predict_proba(data)
+prediction_time = time.perf_counter() - start_time
+
+memory_after = get_memory_mb()
+print(json.dumps({
+    'load_s': load_time,
+    'first_prediction_s': prediction_time,
+    'rss_mb': memory_after['Rss'] - memory_before['Rss'],
+    'anonymous_mb': memory_after['Anonymous'] - memory_before['Anonymous'],
+}))
+"""
+
+
+def measure_loading(model_objects_filepath: str, data_filepath: str) -> Dict[str, float]:
+
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', measurement_code, model_objects_filepath, data_filepath],
+                            cwd=get_project_root(), capture_output=True, text=True, check=True).stdout
+
+    return json.loads(output.splitlines()[-1])
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+    logging.getLogger('standard').setLevel(logging.WARNING)
+
+    historic_data = retrieve_historic_data(config)
+    data_x, _ = execute_feature_engineering(config, historic_data.drop(columns=[config.target_col]), get_feature_processes(config))
+    data_x_processed, _, preprocessing_objects = get_processed_data(config, None, data_x)
+
+    with tempfile.TemporaryDirectory() as folderpath:
+        data_filepath = os.path.join(folderpath, "data.parquet")
+        data_x_processed.to_parquet(data_filepath)
+
+        for n_estimators in [10, 100, 500]:
+            model = get_model(config, {})
+            model.set_params(n_estimators=n_estimators)
+            model = train_model(config, model, data_x_processed, historic_data[config.target_col])
+
+            for export_format in ['pickle', 'mmap']:
+                export_filepath = os.path.join(folderpath, f"model_{n_estimators}_{export_format}")
+                export_model_artifacts(config.set_value('export_filepath', export_filepath).set_value('export_format', export_format), model, preprocessing_objects)
+
+                results = measure_loading(export_filepath, data_filepath)
+                logger.warning(f"{n_estimators:>4} trees, {export_format:<6}: " + ", ".join([f"{name}={value:.3f}" for name, value in results.items()]))
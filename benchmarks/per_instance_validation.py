@@ -0,0 +1,66 @@
+"""
+Validation cost per record of the serving paths: the pandera schemas on a one-row DataFrame, the compiled validators on the same DataFrame
+(standard prediction path) and on the scalar values of the instance (compiled prediction pipeline), with the pydantic parsing for comparison.
+
+Usage: pipenv run python -m benchmarks.per_instance_validation --n-records 500
+"""
+import argparse
+import logging
+import timeit
+
+import pandas as pd
+
+from ml_project.data_validation import ProductionData, compiled_engineered_data_validator, compiled_raw_data_validator, engineered_data_schema, raw_data_schema
+from ml_project.utils import setup_logging
+
+logger = logging.getLogger('standard')
+
+record = {'pclass': 1, 'sex': 'female', 'age': 38., 'siblings_spouses_aboard': 1, 'parents_children_aboard': 0, 'fare': 71.2833}
+engineered_values = {'relatives_aboard': 1}
+
+# the standard prediction path validates the DataFrames it processes anyway, thus their construction is not measured
+raw_data = pd.DataFrame([record])
+engineered_data = pd.DataFrame([engineered_values])
+
+
+def get_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the per-instance validation")
+    parser.add_argument('--n-records', type=int, default=500)
+
+    return parser.parse_args()
+
+
+def validate_with_pandera():
+
+    raw_data_schema(raw_data)
+    engineered_data_schema(engineered_data)
+
+
+def validate_dataframe_compiled():
+
+    compiled_raw_data_validator.validate_data(raw_data)
+    compiled_engineered_data_validator.validate_data(engineered_data)
+
+
+def validate_values_compiled():
+
+    compiled_raw_data_validator.validate_values(record)
+    compiled_engineered_data_validator.validate_values(engineered_values)
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+    arguments = get_arguments()
+
+    benchmarks = {
+        'pydantic ProductionData parsing': lambda: ProductionData(**record),
+        'pandera on one-row DataFrames': validate_with_pandera,
+        'compiled on one-row DataFrames': validate_dataframe_compiled,
+        'compiled on scalar values': validate_values_compiled,
+    }
+
+    for name, function in benchmarks.items():
+        duration = min(timeit.repeat(function, number=arguments.n_records, repeat=3))
+        logger.info(f"{name:<32}: {duration / arguments.n_records * 1e6:>9.1f} us per record")
@@ -0,0 +1,68 @@
+"""
+Parsing of batch request bodies into the production data DataFrame: the per-record path (json decoding, one 'ProductionData' instance per record
+and a DataFrame from their dicts) against 'parse_production_data_bulk' (one decoding of the whole body and one typed conversion per column).
+
+Usage: pipenv run python -m benchmarks.production_data_parsing --n-records 1000 100000 1000000
+"""
+import argparse
+import json
+import logging
+import time
+
+import pandas as pd
+
+import ml_project.batch_prediction as batch_prediction
+from ml_project.batch_prediction import parse_production_data_bulk
+from ml_project.data_validation import ProductionData
+from ml_project.utils import setup_logging
+
+logger = logging.getLogger('standard')
+
+records = [
+    {'pclass': 1, 'sex': 'female', 'age': 38., 'siblings_spouses_aboard': 1, 'parents_children_aboard': 0, 'fare': 71.2833},
+    {'pclass': 3, 'sex': 'male', 'age': 22., 'siblings_spouses_aboard': 1, 'parents_children_aboard': 0, 'fare': 7.25},
+    {'pclass': 2, 'sex': 'male', 'age': 27, 'siblings_spouses_aboard': 0, 'parents_children_aboard': 2, 'fare': 13.},
+]
+
+
+def get_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Benchmark of the parsing of batch request bodies")
+    parser.add_argument('--n-records', type=int, nargs='+', default=[1000, 100000, 1000000])
+
+    return parser.parse_args()
+
+
+def parse_per_record(body: bytes) -> pd.DataFrame:
+
+    instances = [vars(ProductionData(**record)) for record in json.loads(body)]
+
+    return pd.DataFrame.from_dict(dict(enumerate(instances)), orient='index')
+
+
+def get_duration(function, body: bytes) -> float:
+
+    start_time = time.perf_counter()
+    function(body)
+
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+    arguments = get_arguments()
+
+    for n_records in arguments.n_records:
+        body = json.dumps([records[row % len(records)] for row in range(n_records)]).encode()
+
+        per_record_duration = get_duration(parse_per_record, body)
+        bulk_duration = get_duration(parse_production_data_bulk, body)
+
+        orjson = batch_prediction.orjson
+        batch_prediction.orjson = None
+        bulk_stdlib_duration = get_duration(parse_production_data_bulk, body)
+        batch_prediction.orjson = orjson
+
+        logger.info(f"{n_records:>8} records ({len(body) / 1024 ** 2:.1f} MB): per record {per_record_duration:.3f} s, bulk {bulk_duration:.3f} s "
+                    f"({per_record_duration / bulk_duration:.1f}x), bulk with the json module {bulk_stdlib_duration:.3f} s")
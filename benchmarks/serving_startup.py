@@ -0,0 +1,109 @@
+"""
+Cold start of the prediction services: an import time report in the style of 'python -X importtime' and the time from
+interpreter start to the first prediction, each measured in a fresh interpreter.
+Exits with a non-zero status if a serving module imports one of the training, explanation or monitoring dependencies,
+which are only imported lazily where they are needed.
+
+Usage: pipenv run python -m benchmarks.serving_startup
+"""
+import json
+import logging
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from ml_project.utils import get_project_root, setup_logging
+
+logger = logging.getLogger('standard')
+
+# dependencies that must not be imported by the serving modules
+lazy_dependencies = ['mlflow', 'shap', 'skopt', 'evidently']
+
+production_record = {'pclass': 3, 'sex': 'male', 'age': 22., 'siblings_spouses_aboard': 1, 'parents_children_aboard': 0, 'fare': 7.25}
+
+# code sending 'production_record' to the first prediction of each serving module, imported as 'service'
+serving_modules = {
+    'deployment.aws_lambda.lambda_function': "service.predict(production_record, None)",
+    'deployment.google_cloud_function.cloud_function': (
+        "import flask\n"
+        "with flask.Flask(__name__).test_request_context(json=production_record):\n"
+        "    service.predict(flask.request)"
+    ),
+    'deployment.prediction_service_flask': "service.app.test_client().post('/predict', json=production_record)",
+    'deployment.prediction_service_fastapi': (
+        "from fastapi.testclient import TestClient\n"
+        "TestClient(service.app).post('/predict', json=production_record)"
+    ),
+}
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+
+    return subprocess.run([sys.executable, *options, '-W', 'ignore', '-c', code], cwd=get_project_root(), capture_output=True, text=True, check=True)
+
+
+def get_import_times(module_name: str) -> List[Tuple[str, float]]:
+    """
+    Returns the top-level packages imported by 'module_name' with the summed import times of their modules in seconds, slowest first
+    """
+
+    importtime_output = run_python(f"import {module_name}", '-X', 'importtime').stderr
+
+    import_times: Dict[str, float] = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        package_name = name.strip().split('.')[0]
+        import_times[package_name] = import_times.get(package_name, 0.) + int(self_time) / 1e6
+
+    return sorted(import_times.items(), key=lambda import_time: -import_time[1])
+
+
+def get_imported_lazy_dependencies(module_name: str) -> List[str]:
+
+    code = f"import sys, json\nimport {module_name}\nprint(json.dumps([name for name in {lazy_dependencies} if name in sys.modules]))"
+
+    return json.loads(run_python(code).stdout.splitlines()[-1])
+
+
+def measure_time_to_first_prediction(module_name: str, prediction_code: str) -> Dict[str, float]:
+
+    code = (
+        "import json, time\n"
+        "start_time = time.perf_counter()\n"
+        f"import {module_name} as service\n"
+        "import_time = time.perf_counter() - start_time\n"
+        f"production_record = {production_record}\n"
+        f"{prediction_code}\n"
+        "print(json.dumps({'import_s': import_time, 'first_prediction_s': time.perf_counter() - start_time - import_time}))"
+    )
+
+    start_time = time.perf_counter()
+    timings = json.loads(run_python(code).stdout.splitlines()[-1])
+    timings['time_to_first_prediction_s'] = time.perf_counter() - start_time
+
+    return timings
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+
+    regressed_modules = {}
+    for module_name, prediction_code in serving_modules.items():
+        import_times = get_import_times(module_name)
+        logger.info(f"{module_name}: total import time {sum([import_time for _, import_time in import_times]):.2f} s, slowest imports: "
+                    + ", ".join([f"{name}={import_time:.2f} s" for name, import_time in import_times[:8]]))
+
+        timings = measure_time_to_first_prediction(module_name, prediction_code)
+        logger.info(f"{module_name}: " + ", ".join([f"{name}={value:.2f}" for name, value in timings.items()]))
+
+        imported_lazy_dependencies = get_imported_lazy_dependencies(module_name)
+        if len(imported_lazy_dependencies) != 0:
+            regressed_modules[module_name] = imported_lazy_dependencies
+
+    if len(regressed_modules) != 0:
+        logger.error(f"Serving modules import dependencies that should be imported lazily: {regressed_modules}")
+        sys.exit(1)
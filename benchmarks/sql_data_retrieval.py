@@ -0,0 +1,103 @@
+"""
+Time and peak memory of reading the historic data from a sqlite database scaled up by repeating the titanic data ('--scale-factor' times)
+with different fetch sizes, once into one DataFrame ('retrieve_from_sql') and once chunk by chunk without keeping the chunks
+('retrieve_sql_chunks'), compared to 'pandas.read_sql'. Each read is measured in a fresh interpreter.
+
+Usage: pipenv run python -m benchmarks.sql_data_retrieval --scale-factor 500
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from typing import Dict
+
+import pandas as pd
+
+from ml_project.data_validation import raw_data_schema
+from ml_project.utils import get_project_root, setup_logging
+from use_cases.use_case_config import config
+
+logger = logging.getLogger('standard')
+
+measurement_code = """
+import json, sqlite3, sys, time
+import pandas as pd
+from ml_project.data_validation import raw_data_schema
+from ml_project.sql_data_retrieval import SqlConnectionPool, get_arrow_schema, get_sql_query, retrieve_from_sql, retrieve_sql_chunks
+
+def get_peak_memory_mb():
+    # high water mark of the resident memory, unlike 'ru_maxrss' it is not inherited from the forking parent process
+    with open('/proc/self/status') as file:
+        return [int(line.split()[1]) / 1024 for line in file if line.startswith('VmHWM')][0]
+
+filepath_database, method, chunk_size = sys.argv[1], sys.argv[2], int(sys.argv[3])
+columns = list(raw_data_schema.columns)
+connection_pool = SqlConnectionPool(f"sqlite:///{filepath_database}")
+arrow_schema = get_arrow_schema(raw_data_schema, columns)
+memory_before = get_peak_memory_mb()
+
+start_time = time.perf_counter()
+if method == 'pandas_read_sql':
+    sql_query, _ = get_sql_query(table='titanic', columns=columns)
+    n_rows = len(pd.read_sql(sql_query, sqlite3.connect(filepath_database)))
+elif method == 'retrieve_from_sql':
+    n_rows = len(retrieve_from_sql(connection_pool, table='titanic', columns=columns, n_rows=None, chunk_size=chunk_size, arrow_schema=arrow_schema))
+else:
+    n_rows = sum([len(chunk) for chunk in retrieve_sql_chunks(connection_pool, chunk_size, table='titanic', columns=columns, arrow_schema=arrow_schema)])
+duration = time.perf_counter() - start_time
+
+print(json.dumps({
+    'time_s': duration,
+    'peak_memory_increase_mb': get_peak_memory_mb() - memory_before,
+    'n_rows': n_rows,
+}))
+"""
+
+fetch_sizes = [100, 1000, 10000, 100000]
+
+
+def get_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Benchmark of the fetch sizes of the sql retrieval of the historic data")
+    parser.add_argument('--scale-factor', type=int, default=500, help="number of copies of the titanic data in the scaled-up database")
+
+    return parser.parse_args()
+
+
+def measure_retrieval(filepath_database: str, method: str, chunk_size: int) -> Dict[str, float]:
+
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', measurement_code, filepath_database, method, str(chunk_size)],
+                            cwd=get_project_root(), capture_output=True, text=True, check=True).stdout
+
+    return json.loads(output.splitlines()[-1])
+
+
+def log_results(method: str, chunk_size, results: Dict[str, float]):
+
+    logger.info(f"{method:<20} fetch size {str(chunk_size):>7}: " + ", ".join([f"{name}={value:.3f}" if isinstance(value, float) else f"{name}={value}"
+                                                                        for name, value in results.items()]))
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+    arguments = get_arguments()
+
+    data = pd.read_parquet(config.data_filepath)
+    scaled_data = pd.concat([data] * arguments.scale_factor, ignore_index=True)
+
+    with tempfile.TemporaryDirectory() as folderpath:
+        filepath_database = os.path.join(folderpath, "historic_data.db")
+        with sqlite3.connect(filepath_database) as connection:
+            scaled_data.to_sql('titanic', connection, index=False)
+        logger.info(f"Scaled-up data: {len(scaled_data)} rows, {os.path.getsize(filepath_database) / 1024 ** 2:.1f} MB sqlite database")
+        del scaled_data
+
+        log_results('pandas_read_sql', None, measure_retrieval(filepath_database, 'pandas_read_sql', 0))
+        for method in ['retrieve_from_sql', 'retrieve_sql_chunks']:
+            for fetch_size in fetch_sizes:
+                log_results(method, fetch_size, measure_retrieval(filepath_database, method, fetch_size))
@@ -3,18 +3,27 @@ from typing import Tuple
 
 import pandas as pd
 
+from ml_project.batch_prediction import BatchSizeError, get_batch_prediction_dict, get_production_data_batch, get_schema_errors_dict, parse_batch_records, schema_error_types
+from ml_project.compiled_pipeline import get_compiled_pipeline
 from ml_project.config import Config
-from ml_project.data_validation import validate_engineered_data_per_instance, validate_raw_data_per_instance
+from ml_project.data_validation import ProductionData, validate_engineered_data_per_instance, validate_raw_data_per_instance
 from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
 from ml_project.model_export import load_model_artifacts
 from ml_project.modelling_process.data_processing import get_processed_data
 from ml_project.prediction_process import get_predictions
 from ml_project.production_data_retrieval import process_production_input_data_into_raw_data
-from ml_project.utils import get_model_artifacts_filepath
+from ml_project.utils import get_model_artifacts_filepath, get_project_configs
 
 # Model loading
 model, preprocessing_objects, config = load_model_artifacts(model_objects_filepath=get_model_artifacts_filepath())
 
+project_configs = get_project_configs()
+
+# Optional compiled single-instance prediction path
+compiled_pipeline = None
+if config is not None and project_configs.get('USE_COMPILED_PIPELINE', False):
+    compiled_pipeline = get_compiled_pipeline(config, model, preprocessing_objects)
+
 def _get_predictions(config: Config, production_data: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
 
     #######
@@ -27,7 +36,7 @@ def _get_predictions(config: Config, production_data: pd.DataFrame) -> Tuple[pd.
     ######
     ### Feature engineering
     feature_processes = get_feature_processes(config)
-    data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes)
+    data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes, required_features=preprocessing_objects.features)
     validate_engineered_data_per_instance(data_x[engineered_feature_columns])
     ###
     ######
@@ -52,14 +61,26 @@ def predict(event, context):
     print("data_dict:")
     print(data_dict)
 
-    data = pd.DataFrame.from_dict([data_dict])
+    # batch mode for a list of records and for records under the key 'instances'
+    if isinstance(data_dict, list) or 'instances' in data_dict:
+        return predict_batch(event, context)
 
-    prediction = _get_predictions(config, production_data=data)
+    if compiled_pipeline is not None:
+        predictions, prediction_probas = compiled_pipeline.predict(ProductionData(**data_dict))
 
-    prediction = {
-        'label': int(prediction[0].values[0]),
-        'proba': prediction[1].values.tolist()
-    }
+        prediction = {
+            'label': int(predictions[0]),
+            'proba': prediction_probas.tolist()
+        }
+    else:
+        data = pd.DataFrame.from_dict([data_dict])
+
+        prediction = _get_predictions(config, production_data=data)
+
+        prediction = {
+            'label': int(prediction[0].values[0]),
+            'proba': prediction[1].values.tolist()
+        }
 
     body = {
         "message": "Go Serverless v1.0! Your function executed successfully!",
@@ -73,3 +94,34 @@ def predict(event, context):
     }
 
     return response
+
+
+def predict_batch(event, context):
+    """
+    Batch mode of 'predict' for events that are a list of records or that contain a list of records or json lines under the key 'instances'
+    """
+
+    max_batch_size = project_configs.get('MAX_BATCH_SIZE', 10000)
+    try:
+        records = parse_batch_records(event if isinstance(event, list) else event['instances'], max_batch_size=max_batch_size)
+        data = get_production_data_batch(records, max_batch_size=max_batch_size)
+    except BatchSizeError as error:
+        return {"statusCode": 413, "body": json.dumps({'message': str(error)})}
+    except (ValueError, TypeError) as error:
+        return {"statusCode": 400, "body": json.dumps({'message': str(error)})}
+
+    try:
+        predictions, prediction_probas = _get_predictions(config, production_data=data)
+    except schema_error_types as error:
+        return {"statusCode": 400, "body": json.dumps(get_schema_errors_dict(error))}
+
+    body = {
+        "prediction": get_batch_prediction_dict(predictions, prediction_probas)
+    }
+
+    response = {
+        "statusCode": 200,
+        "body": json.dumps(body)
+    }
+
+    return response
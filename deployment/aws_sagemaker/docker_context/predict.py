@@ -3,11 +3,15 @@ import os
 
 import pandas as pd
 
+from ml_project.batch_prediction import BatchSizeError, get_batch_prediction_dict, get_production_data_batch, get_schema_errors_dict, parse_batch_records, schema_error_types
 from ml_project.data_validation import ProductionData, validate_engineered_data_per_instance, validate_raw_data_per_instance
 from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
 from ml_project.modelling_process.data_processing import get_processed_data
 from ml_project.prediction_process import get_predictions
 from ml_project.production_data_retrieval import process_production_input_data_into_raw_data
+from ml_project.utils import get_project_configs
+
+project_configs = get_project_configs()
 
 
 def _get_predictions(config, production_data, model_objects):
@@ -41,6 +45,9 @@ def _get_predictions(config, production_data, model_objects):
 
 
 def predict(data_array, model_objects):
+    """
+    Returns the json body and the status code of the prediction of a record or of a batch of records
+    """
 
     # validate and parse request body data
     print("inputting stuff: ", data_array, type(data_array), data_array.shape)
@@ -51,7 +58,14 @@ def predict(data_array, model_objects):
 
     config = model_objects[2]
 
-    data_dict = vars(ProductionData(**data_dict))
+    # batch mode for lists of records and json objects with 'instances'
+    if isinstance(data_dict, list) or 'instances' in data_dict:
+        return predict_batch(data_dict, config, model_objects)
+
+    try:
+        data_dict = vars(ProductionData(**data_dict))
+    except ValueError as error:
+        return json.dumps({'message': str(error)}), 400
 
     data = pd.DataFrame.from_dict([data_dict])
 
@@ -62,4 +76,28 @@ def predict(data_array, model_objects):
         'proba': prediction[1].values.tolist()
     }
 
-    return json.dumps(prediction)
+    return json.dumps(prediction), 200
+
+
+def predict_batch(request_body, config, model_objects):
+    """
+    Returns the json body and the status code of the predictions of a batch of records, 413 for too many records and 400 for invalid records
+    """
+
+    # parse request body data, the records are validated in bulk by the prediction pipeline
+    max_batch_size = project_configs.get('MAX_BATCH_SIZE', 10000)
+    try:
+        records = parse_batch_records(request_body, max_batch_size=max_batch_size)
+        data = get_production_data_batch(records, max_batch_size=max_batch_size)
+    except BatchSizeError as error:
+        return json.dumps({'message': str(error)}), 413
+    except (ValueError, TypeError) as error:
+        return json.dumps({'message': str(error)}), 400
+
+    try:
+        predictions, prediction_probas = _get_predictions(config, production_data=data, model_objects=model_objects)
+    except schema_error_types as error:
+        return json.dumps(get_schema_errors_dict(error)), 400
+    prediction = get_batch_prediction_dict(predictions, prediction_probas)
+
+    return json.dumps(prediction), 200
@@ -3,6 +3,7 @@ import os
 import sys
 
 import predict
+from sagemaker_containers.beta.framework import encoders, worker
 
 from ml_project.model_export import load_model_artifacts
 
@@ -30,4 +31,11 @@ def predict_fn(data_array, model_objects):
     logger.info("Prediction: ")
     logger.info(prediction)
 
-    return prediction
\ No newline at end of file
+    return prediction
+
+def output_fn(prediction, accept):
+
+    # the status code of invalid (400) or too large (413) requests is set on the response, the body is encoded as by the default 'output_fn'
+    body, status_code = prediction
+
+    return worker.Response(encoders.encode(body, accept), status=status_code, mimetype=accept)
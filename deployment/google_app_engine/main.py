@@ -4,19 +4,28 @@ import flask
 import pandas as pd
 from flask import Flask, request
 
+from ml_project.batch_prediction import BatchSizeError, check_batch_body_size, get_batch_prediction_dict, get_production_data_batch, get_schema_errors_dict, parse_batch_records, schema_error_types
+from ml_project.compiled_pipeline import get_compiled_pipeline
 from ml_project.data_validation import ProductionData, validate_engineered_data_per_instance, validate_raw_data_per_instance
 from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
 from ml_project.model_export import load_model_artifacts
 from ml_project.modelling_process.data_processing import get_processed_data
 from ml_project.prediction_process import get_predictions
 from ml_project.production_data_retrieval import process_production_input_data_into_raw_data
-from ml_project.utils import get_model_artifacts_filepath
+from ml_project.utils import get_model_artifacts_filepath, get_project_configs
 
 app = Flask(__name__)
 
 # Model_objects loading
 model, preprocessing_objects, config = load_model_artifacts(model_objects_filepath=get_model_artifacts_filepath())
 
+project_configs = get_project_configs()
+
+# Optional compiled single-instance prediction path
+compiled_pipeline = None
+if config is not None and project_configs.get('USE_COMPILED_PIPELINE', False):
+    compiled_pipeline = get_compiled_pipeline(config, model, preprocessing_objects)
+
 
 def _get_predictions(config, production_data):
 
@@ -30,7 +39,7 @@ def _get_predictions(config, production_data):
     ######
     ### Feature engineering
     feature_processes = get_feature_processes(config)
-    data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes)
+    data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes, required_features=preprocessing_objects.features)
     validate_engineered_data_per_instance(data_x[engineered_feature_columns])
     ###
     ######
@@ -50,16 +59,51 @@ def predict():
 
     # validate and parse request body data
     request_body_dict: Dict = request.get_json()
-    data_dict = vars(ProductionData(**request_body_dict))
 
-    data = pd.DataFrame.from_dict([data_dict])
+    if compiled_pipeline is not None:
+        predictions, prediction_probas = compiled_pipeline.predict(ProductionData(**request_body_dict))
+
+        prediction = {
+            'label': int(predictions[0]),
+            'proba': prediction_probas.tolist()
+        }
+    else:
+        data_dict = vars(ProductionData(**request_body_dict))
+
+        data = pd.DataFrame.from_dict([data_dict])
+
+        prediction = _get_predictions(config, production_data=data)
+
+        prediction = {
+            'label': int(prediction[0].values[0]),
+            'proba': prediction[1].values.tolist()
+        }
+
+    response = flask.jsonify(prediction)
+
+    return response
 
-    prediction = _get_predictions(config, production_data=data)
 
-    prediction = {
-        'label': int(prediction[0].values[0]),
-        'proba': prediction[1].values.tolist()
-    }
+@app.route('/predict_batch', methods=["POST"])
+def predict_batch():
+
+    # parse request body data, the records are validated in bulk by the prediction pipeline,
+    # oversized requests are rejected by their Content-Length before the body is read
+    max_batch_size = project_configs.get('MAX_BATCH_SIZE', 10000)
+    try:
+        check_batch_body_size(request.content_length, max_batch_size)
+        records = parse_batch_records(request.get_data(), max_batch_size=max_batch_size)
+        data = get_production_data_batch(records, max_batch_size=max_batch_size)
+    except BatchSizeError as error:
+        return flask.jsonify({'message': str(error)}), 413
+    except (ValueError, TypeError) as error:
+        return flask.jsonify({'message': str(error)}), 400
+
+    try:
+        predictions, prediction_probas = _get_predictions(config, production_data=data)
+    except schema_error_types as error:
+        return flask.jsonify(get_schema_errors_dict(error)), 400
+    prediction = get_batch_prediction_dict(predictions, prediction_probas)
 
     response = flask.jsonify(prediction)
 
@@ -1,7 +1,9 @@
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple, Union
 
 import pandas as pd
 
+from ml_project.batch_prediction import BatchSizeError, check_batch_body_size, get_batch_prediction_dict, get_production_data_batch, get_schema_errors_dict, parse_batch_records, schema_error_types
+from ml_project.compiled_pipeline import get_compiled_pipeline
 from ml_project.config import Config
 from ml_project.data_validation import ProductionData, validate_engineered_data_per_instance, validate_raw_data_per_instance
 from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
@@ -9,11 +11,18 @@ from ml_project.model_export import load_model_artifacts
 from ml_project.modelling_process.data_processing import get_processed_data
 from ml_project.prediction_process import get_predictions
 from ml_project.production_data_retrieval import process_production_input_data_into_raw_data
-from ml_project.utils import get_model_artifacts_filepath
+from ml_project.utils import get_model_artifacts_filepath, get_project_configs
 
 # Model_objects loading
 model, preprocessing_objects, config = load_model_artifacts(model_objects_filepath=get_model_artifacts_filepath())
 
+project_configs = get_project_configs()
+
+# Optional compiled single-instance prediction path
+compiled_pipeline = None
+if config is not None and project_configs.get('USE_COMPILED_PIPELINE', False):
+    compiled_pipeline = get_compiled_pipeline(config, model, preprocessing_objects)
+
 
 def _get_predictions(config: Config, production_data: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
 
@@ -27,7 +36,7 @@ def _get_predictions(config: Config, production_data: pd.DataFrame) -> Tuple[pd.
     ######
     ### Feature engineering
     feature_processes = get_feature_processes(config)
-    data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes)
+    data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes, required_features=preprocessing_objects.features)
     validate_engineered_data_per_instance(data_x[engineered_feature_columns])
     ###
     ######
@@ -42,20 +51,61 @@ def _get_predictions(config: Config, production_data: pd.DataFrame) -> Tuple[pd.
     return predictions, prediction_probas
 
 
+def predict_batch(request_body: Union[str, bytes, List, Dict]) -> Union[Dict, Tuple[Dict, int]]:
+
+    # parse request body data, the records are validated in bulk by the prediction pipeline
+    max_batch_size = project_configs.get('MAX_BATCH_SIZE', 10000)
+    try:
+        records = parse_batch_records(request_body, max_batch_size=max_batch_size)
+        data = get_production_data_batch(records, max_batch_size=max_batch_size)
+    except BatchSizeError as error:
+        return {'message': str(error)}, 413
+    except (ValueError, TypeError) as error:
+        return {'message': str(error)}, 400
+
+    try:
+        predictions, prediction_probas = _get_predictions(config, production_data=data)
+    except schema_error_types as error:
+        return get_schema_errors_dict(error), 400
+    prediction = get_batch_prediction_dict(predictions, prediction_probas)
+
+    return prediction
+
+
 def predict(request):
 
+    # oversized requests are rejected by their Content-Length before the body is read
+    try:
+        check_batch_body_size(request.content_length, project_configs.get('MAX_BATCH_SIZE', 10000))
+    except BatchSizeError as error:
+        return {'message': str(error)}, 413
+
+    # batch mode for json arrays, json objects with 'instances' and json lines
+    request_body_dict = request.get_json(silent=True)
+    if request_body_dict is None:
+        return predict_batch(request.get_data())
+    elif isinstance(request_body_dict, list) or 'instances' in request_body_dict:
+        return predict_batch(request_body_dict)
+
     # validate and parse request body data
-    request_body_dict: Dict = request.get_json()
-    data_dict = vars(ProductionData(**request_body_dict))
+    if compiled_pipeline is not None:
+        predictions, prediction_probas = compiled_pipeline.predict(ProductionData(**request_body_dict))
+
+        prediction = {
+            'label': int(predictions[0]),
+            'proba': prediction_probas.tolist()
+        }
+    else:
+        data_dict = vars(ProductionData(**request_body_dict))
 
-    data = pd.DataFrame.from_dict([data_dict])
+        data = pd.DataFrame.from_dict([data_dict])
 
-    prediction = _get_predictions(config, production_data=data)
+        prediction = _get_predictions(config, production_data=data)
 
-    prediction = {
-        'label': int(prediction[0].values[0]),
-        'proba': prediction[1].values.tolist()
-    }
+        prediction = {
+            'label': int(prediction[0].values[0]),
+            'proba': prediction[1].values.tolist()
+        }
 
     return prediction
 
@@ -1,51 +1,176 @@
-from typing import Tuple
+import asyncio
+from typing import Any, Callable, Tuple
 
+import numpy as np
 import pandas as pd
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
 
-from ml_project.config import Config
+from ml_project.batch_prediction import (BatchSizeError, check_batch_body_size, get_batch_prediction_dict, get_row_errors_dict, get_schema_errors_dict,
+                                         parse_production_data_bulk, schema_error_types)
 from ml_project.data_validation import ProductionData, validate_engineered_data_per_instance, validate_raw_data_per_instance
 from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
-from ml_project.model_export import load_model_artifacts
+from ml_project.micro_batching import MicroBatcher
+from ml_project.model_manager import ModelVersion, get_model_manager, warmup_production_data
 from ml_project.modelling_process.data_processing import get_processed_data
+from ml_project.prediction_executor import get_model_n_jobs, get_prediction_executor
+from ml_project.prediction_cache import get_prediction_cache
 from ml_project.prediction_process import get_predictions
 from ml_project.production_data_retrieval import process_production_input_data_into_raw_data
-from ml_project.utils import get_model_artifacts_filepath
+from ml_project.serving_metrics import get_serving_metrics
+from ml_project.utils import get_model_artifacts_filepath, get_project_configs
 
 app = FastAPI()
 
-# Model_objects loading
-model, preprocessing_objects, config = load_model_artifacts(model_objects_filepath=get_model_artifacts_filepath())
+project_configs = get_project_configs()
 
+# Optional latency histograms of the pipeline stages and request metrics, exposed at /metrics
+serving_metrics = get_serving_metrics(project_configs)
 
-def _get_predictions(config: Config, production_data: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+
+def _get_predictions(model_version: ModelVersion, production_data: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+
+    config = model_version.config
 
     ######
     ### production input data to raw_data
-    raw_data = process_production_input_data_into_raw_data(config, production_data)
-    validate_raw_data_per_instance(raw_data)
+    with serving_metrics.time_stage('process_production_input_data'):
+        raw_data = process_production_input_data_into_raw_data(config, production_data)
+    with serving_metrics.time_stage('validate_raw_data'):
+        validate_raw_data_per_instance(raw_data)
     ###
     ######
 
     ######
     ### Feature engineering
-    feature_processes = get_feature_processes(config)
-    data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes)
-    validate_engineered_data_per_instance(data_x[engineered_feature_columns])
+    with serving_metrics.time_stage('feature_engineering'):
+        feature_processes = get_feature_processes(config)
+        data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes, required_features=model_version.preprocessing_objects.features)
+    with serving_metrics.time_stage('validate_engineered_data'):
+        validate_engineered_data_per_instance(data_x[engineered_feature_columns])
     ###
     ######
 
     ######
     ### Retrieve predictions
-    data_x_processed, _, _ = get_processed_data(config, preprocessing_objects, data_x)
-    predictions, prediction_probas = get_predictions(config, model, data_x_processed)
+    with serving_metrics.time_stage('preprocessing'):
+        data_x_processed, _, _ = get_processed_data(config, model_version.preprocessing_objects, data_x)
+    with serving_metrics.time_stage('prediction'):
+        predictions, prediction_probas = get_predictions(config, model_version.model, data_x_processed)
     ###
     ######
 
     return predictions, prediction_probas
 
 
+def _get_versioned_predictions(production_data: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame, np.ndarray]:
+    """
+    Returns the predictions of the currently served model version together with that version per instance
+    """
+
+    model_version = model_manager.model_version
+    predictions, prediction_probas = _get_predictions(model_version, production_data)
+
+    return predictions, prediction_probas, np.full(len(predictions), model_version.version, dtype=object)
+
+
+def _warmup(model_version: ModelVersion):
+
+    _get_predictions(model_version, pd.DataFrame.from_dict([warmup_production_data.dict()]))
+    if model_version.compiled_pipeline is not None:
+        model_version.compiled_pipeline.predict(warmup_production_data)
+
+
+def _set_prediction_cache_model(model_version: ModelVersion):
+
+    if prediction_cache is not None:
+        prediction_cache.model_identity = model_version.version
+
+
+# Model_objects loading, the model manager swaps in newly exported model artifacts at runtime
+model_objects_filepath = get_model_artifacts_filepath()
+prediction_pool_size = project_configs.get('PREDICTION_POOL_SIZE', None)
+model_manager = get_model_manager(project_configs, model_objects_filepath,
+                                  warmup=_warmup,
+                                  model_n_jobs=get_model_n_jobs(prediction_pool_size) if prediction_pool_size else None,
+                                  on_swap=_set_prediction_cache_model,
+                                  )
+
+# Bounded pool running the CPU-bound prediction pipeline outside of the event loop
+prediction_executor = get_prediction_executor(model_manager.model_version.model, pool_size=prediction_pool_size)
+
+# Optional coalescing of concurrent requests into micro-batches
+micro_batcher = None
+if project_configs.get('USE_MICRO_BATCHING', False):
+    micro_batcher = MicroBatcher(predict_batch=_get_versioned_predictions,
+                                 max_batch_size=project_configs.get('MICRO_BATCHING_MAX_BATCH_SIZE', 32),
+                                 max_wait_time=project_configs.get('MICRO_BATCHING_MAX_WAIT_TIME', 0.005),
+                                 executor=prediction_executor,
+                                 )
+
+# Optional cache for predictions of repeatedly requested instances
+prediction_cache = get_prediction_cache(project_configs, model_objects_filepath)
+# keyed by the identity of the loaded model version instead of a separate hash of the artifacts, which may be replaced meanwhile
+_set_prediction_cache_model(model_manager.model_version)
+
+
+async def _run_in_prediction_executor(function: Callable, *args) -> Any:
+    """
+    Runs the CPU-bound 'function' in the prediction pool if configured, otherwise directly on the event loop
+    """
+
+    if prediction_executor is not None:
+        return await asyncio.get_running_loop().run_in_executor(prediction_executor, function, *args)
+    else:
+        return function(*args)
+
+
+@app.on_event("startup")
+async def start_micro_batcher():
+
+    if micro_batcher is not None:
+        await micro_batcher.start()
+
+    model_manager.start_watching()
+
+
+@app.on_event("shutdown")
+async def stop_micro_batcher():
+
+    if micro_batcher is not None:
+        await micro_batcher.stop()
+
+    model_manager.stop_watching()
+
+
+def _predict_compiled(model_version: ModelVersion, data: ProductionData) -> Tuple[np.ndarray, np.ndarray]:
+
+    with serving_metrics.time_stage('compiled_pipeline'):
+        return model_version.compiled_pipeline.predict(data)
+
+
+async def _predict_instance(model_version: ModelVersion, data: ProductionData) -> Tuple[Any, np.ndarray, str]:
+    """
+    Returns the predicted label, the prediction probabilities and the model version that served a single instance
+    """
+
+    if micro_batcher is not None:
+        # scored by the model version that is served when its batch is scored
+        return await micro_batcher.predict(data)
+
+    elif model_version.compiled_pipeline is not None:
+        predictions, prediction_probas = await _run_in_prediction_executor(_predict_compiled, model_version, data)
+
+        return predictions[0], prediction_probas[0], model_version.version
+
+    else:
+        production_data = pd.DataFrame.from_dict([data.dict()])
+
+        predictions, prediction_probas = await _run_in_prediction_executor(_get_predictions, model_version, production_data)
+
+        return predictions.values[0], prediction_probas.values[0], model_version.version
+
+
 @app.post("/predict")
 async def predict(data: ProductionData):
     """
@@ -54,21 +179,140 @@ async def predict(data: ProductionData):
     :return: # TODO
     """
 
-    data = pd.DataFrame.from_dict([data.dict()])
+    # the model version is read once, a model swap during the request does not affect it
+    model_version = model_manager.model_version
 
-    if config is not None:
-        prediction = _get_predictions(config, production_data=data)
+    cached_prediction = None
+    if prediction_cache is not None:
+        cached_prediction = prediction_cache.get(prediction_cache.get_key(data, model_version.version))
 
-        prediction_dict = {
-            'label': int(prediction[0].values[0]),
-            'probas': prediction[1].values[0].tolist()
-        }
+    if cached_prediction is not None:
+        prediction = (*cached_prediction, model_version.version)
     else:
-        prediction_dict = {'message': 'An error occurred, "config" is None'}
+        prediction = await _predict_instance(model_version, data)
+        if prediction_cache is not None:
+            prediction_cache.put(prediction_cache.get_key(data, prediction[2]), prediction[:2])
+
+    prediction_dict = {
+        'label': int(prediction[0]),
+        'probas': prediction[1].tolist(),
+        'model_version': prediction[2],
+    }
+
+    return prediction_dict
+
+
+@app.post("/predict_batch")
+async def predict_batch(request: Request):
+    """
+    Scores a batch of records, provided as json array or json lines, with a single pass through the prediction pipeline
+    """
+
+    max_batch_size = project_configs.get('MAX_BATCH_SIZE', 10000)
+    try:
+        # oversized requests are rejected by their Content-Length before the body is read
+        check_batch_body_size(int(request.headers['content-length']) if 'content-length' in request.headers else None, max_batch_size)
+        data, row_errors = parse_production_data_bulk(await request.body(), max_batch_size=max_batch_size)
+    except BatchSizeError as error:
+        raise HTTPException(status_code=413, detail=str(error))
+    except (ValueError, TypeError) as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    if len(row_errors) != 0:
+        raise HTTPException(status_code=400, detail=get_row_errors_dict(row_errors))
+
+    model_version = model_manager.model_version
+
+    try:
+        predictions, prediction_probas = await _run_in_prediction_executor(_get_predictions, model_version, data)
+    except schema_error_types as error:
+        raise HTTPException(status_code=400, detail=get_schema_errors_dict(error))
+    prediction_dict = get_batch_prediction_dict(predictions, prediction_probas)
+    prediction_dict['model_version'] = model_version.version
 
     return prediction_dict
 
 
+@app.get("/health")
+async def health():
+
+    return {'status': 'ok'}
+
+
+@app.get("/prediction_cache_stats")
+async def prediction_cache_stats():
+
+    if prediction_cache is not None:
+        return prediction_cache.get_stats()
+    else:
+        return {'message': 'Prediction cache is not enabled'}
+
+
+@app.get("/admin/model")
+async def model_status():
+
+    if not project_configs.get('ENABLE_ADMIN_ENDPOINTS', False):
+        raise HTTPException(status_code=404, detail="Admin endpoints are not enabled")
+
+    return model_manager.get_status()
+
+
+@app.post("/admin/reload")
+async def reload_model():
+    """
+    Starts loading the model artifacts in the background, the new model version is swapped in once it is loaded and warmed up
+    """
+
+    if not project_configs.get('ENABLE_ADMIN_ENDPOINTS', False):
+        raise HTTPException(status_code=404, detail="Admin endpoints are not enabled")
+
+    reload_started = model_manager.reload()
+
+    return {'reload_started': reload_started, **model_manager.get_status()}
+
+
+@app.get("/micro_batching_stats")
+async def micro_batching_stats():
+    """
+    Reports the batch sizes and queue wait times produced by the micro-batching of requests
+    """
+
+    if micro_batcher is not None:
+        return micro_batcher.stats.get_summary()
+    else:
+        return {'message': 'Micro-batching is not enabled'}
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Latency histograms of the prediction pipeline stages and request metrics in the Prometheus text format
+    """
+
+    if not serving_metrics.enabled:
+        raise HTTPException(status_code=404, detail="Serving metrics are not enabled")
+
+    return Response(content=serving_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+if serving_metrics.enabled:
+    # requests to unknown paths are counted under a single label to bound the number of time series
+    route_paths = {route.path for route in app.routes}
+
+    @app.middleware("http")
+    async def track_requests(request: Request, call_next):
+
+        endpoint = request.url.path if request.url.path in route_paths else 'other'
+        start_time = serving_metrics.start_request(endpoint)
+
+        failed = True
+        try:
+            response = await call_next(request)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            serving_metrics.end_request(endpoint, start_time, failed)
+
 
 if __name__ == "__main__":
 
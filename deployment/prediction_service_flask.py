@@ -1,78 +1,242 @@
 from typing import Any, Dict, Optional, Tuple
 
 import flask
+import numpy as np
 import pandas as pd
-from flask import Flask, request
+from flask import Flask, Response, g, request
 
-from ml_project.config import Config
+from ml_project.batch_prediction import (BatchSizeError, check_batch_body_size, get_batch_prediction_dict, get_row_errors_dict, get_schema_errors_dict,
+                                         parse_production_data_bulk, schema_error_types)
 from ml_project.data_validation import ProductionData, validate_engineered_data_per_instance, validate_raw_data_per_instance
 from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
-from ml_project.model_export import load_model_artifacts
+from ml_project.model_manager import ModelVersion, get_model_manager, warmup_production_data
 from ml_project.modelling_process.data_processing import get_processed_data
+from ml_project.prediction_cache import get_prediction_cache
 from ml_project.prediction_process import get_predictions
 from ml_project.production_data_retrieval import process_production_input_data_into_raw_data
-from ml_project.utils import get_model_artifacts_filepath
+from ml_project.serving_metrics import get_serving_metrics
+from ml_project.utils import get_model_artifacts_filepath, get_project_configs
 
 app = Flask(__name__)
 
+project_configs = get_project_configs()
 
-# odel_object loading
-model, preprocessing_objects, config = load_model_artifacts(model_objects_filepath=get_model_artifacts_filepath())
+# Optional latency histograms of the pipeline stages and request metrics, exposed at /metrics
+serving_metrics = get_serving_metrics(project_configs)
 
-def _get_predictions(config: Config, production_data: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+
+def _get_predictions(model_version: ModelVersion, production_data: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+
+    config = model_version.config
 
     # data into raw_data
     ######
     ###
-    raw_data = process_production_input_data_into_raw_data(config, production_data)
-    validate_raw_data_per_instance(raw_data)
+    with serving_metrics.time_stage('process_production_input_data'):
+        raw_data = process_production_input_data_into_raw_data(config, production_data)
+    with serving_metrics.time_stage('validate_raw_data'):
+        validate_raw_data_per_instance(raw_data)
     ###
     ######
 
     ######
     ### Feature engineering
-    feature_processes = get_feature_processes(config)
-    data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes)
-    validate_engineered_data_per_instance(data_x[engineered_feature_columns])
+    with serving_metrics.time_stage('feature_engineering'):
+        feature_processes = get_feature_processes(config)
+        data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes, required_features=model_version.preprocessing_objects.features)
+    with serving_metrics.time_stage('validate_engineered_data'):
+        validate_engineered_data_per_instance(data_x[engineered_feature_columns])
     ###
     ######
 
     ######
     ### Retrieve predictions
-    data_x_processed, _, _ = get_processed_data(config, preprocessing_objects, data_x)
-    predictions, prediction_probas = get_predictions(config, model, data_x_processed)
+    with serving_metrics.time_stage('preprocessing'):
+        data_x_processed, _, _ = get_processed_data(config, model_version.preprocessing_objects, data_x)
+    with serving_metrics.time_stage('prediction'):
+        predictions, prediction_probas = get_predictions(config, model_version.model, data_x_processed)
     ###
     ######
 
     return predictions, prediction_probas
 
 
+def _predict_instance(model_version: ModelVersion, production_data: ProductionData) -> Tuple[Any, np.ndarray]:
+    """
+    Returns the predicted label and the prediction probabilities of a single instance
+    """
+
+    if model_version.compiled_pipeline is not None:
+        with serving_metrics.time_stage('compiled_pipeline'):
+            predictions, prediction_probas = model_version.compiled_pipeline.predict(production_data)
+
+        return predictions[0], prediction_probas[0]
+
+    data = pd.DataFrame.from_dict([vars(production_data)])
+
+    predictions, prediction_probas = _get_predictions(model_version, production_data=data)
+
+    return predictions.values[0], prediction_probas.values[0]
+
+
+def _warmup(model_version: ModelVersion):
+
+    _get_predictions(model_version, pd.DataFrame.from_dict([warmup_production_data.dict()]))
+    if model_version.compiled_pipeline is not None:
+        model_version.compiled_pipeline.predict(warmup_production_data)
+
+
+def _set_prediction_cache_model(model_version: ModelVersion):
+
+    if prediction_cache is not None:
+        prediction_cache.model_identity = model_version.version
+
+
+# Model_object loading, the model manager swaps in newly exported model artifacts at runtime
+model_objects_filepath = get_model_artifacts_filepath()
+model_manager = get_model_manager(project_configs, model_objects_filepath, warmup=_warmup, on_swap=_set_prediction_cache_model)
+model_manager.start_watching()
+
+# Optional cache for predictions of repeatedly requested instances
+prediction_cache = get_prediction_cache(project_configs, model_objects_filepath)
+# keyed by the identity of the loaded model version instead of a separate hash of the artifacts, which may be replaced meanwhile
+_set_prediction_cache_model(model_manager.model_version)
+
+
 @app.route('/predict', methods=["POST"])
 def predict():
 
     # validate and parse request body data
     data_dict: Optional[Dict] = request.get_json()
-    if data_dict is not None and config is not None:
-        data_dict = vars(ProductionData(**data_dict))
+    if data_dict is not None:
+        production_data = ProductionData(**data_dict)
 
-        data = pd.DataFrame.from_dict([data_dict])
+        # the model version is read once, a model swap during the request does not affect it
+        model_version = model_manager.model_version
 
-        prediction = _get_predictions(config, production_data=data)
+        if prediction_cache is not None:
+            prediction_label, prediction_probas_row = prediction_cache.get_or_predict(production_data,
+                                                                                      lambda production_data: _predict_instance(model_version, production_data),
+                                                                                      model_identity=model_version.version)
+        else:
+            prediction_label, prediction_probas_row = _predict_instance(model_version, production_data)
 
         prediction_dict = {
-            'label': int(prediction[0].values[0]),
-            'probas': prediction[1].values[0].tolist(),
+            'label': int(prediction_label),
+            'probas': prediction_probas_row.tolist(),
+            'model_version': model_version.version,
         }
 
-
     else:
-        prediction_dict = {'message': 'An error occurred, either "data_dict" or "config" is None'}
+        prediction_dict = {'message': 'An error occurred, "data_dict" is None'}
+
+    response = flask.jsonify(prediction_dict)
+
+    return response
+
+
+@app.route('/predict_batch', methods=["POST"])
+def predict_batch():
+    """
+    Scores a batch of records, provided as json array or json lines, with a single pass through the prediction pipeline
+    """
+
+    max_batch_size = project_configs.get('MAX_BATCH_SIZE', 10000)
+    try:
+        # oversized requests are rejected by their Content-Length before the body is read
+        check_batch_body_size(request.content_length, max_batch_size)
+        data, row_errors = parse_production_data_bulk(request.get_data(), max_batch_size=max_batch_size)
+    except BatchSizeError as error:
+        return flask.jsonify({'message': str(error)}), 413
+    except (ValueError, TypeError) as error:
+        return flask.jsonify({'message': str(error)}), 400
+
+    if len(row_errors) != 0:
+        return flask.jsonify(get_row_errors_dict(row_errors)), 400
+
+    model_version = model_manager.model_version
+
+    try:
+        predictions, prediction_probas = _get_predictions(model_version, production_data=data)
+    except schema_error_types as error:
+        return flask.jsonify(get_schema_errors_dict(error)), 400
+    prediction_dict = get_batch_prediction_dict(predictions, prediction_probas)
+    prediction_dict['model_version'] = model_version.version
 
     response = flask.jsonify(prediction_dict)
 
     return response
 
 
+@app.route('/prediction_cache_stats', methods=["GET"])
+def prediction_cache_stats():
+
+    if prediction_cache is not None:
+        stats = prediction_cache.get_stats()
+    else:
+        stats = {'message': 'Prediction cache is not enabled'}
+
+    return flask.jsonify(stats)
+
+
+@app.route('/admin/model', methods=["GET"])
+def model_status():
+
+    if not project_configs.get('ENABLE_ADMIN_ENDPOINTS', False):
+        return flask.jsonify({'message': 'Admin endpoints are not enabled'}), 404
+
+    return flask.jsonify(model_manager.get_status())
+
+
+@app.route('/admin/reload', methods=["POST"])
+def reload_model():
+    """
+    Starts loading the model artifacts in the background, the new model version is swapped in once it is loaded and warmed up
+    """
+
+    if not project_configs.get('ENABLE_ADMIN_ENDPOINTS', False):
+        return flask.jsonify({'message': 'Admin endpoints are not enabled'}), 404
+
+    reload_started = model_manager.reload()
+
+    return flask.jsonify({'reload_started': reload_started, **model_manager.get_status()})
+
+
+@app.route('/metrics', methods=["GET"])
+def metrics():
+    """
+    Latency histograms of the prediction pipeline stages and request metrics in the Prometheus text format
+    """
+
+    if not serving_metrics.enabled:
+        return flask.jsonify({'message': 'Serving metrics are not enabled'}), 404
+
+    return Response(serving_metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+if serving_metrics.enabled:
+
+    @app.before_request
+    def start_request_tracking():
+
+        # requests to unknown paths are counted under a single label to bound the number of time series
+        g.metrics_endpoint = request.url_rule.rule if request.url_rule is not None else 'other'
+        g.metrics_start_time = serving_metrics.start_request(g.metrics_endpoint)
+
+    @app.after_request
+    def record_response_status(response):
+
+        g.metrics_failed = response.status_code >= 400
+
+        return response
+
+    @app.teardown_request
+    def end_request_tracking(error):
+
+        if 'metrics_start_time' in g:
+            serving_metrics.end_request(g.metrics_endpoint, g.metrics_start_time, failed=error is not None or g.get('metrics_failed', True))
+
+
 if __name__ == "__main__":
 
     app.run(host='0.0.0.0')
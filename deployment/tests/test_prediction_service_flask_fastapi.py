@@ -76,4 +76,19 @@ def test_predict(server_setup_config):
             logger.info("Response:")
             logger.info(response.content)
 
-            assert response.status_code == 200
\ No newline at end of file
+            assert response.status_code == 200
+
+def test_predict_batch_out_of_range_record(server_setup_config):
+
+    records = retrieve_historic_data(server_setup_config).drop(columns=server_setup_config.target_col).head(3).to_dict(orient='records')
+    records[1]['age'] = -5.
+
+    response = requests.post(server_setup_config.prediction_service_url.replace("/predict", "/predict_batch"), json=records)
+    response_dict = response.json()
+    # fastapi returns the body of an 'HTTPException' under the key 'detail'
+    row_errors = response_dict.get('detail', response_dict)['row_errors']
+
+    assert all([
+        response.status_code == 400,
+        [(row_error['row'], row_error['field']) for row_error in row_errors] == [(1, 'age')],
+    ])
@@ -0,0 +1,284 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandera.errors import SchemaError, SchemaErrors
+
+from ml_project.data_validation import ProductionData
+
+try:
+    # faster json decoder, the standard library decoder is used if it is not installed
+    import orjson
+except ImportError:
+    orjson = None
+
+# arrow types into which the columns of the 'ProductionData' fields are converted in bulk, they become the pandas dtypes int64, float64 and object
+# of single instances parsed via 'ProductionData'
+production_data_arrow_types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+
+# marks a field missing in a record
+missing_value = object()
+
+# errors of the data validation of the prediction pipeline for records that are well-typed but fail a check, e.g. a value range
+schema_error_types = (SchemaError, SchemaErrors)
+
+# upper bound of the size of a json record of production data (about 150 bytes), a request body larger than 'max_batch_size' of these
+# is rejected before it is read and decoded
+max_record_size_bytes = 1024
+
+
+class BatchSizeError(ValueError):
+    """
+    Raised if a batch request contains more records than the configured maximum batch size
+    """
+
+
+@dataclass
+class RowError:
+
+    row: int  # position of the record in the batch
+    field: Optional[str]  # None for records that are no json object
+    message: str
+
+
+def check_batch_body_size(body_size: Optional[int], max_batch_size: Optional[int]):
+    """
+    Raises a 'BatchSizeError' if a batch request body of 'body_size' bytes (e.g. its Content-Length, None if unknown) can not hold
+    at most 'max_batch_size' records, so that oversized requests are rejected without decoding them
+    """
+
+    if body_size is not None and max_batch_size is not None and body_size > max_batch_size * max_record_size_bytes:
+        raise(BatchSizeError(f"Batch request body has {body_size} bytes, the maximum for the maximum batch size of {max_batch_size} is {max_batch_size * max_record_size_bytes}"))
+
+
+def loads_json(payload: Union[str, bytes]) -> Any:
+
+    if orjson is not None:
+        return orjson.loads(payload)
+
+    return json.loads(payload)
+
+
+def parse_batch_records(body: Union[str, bytes, List, Dict], max_batch_size: Optional[int] = None) -> List[Dict]:
+    """
+    Parses the records of a batch request body that is either a json array of records, a json object containing the records
+    under the key 'instances', or json lines with one record per line. Bodies too large for 'max_batch_size' records are rejected before decoding.
+    """
+
+    if isinstance(body, (str, bytes)):
+        check_batch_body_size(len(body), max_batch_size)
+        try:
+            parsed_body: Any = loads_json(body)
+        except ValueError:
+            parsed_body = [loads_json(line) for line in body.splitlines() if len(line.strip()) != 0]
+    else:
+        parsed_body = body
+
+    if isinstance(parsed_body, dict):
+        parsed_body = parsed_body['instances'] if 'instances' in parsed_body else [parsed_body]
+
+    if not isinstance(parsed_body, list):
+        raise(ValueError(f"Batch request body has to contain a list of records, got {type(parsed_body)}"))
+
+    return parsed_body
+
+
+def get_production_data_batch(records: List[Dict], max_batch_size: Optional[int] = None) -> pd.DataFrame:
+    """
+    Builds one production data DataFrame from a list of records with the columns and dtypes of 'ProductionData', raises a ValueError
+    listing the invalid records if there are any. The content of the records is validated in bulk by the data validation of the prediction pipeline.
+    """
+
+    if len(records) == 0:
+        raise(ValueError("Batch request does not contain any records"))
+
+    if max_batch_size is not None and len(records) > max_batch_size:
+        raise(BatchSizeError(f"Batch request contains {len(records)} records, the maximum batch size is {max_batch_size}"))
+
+    production_data, row_errors = parse_production_data_columns(records)
+    if len(row_errors) != 0:
+        raise(ValueError(get_row_errors_message(row_errors)))
+
+    return production_data
+
+
+def decode_batch_records(body: Union[str, bytes]) -> Tuple[List[Any], List[RowError]]:
+    """
+    Decodes the records of a batch request body like 'parse_batch_records' with the fastest available json decoder.
+    Json lines are decoded as one json array, only if that fails they are decoded line by line, and lines that are no valid json
+    are returned as row errors instead of failing the whole batch.
+    """
+
+    body_bytes = body.encode() if isinstance(body, str) else body
+
+    try:
+        parsed_body: Any = loads_json(body_bytes)
+    except ValueError:
+        lines = [line for line in body_bytes.splitlines() if len(line.strip()) != 0]
+        try:
+            return loads_json(b"[" + b",".join(lines) + b"]"), []
+        except ValueError:
+            pass
+
+        records: List[Any] = []
+        row_errors = []
+        for row, line in enumerate(lines):
+            try:
+                records.append(loads_json(line))
+            except ValueError as error:
+                records.append(None)
+                row_errors.append(RowError(row=row, field=None, message=f"invalid json: {error}"))
+        return records, row_errors
+
+    return parse_batch_records(parsed_body), []
+
+
+def get_field_column(records: List[Any], field_name: str, field: Any, record_mask: np.ndarray) -> Tuple[pa.Array, List[RowError]]:
+    """
+    Converts the values of a 'ProductionData' field of all records into one typed arrow array. The conversion runs in bulk in arrow,
+    only if it fails (e.g. for missing values or strings of numbers) the values are converted one by one with the validator of the pydantic field,
+    which yields the same values as 'ProductionData' and the rows with invalid values. Values of invalid rows are null.
+    """
+
+    arrow_type = production_data_arrow_types[field.outer_type_]
+    values = [record.get(field_name) if is_record else None for record, is_record in zip(records, record_mask)]
+
+    try:
+        column = pa.array(values, type=arrow_type)
+        if column.null_count == (~record_mask).sum():
+            return column, []
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        pass
+
+    row_errors = []
+    converted_values: List[Any] = [None] * len(records)
+    for row, (record, is_record) in enumerate(zip(records, record_mask)):
+        if not is_record:
+            continue
+
+        value = record.get(field_name, missing_value)
+        if value is missing_value:
+            row_errors.append(RowError(row=row, field=field_name, message="field required"))
+            continue
+
+        converted_value, error = field.validate(value, {}, loc=field_name, cls=ProductionData)
+        if error is not None:
+            row_errors.append(RowError(row=row, field=field_name, message=str(error.exc)))
+        elif arrow_type == pa.int64() and not -2 ** 63 <= converted_value < 2 ** 63:
+            row_errors.append(RowError(row=row, field=field_name, message="value is out of the range of int64"))
+        else:
+            converted_values[row] = converted_value
+
+    return pa.array(converted_values, type=arrow_type), row_errors
+
+
+def parse_production_data_columns(records: List[Any]) -> Tuple[pd.DataFrame, List[RowError]]:
+    """
+    Converts records into production data column by column, without building a 'ProductionData' object per record.
+    Returns the valid records with the columns and dtypes of 'ProductionData', indexed by their position in 'records',
+    and the errors of the invalid records sorted by their position.
+    """
+
+    record_mask = np.fromiter((type(record) is dict for record in records), dtype=bool, count=len(records))
+    row_errors = [RowError(row=row, field=None, message="record is no json object") for row in np.flatnonzero(~record_mask).tolist()]
+
+    columns = {}
+    for field_name, field in ProductionData.__fields__.items():
+        columns[field_name], field_row_errors = get_field_column(records, field_name, field, record_mask)
+        row_errors.extend(field_row_errors)
+
+    table = pa.table(columns)
+    valid_mask = record_mask.copy()
+    valid_mask[[row_error.row for row_error in row_errors]] = False
+    if valid_mask.all():
+        return table.to_pandas(), []
+
+    production_data = table.filter(pa.array(valid_mask)).to_pandas()
+    production_data.index = np.flatnonzero(valid_mask)
+
+    return production_data, sorted(row_errors, key=lambda row_error: row_error.row)
+
+
+def get_row_errors_message(row_errors: List[RowError], max_n_row_errors: int = 10) -> str:
+
+    return f"Batch request contains {len({row_error.row for row_error in row_errors})} invalid records: " + \
+        ", ".join([f"row {row_error.row}" + (f" field '{row_error.field}'" if row_error.field is not None else "") + f": {row_error.message}"
+                   for row_error in row_errors[:max_n_row_errors]]) + (", ..." if len(row_errors) > max_n_row_errors else "")
+
+
+def get_row_errors_dict(row_errors: List[RowError]) -> Dict[str, Any]:
+
+    return {'message': get_row_errors_message(row_errors), 'row_errors': [vars(row_error) for row_error in row_errors]}
+
+
+def get_schema_row_errors(error: Union[SchemaError, SchemaErrors]) -> List[RowError]:
+    """
+    Row errors of the records failing a check of the raw or engineered data schema, by the index of the production data,
+    which is the position of a record in the batch
+    """
+
+    failure_cases = error.failure_cases
+    if not isinstance(failure_cases, pd.DataFrame) or 'index' not in failure_cases:
+        return []
+
+    if isinstance(error, SchemaErrors):
+        failure_fields = failure_cases['column'].tolist()
+        failure_checks = failure_cases['check'].astype(str).tolist()
+    else:
+        failure_fields = [getattr(error.schema, 'name', None)] * len(failure_cases)
+        failure_checks = [str(getattr(error.check, 'error', None) or error.check)] * len(failure_cases)
+
+    row_errors = [RowError(row=int(row), field=field, message=f"failed check {check} with value {failure_case!r}")
+                  for row, field, check, failure_case in zip(failure_cases['index'].tolist(), failure_fields, failure_checks, failure_cases['failure_case'].tolist())
+                  if not pd.isna(row)]
+
+    return sorted(row_errors, key=lambda row_error: row_error.row)
+
+
+def get_schema_errors_dict(error: Union[SchemaError, SchemaErrors]) -> Dict[str, Any]:
+    """
+    Body of the 400 response to a batch whose records fail the data validation of the prediction pipeline
+    """
+
+    row_errors = get_schema_row_errors(error)
+    if len(row_errors) == 0:
+        return {'message': str(error)}
+
+    return get_row_errors_dict(row_errors)
+
+
+def parse_production_data_bulk(body: Union[str, bytes], max_batch_size: Optional[int] = None) -> Tuple[pd.DataFrame, List[RowError]]:
+    """
+    Parses a batch request body (json array, json object with 'instances' or json lines) straight into production data,
+    returns the valid records and the errors of the invalid records with their positions in the batch.
+    Bodies too large for 'max_batch_size' records are rejected before decoding, the number of records is checked after decoding.
+    """
+
+    check_batch_body_size(len(body), max_batch_size)
+    records, decoding_row_errors = decode_batch_records(body)
+
+    if len(records) == 0:
+        raise(ValueError("Batch request does not contain any records"))
+
+    if max_batch_size is not None and len(records) > max_batch_size:
+        raise(BatchSizeError(f"Batch request contains {len(records)} records, the maximum batch size is {max_batch_size}"))
+
+    production_data, row_errors = parse_production_data_columns(records)
+    # records that are no valid json are reported with their decoding error only
+    decoding_error_rows = {row_error.row for row_error in decoding_row_errors}
+    row_errors = sorted(decoding_row_errors + [row_error for row_error in row_errors if row_error.row not in decoding_error_rows], key=lambda row_error: row_error.row)
+
+    return production_data, row_errors
+
+
+def get_batch_prediction_dict(predictions: pd.Series, prediction_probas: pd.DataFrame) -> Dict[str, List]:
+
+    prediction_dict = {
+        'labels': predictions.values.tolist(),
+        'probas': prediction_probas.values.tolist(),
+    }
+
+    return prediction_dict
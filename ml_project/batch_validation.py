@@ -0,0 +1,204 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pandera as pa
+
+from ml_project.dtype_optimisation import get_check_statistics
+
+logger = logging.getLogger('standard')
+
+# columns of the report of 'validate_as_batch', one row per check
+report_columns = ['column', 'check', 'expected', 'observed', 'n_failures', 'n_checked_rows', 'passed', 'failure_examples']
+
+# number of failing values listed per check in the report
+n_failure_examples = 5
+
+
+@dataclass
+class ColumnExpectations:
+
+    dtype_kind: str  # 'int', 'float', 'str' or 'bool'
+    nullable: bool = True
+    required: bool = True
+    min_value: Optional[Any] = None
+    max_value: Optional[Any] = None
+    allowed_values: Optional[List[Any]] = None
+    max_null_rate: Optional[float] = None  # nullable columns only, None allows any share of missing values
+
+
+def get_column_expectations(schema: pa.DataFrameSchema, max_null_rate: Optional[float] = None) -> Dict[str, ColumnExpectations]:
+    """
+    Expectations of the columns of a pandera schema: the kind of its dtype, its nullability and the statistics of its range and isin checks
+    """
+
+    column_expectations = {}
+    for column_name, column in schema.columns.items():
+        check_statistics = get_check_statistics(column)
+        column_expectations[column_name] = ColumnExpectations(dtype_kind=str(column.dtype).rstrip('0123456789'),
+                                                              nullable=column.nullable,
+                                                              required=column.required,
+                                                              min_value=check_statistics.get('min_value'),
+                                                              max_value=check_statistics.get('max_value'),
+                                                              allowed_values=check_statistics.get('allowed_values'),
+                                                              max_null_rate=max_null_rate if column.nullable else None,
+                                                              )
+
+    return column_expectations
+
+
+def has_dtype_kind(series: pd.Series, dtype_kind: str) -> bool:
+    """
+    Whether the dtype of 'series' is of 'dtype_kind', independent of its width, e.g. int8 and int64 are both of kind 'int'
+    """
+
+    if dtype_kind == 'int':
+        return pd.api.types.is_integer_dtype(series.dtype)
+    if dtype_kind == 'float':
+        return pd.api.types.is_float_dtype(series.dtype)
+    if dtype_kind == 'bool':
+        return pd.api.types.is_bool_dtype(series.dtype)
+
+    return pd.api.types.is_string_dtype(series.dtype) or isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def get_check_result(column: str, check: str, expected: Any, observed: Any, failures: Optional[pd.Series] = None, n_failures: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Row of the report, 'failures' are the failing values of a check, of which the number and a few examples are reported
+    """
+
+    if failures is not None:
+        n_failures = len(failures)
+
+    return {
+        'column': column,
+        'check': check,
+        'expected': expected,
+        'observed': observed,
+        'n_failures': int(n_failures or 0),
+        'passed': n_failures == 0,
+        'failure_examples': failures.unique()[:n_failure_examples].tolist() if failures is not None else [],
+    }
+
+
+def get_column_check_results(column_name: str, series: pd.Series, column_expectations: ColumnExpectations) -> List[Dict[str, Any]]:
+    """
+    Runs all checks of a column on its values, each check is one vectorised operation over the column
+    """
+
+    if not has_dtype_kind(series, column_expectations.dtype_kind):
+        # the value checks are skipped, since values of another dtype are not comparable to the expected ones
+        return [get_check_result(column_name, 'dtype', column_expectations.dtype_kind, str(series.dtype), n_failures=len(series))]
+
+    check_results = [get_check_result(column_name, 'dtype', column_expectations.dtype_kind, str(series.dtype), n_failures=0)]
+
+    if series.dtype == object:
+        # the strings are hashed once into integer codes, on which the null and allowed values checks are cheap comparisons
+        codes, uniques = pd.factorize(series)
+        series = pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=series.index)
+
+    null_mask = series.isna().to_numpy()
+    n_nulls = int(null_mask.sum())
+    null_rate = n_nulls / len(series) if len(series) != 0 else 0.
+    if not column_expectations.nullable:
+        check_results.append(get_check_result(column_name, 'not_nullable', 0, n_nulls, n_failures=n_nulls))
+    elif column_expectations.max_null_rate is not None:
+        check_results.append(get_check_result(column_name, 'max_null_rate', column_expectations.max_null_rate, null_rate,
+                                              n_failures=n_nulls if null_rate > column_expectations.max_null_rate else 0))
+
+    values = series[~null_mask] if n_nulls != 0 else series
+
+    if column_expectations.min_value is not None:
+        failures = values[values.to_numpy() < column_expectations.min_value]
+        check_results.append(get_check_result(column_name, 'min_value', column_expectations.min_value, values.min() if len(values) != 0 else None, failures))
+
+    if column_expectations.max_value is not None:
+        failures = values[values.to_numpy() > column_expectations.max_value]
+        check_results.append(get_check_result(column_name, 'max_value', column_expectations.max_value, values.max() if len(values) != 0 else None, failures))
+
+    if column_expectations.allowed_values is not None:
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # only the categories are compared to the allowed values, the rows are selected via the integer codes
+            disallowed_categories = ~values.cat.categories.isin(column_expectations.allowed_values)
+            failures = values[disallowed_categories[values.cat.codes.to_numpy()]].astype(object)
+        else:
+            failures = values[~values.isin(column_expectations.allowed_values).to_numpy()]
+        check_results.append(get_check_result(column_name, 'allowed_values', column_expectations.allowed_values,
+                                              failures.unique()[:n_failure_examples].tolist(), failures))
+
+    return check_results
+
+
+def get_dataset_check_results(data: pd.DataFrame, n_rows: int, min_n_rows: int, target_col: Optional[str], min_n_target_classes: Optional[int]) -> List[Dict[str, Any]]:
+    """
+    Checks of the dataset as a whole: its number of rows, the uniqueness of its index and the number of classes of the target
+    """
+
+    n_duplicated_index_values = 0 if data.index.is_unique else int(data.index.duplicated().sum())
+    check_results = [
+        get_check_result('', 'min_n_rows', min_n_rows, n_rows, n_failures=0 if n_rows >= min_n_rows else 1),
+        get_check_result('', 'unique_index', 0, n_duplicated_index_values, n_failures=n_duplicated_index_values),
+    ]
+
+    if target_col is not None and min_n_target_classes is not None and target_col in data.columns:
+        n_target_classes = int(data[target_col].nunique())
+        check_results.append(get_check_result(target_col, 'min_n_target_classes', min_n_target_classes, n_target_classes,
+                                              n_failures=0 if n_target_classes >= min_n_target_classes else 1))
+
+    return check_results
+
+
+def validate_as_batch(data: pd.DataFrame,
+                      schemas: List[pa.DataFrameSchema],
+                      sample_size: Optional[int] = None,
+                      max_null_rate: Optional[float] = None,
+                      min_n_rows: int = 1,
+                      target_col: Optional[str] = None,
+                      min_n_target_classes: Optional[int] = None,
+                      random_state: int = 0,
+                      ) -> pd.DataFrame:
+    """
+    Validates 'data' against the column checks of 'schemas' (dtype kind, nullability, value range and allowed values) and the dataset checks
+    of 'get_dataset_check_results', and returns a report with one row per check instead of raising on the first failure.
+    If 'data' has more than 'sample_size' rows, the column checks run on a random sample of 'sample_size' rows, i.e. their failure counts
+    are the ones of the sample.
+    """
+
+    column_expectations: Dict[str, ColumnExpectations] = {}
+    for schema in schemas:
+        column_expectations.update(get_column_expectations(schema, max_null_rate))
+
+    checked_data = data
+    if sample_size is not None and len(data) > sample_size:
+        # numpy samples the positions without permuting all rows (unlike 'DataFrame.sample'), sorted for a sequential memory access
+        sampled_positions = np.sort(np.random.default_rng(random_state).choice(len(data), size=sample_size, replace=False))
+        checked_data = data.iloc[sampled_positions]
+        logger.info(f"Batch validation of a sample of {sample_size} of {len(data)} rows")
+
+    dataset_check_results = get_dataset_check_results(data, len(data), min_n_rows, target_col, min_n_target_classes)
+    for dataset_check_result in dataset_check_results:
+        dataset_check_result['n_checked_rows'] = len(data)
+
+    check_results = []
+    for column_name, expectations in column_expectations.items():
+        if column_name not in checked_data.columns:
+            if expectations.required:
+                check_results.append(get_check_result(column_name, 'required', True, False, n_failures=len(checked_data)))
+            continue
+        check_results.extend(get_column_check_results(column_name, checked_data[column_name], expectations))
+    for check_result in check_results:
+        check_result['n_checked_rows'] = len(checked_data)
+
+    return pd.DataFrame(dataset_check_results + check_results, columns=report_columns)
+
+
+def log_validation_report(report: pd.DataFrame):
+
+    failed_checks = report[~report['passed']]
+    for _, check_result in failed_checks.iterrows():
+        logger.warning(f"Failed check '{check_result['check']}' of column '{check_result['column']}': expected {check_result['expected']}, observed {check_result['observed']}, "
+                       f"{check_result['n_failures']} of {check_result['n_checked_rows']} rows failed, e.g. {check_result['failure_examples']}")
+
+    logger.info(f"Batch validation: {len(report) - len(failed_checks)} of {len(report)} checks passed")
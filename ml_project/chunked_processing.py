@@ -0,0 +1,147 @@
+import logging
+import os
+from typing import Any, Iterator, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ml_project.config import Config
+from ml_project.data_validation import raw_data_schema, validate_engineered_data_per_instance, validate_raw_data_per_instance
+from ml_project.dtype_optimisation import optimise_dtypes
+from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
+from ml_project.historic_data_retrieval import get_cont_cols_fill_values_from_chunks, process_historic_data_into_raw_data, retrieve_historic_data_chunks
+from ml_project.modelling_process.data_processing import PreprocessingObjects, get_processed_data
+from ml_project.modelling_process.modelling_process import split_features_and_target
+from ml_project.prediction_process import get_predictions
+
+logger = logging.getLogger('standard')
+
+# prefix of the columns holding the prediction probabilities of each class in the chunked prediction output
+proba_col_prefix = 'proba_'
+
+
+class ParquetChunkWriter:
+    """
+    Appends DataFrame chunks as row groups to one parquet file, the schema of the file is taken from the first chunk
+    """
+
+    def __init__(self, filepath_parquet: str):
+
+        self.filepath_parquet = filepath_parquet
+        self.n_rows = 0
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def write(self, chunk: pd.DataFrame):
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+
+        if self._writer is None:
+            folderpath = os.path.dirname(self.filepath_parquet)
+            if folderpath:
+                os.makedirs(folderpath, exist_ok=True)
+            self._writer = pq.ParquetWriter(self.filepath_parquet, table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+
+        self._writer.write_table(table)
+        self.n_rows += len(chunk)
+
+    def close(self):
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def get_chunked_raw_data(config: Config, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Yields the historic data as validated raw data in chunks of at most 'chunk_size' rows.
+    The NaN fill values of the continuous columns are computed from the global minima in a first pass over these columns,
+    thus the chunks are imputed exactly as the historic data as a whole.
+    With 'config.historic_data_compact_dtypes', the chunks are converted into the compact dtypes of the raw data schema, which are the same for all chunks.
+    """
+
+    cont_cols_fill_values = get_cont_cols_fill_values_from_chunks(config, retrieve_historic_data_chunks(config, chunk_size, columns=config.cont_cols))
+
+    for historic_data_chunk in retrieve_historic_data_chunks(config, chunk_size):
+        raw_data_chunk = process_historic_data_into_raw_data(config, historic_data_chunk, cont_cols_fill_values)
+        validate_raw_data_per_instance(raw_data_chunk)
+        if config.historic_data_compact_dtypes:
+            raw_data_chunk = optimise_dtypes(raw_data_chunk, raw_data_schema)
+
+        yield raw_data_chunk
+
+
+def execute_chunked_feature_engineering(config: Config, output_filepath: str, chunk_size: int) -> int:
+    """
+    Retrieves, validates and feature engineers the historic data chunk by chunk and writes the engineered data to 'output_filepath',
+    returns the number of written rows
+    """
+
+    feature_processes = get_feature_processes(config)
+
+    with ParquetChunkWriter(output_filepath) as writer:
+        for raw_data_chunk in get_chunked_raw_data(config, chunk_size):
+            engineered_data_chunk, engineered_feature_columns = execute_feature_engineering(config, raw_data_chunk, feature_processes)
+            validate_engineered_data_per_instance(engineered_data_chunk[engineered_feature_columns], compact_dtypes=config.historic_data_compact_dtypes)
+
+            writer.write(engineered_data_chunk)
+
+    logger.info(f"Wrote {writer.n_rows} rows of engineered data to {output_filepath}")
+
+    return writer.n_rows
+
+
+def get_prediction_output(config: Config, target_data: pd.Series, predictions: pd.Series, prediction_probas: pd.DataFrame) -> pd.DataFrame:
+
+    prediction_output = pd.DataFrame({config.target_col: target_data, 'prediction': predictions}, index=predictions.index)
+    for class_index in prediction_probas.columns:
+        prediction_output[f"{proba_col_prefix}{class_index}"] = prediction_probas[class_index]
+
+    return prediction_output
+
+
+def execute_chunked_historic_predictions(config: Config, model: Any, preprocessing_objects: PreprocessingObjects, output_filepath: str, chunk_size: int) -> int:
+    """
+    Runs the historic data chunk by chunk through validation, feature engineering, preprocessing and prediction and writes the target,
+    the predictions and the prediction probabilities to 'output_filepath', returns the number of written rows.
+    Only one chunk is held in memory at a time.
+    """
+
+    feature_processes = get_feature_processes(config)
+
+    with ParquetChunkWriter(output_filepath) as writer:
+        for raw_data_chunk in get_chunked_raw_data(config, chunk_size):
+            test_data_chunk, engineered_feature_columns = execute_feature_engineering(config, raw_data_chunk, feature_processes, required_features=preprocessing_objects.features)
+            validate_engineered_data_per_instance(test_data_chunk[engineered_feature_columns], compact_dtypes=config.historic_data_compact_dtypes)
+
+            test_data_x, test_data_y = split_features_and_target(config, test_data_chunk)
+            test_data_x_prepared, _, _ = get_processed_data(config, preprocessing_objects, test_data_x)
+            predictions, prediction_probas = get_predictions(config, model, test_data_x_prepared)
+
+            writer.write(get_prediction_output(config, test_data_y, predictions, prediction_probas))
+
+    logger.info(f"Wrote {writer.n_rows} predictions to {output_filepath}")
+
+    return writer.n_rows
+
+
+def read_chunked_predictions(config: Config, filepath_parquet: str) -> Tuple[pd.Series, pd.Series, pd.DataFrame]:
+    """
+    Reads the target, the predictions and the prediction probabilities (with the class indexes as columns, as returned by 'get_predictions')
+    from the output of 'execute_chunked_historic_predictions'
+    """
+
+    prediction_output = pd.read_parquet(filepath_parquet)
+
+    proba_cols = [column for column in prediction_output.columns if column.startswith(proba_col_prefix)]
+    prediction_probas = prediction_output[proba_cols].rename(columns={column: int(column[len(proba_col_prefix):]) for column in proba_cols})
+
+    return prediction_output[config.target_col], prediction_output['prediction'], prediction_probas
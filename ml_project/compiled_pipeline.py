@@ -0,0 +1,198 @@
+import copy
+import logging
+import threading
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from ml_project.config import Config
+from ml_project.compiled_validation import CompiledValidator
+from ml_project.data_validation import ProductionData, compiled_engineered_data_validator, compiled_raw_data_validator
+from ml_project.feature_engineering.feature_dag import FeatureDag
+from ml_project.feature_engineering.feature_engineering import get_feature_processes, get_required_columns
+from ml_project.mmap_artifacts import MappedRandomForestClassifier
+from ml_project.modelling_process.data_processing import PreprocessingObjects
+
+logger = logging.getLogger('standard')
+
+
+def get_numpy_scalar(value: Any) -> Any:
+    """
+    Converts a Python int or float to the numpy scalar of the dtype of its pandas column, other values are returned as they are
+    """
+
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return np.int64(value)
+    if isinstance(value, float):
+        return np.float64(value)
+
+    return value
+
+
+def get_model_without_feature_names(model: Any) -> Any:
+    """
+    Returns a shallow copy of a model fitted on named features without its fitted 'feature_names_in_', i.e. as if it was fitted
+    on an array, which sklearn does not check for feature names. The fitted parameters (e.g. the trees of a forest) are shared.
+    """
+
+    if 'feature_names_in_' not in vars(model):
+        return model
+
+    model_without_feature_names = copy.copy(model)
+    del model_without_feature_names.feature_names_in_
+
+    return model_without_feature_names
+
+
+class CompiledPipeline:
+    """
+    Single-instance prediction path that is compiled once from the loaded model artifacts.
+    A validated 'ProductionData' instance is mapped straight into a preallocated numpy row in 'preprocessing_objects.features' order,
+    bypassing the one-row DataFrame, the pandas feature engineering and the one-hot encoding joins of the standard prediction path.
+    """
+
+    def __init__(self,
+                 config: Config,
+                 model: Any,
+                 preprocessing_objects: PreprocessingObjects,
+                 feature_processes: List,
+                 validate_data: bool = True,
+                 ):
+
+        self.config = config
+        self.model = model
+        self.preprocessing_objects = preprocessing_objects
+        self.validate_data = validate_data
+
+        if preprocessing_objects.features is None:
+            raise(Exception("Pipeline can not be compiled, 'preprocessing_objects.features' is None"))
+
+        self.features = preprocessing_objects.features
+        self.raw_columns = list(config.features)
+
+        # only the processes the model features depend on, in the order of their dependencies
+        feature_dag = FeatureDag(feature_processes)
+        required_positions = feature_dag.get_required_positions(get_required_columns(config, self.features))
+        self.feature_processes = [feature_processes[position] for position in feature_dag.order if position in required_positions]
+        self.engineered_columns = [column for feature_process in self.feature_processes for column in feature_process.output_columns]
+
+        feature_positions = {feature: position for position, feature in enumerate(self.features)}
+        compiled_features = set()
+
+        # continuous and engineered columns are copied into the row as they are
+        self._value_positions: List[Tuple[str, int]] = []
+        for column in self.raw_columns + self.engineered_columns:
+            if column in feature_positions and column not in config.cat_cols:
+                self._value_positions.append((column, feature_positions[column]))
+                compiled_features.add(column)
+
+        # categorical columns set the row position of their one-hot encoded category
+        one_hot_encoders = preprocessing_objects.one_hot_encoders or {}
+        self._category_positions: Dict[str, Dict[Any, int]] = {}
+        for cat_col in config.cat_cols:
+            one_hot_encoder = one_hot_encoders[cat_col]
+            category_positions = {}
+            for category in one_hot_encoder.categories_[0].tolist():
+                one_hot_encoded_column_name = f"{cat_col}_{category}"
+                category_positions[category] = feature_positions[one_hot_encoded_column_name]
+                compiled_features.add(one_hot_encoded_column_name)
+            self._category_positions[cat_col] = category_positions
+
+        missing_features = [feature for feature in self.features if feature not in compiled_features]
+        if len(missing_features) != 0:
+            raise(Exception(f"Pipeline can not be compiled, no mapping found for features {missing_features}"))
+
+        # labels of forests equal the argmax of their probabilities, which saves a second pass through all trees
+        self._labels_from_probas = isinstance(model, (RandomForestClassifier, MappedRandomForestClassifier))
+
+        if list(getattr(model, 'feature_names_in_', self.features)) != self.features:
+            raise(Exception("Pipeline can not be compiled, model was fitted on a different feature order"))
+        # the row has the exact feature order the model was fitted on, so the model is called without the check of the feature names
+        # (and its warning for the unnamed row), instead of changing the process-wide warning filters per call from several threads
+        self._row_model = get_model_without_feature_names(model)
+
+        self._row_buffers = threading.local()
+
+    def _get_row_buffer(self) -> np.ndarray:
+
+        row = getattr(self._row_buffers, 'row', None)
+        if row is None:
+            row = np.zeros((1, len(self.features)), dtype=np.float64)
+            self._row_buffers.row = row
+        else:
+            row.fill(0.)
+
+        return row
+
+    def _validate(self, values: Dict[str, Any], columns: List[str], validator: CompiledValidator):
+
+        # scalar comparisons for valid instances, the pandera schema on a one-row DataFrame raises the error of invalid ones
+        validator.validate_values({column: values[column] for column in columns})
+
+    def get_engineered_values(self, production_data: ProductionData) -> Dict[str, Any]:
+        """
+        Returns the raw and engineered feature values of a single instance as scalars
+        """
+
+        values = production_data.dict()
+
+        if self.validate_data:
+            self._validate(values, self.raw_columns, compiled_raw_data_validator)
+
+        # feature processes only use column access and arithmetics, thus they work on a dict of scalars as well. As numpy scalars, the
+        # arithmetics follow the numpy rules of the pandas columns, e.g. a division by zero gives inf or NaN instead of raising
+        values = {column: get_numpy_scalar(value) for column, value in values.items()}
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            for feature_process in self.feature_processes:
+                values = feature_process.execute(values)
+
+        if self.validate_data:
+            self._validate(values, self.engineered_columns, compiled_engineered_data_validator)
+
+        return values
+
+    def fill_row(self, values: Dict[str, Any], row: np.ndarray):
+        """
+        Writes the raw and engineered 'values' of an instance into 'row' in the order of 'preprocessing_objects.features'
+        """
+
+        for column, position in self._value_positions:
+            row[0, position] = values[column]
+
+        for cat_col, category_positions in self._category_positions.items():
+            category = values[cat_col]
+            if category not in category_positions:
+                # same behaviour as the 'OneHotEncoder' with handle_unknown='error' in the standard path
+                raise(ValueError(f"Found unknown categories [{category!r}] in column '{cat_col}' during transform"))
+            row[0, category_positions[category]] = 1.
+
+    def predict(self, production_data: ProductionData) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the predicted label of shape (1,) and the prediction probabilities of shape (1, n_classes) of a single instance
+        """
+
+        values = self.get_engineered_values(production_data)
+
+        row = self._get_row_buffer()
+        self.fill_row(values, row)
+
+        prediction_probas = self._row_model.predict_proba(row)
+        if self._labels_from_probas:
+            predictions = self._row_model.classes_.take(np.argmax(prediction_probas, axis=1), axis=0)
+        else:
+            predictions = self._row_model.predict(row)
+
+        return predictions, prediction_probas
+
+
+def get_compiled_pipeline(config: Config, model: Any, preprocessing_objects: PreprocessingObjects) -> CompiledPipeline:
+
+    feature_processes = get_feature_processes(config)
+    compiled_pipeline = CompiledPipeline(config, model, preprocessing_objects, feature_processes)
+
+    logger.info(f"Compiled prediction pipeline for {len(compiled_pipeline.features)} features")
+
+    return compiled_pipeline
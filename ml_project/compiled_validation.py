@@ -0,0 +1,147 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pandera as pa
+
+from ml_project.dtype_optimisation import get_check_statistics
+
+# python and numpy scalar types of a schema dtype that become a column of exactly this dtype in a DataFrame
+scalar_types: Dict[str, Tuple[type, ...]] = {
+    'int64': (int, np.int64),
+    'float64': (float, np.float64),
+    'str': (str,),
+}
+
+
+@dataclass
+class CompiledColumnChecks:
+
+    column: str
+    dtype: str
+    nullable: bool
+    required: bool
+    min_value: Optional[Any]
+    max_value: Optional[Any]
+    allowed_values: Optional[FrozenSet[Any]]
+
+
+class CompiledValidator:
+    """
+    Validator compiled once from a pandera schema into plain comparisons and set lookups, on the scalars of a single instance or on the numpy
+    arrays of a DataFrame. It only decides whether data is accepted: everything it does not accept (including inputs it is not sure about,
+    e.g. None values) is passed to the pandera schema, which raises its usual error. Thus accept/reject decisions and error messages are the ones
+    of the schema, while valid data never reaches pandera.
+    """
+
+    def __init__(self, schema: pa.DataFrameSchema):
+
+        self.schema = schema
+
+        unsupported_dtypes = [str(column.dtype) for column in schema.columns.values() if str(column.dtype) not in scalar_types]
+        if schema.strict or schema.coerce or len(schema.checks) != 0 or len(unsupported_dtypes) != 0:
+            raise(Exception(f"Schema can not be compiled, only non-strict schemas with column checks of dtypes {list(scalar_types)} are supported"))
+
+        self._column_checks: List[CompiledColumnChecks] = []
+        for column_name, column in schema.columns.items():
+            check_statistics = get_check_statistics(column)
+            unsupported_checks = [check.name for check in column.checks if check.name not in ['greater_than_or_equal_to', 'less_than_or_equal_to', 'isin']]
+            if column.coerce or column.unique or len(unsupported_checks) != 0:
+                raise(Exception(f"Column '{column_name}' can not be compiled, unsupported checks {unsupported_checks}"))
+
+            self._column_checks.append(CompiledColumnChecks(
+                column=column_name,
+                dtype=str(column.dtype),
+                nullable=column.nullable,
+                required=column.required,
+                min_value=check_statistics.get('min_value'),
+                max_value=check_statistics.get('max_value'),
+                allowed_values=frozenset(check_statistics['allowed_values']) if 'allowed_values' in check_statistics else None,
+            ))
+
+    def accepts_values(self, values: Dict[str, Any]) -> bool:
+        """
+        Whether the one-row DataFrame of the scalar 'values' of an instance is valid
+        """
+
+        for column_checks in self._column_checks:
+            if column_checks.column not in values:
+                if column_checks.required:
+                    return False
+                continue
+
+            value = values[column_checks.column]
+            if type(value) not in scalar_types[column_checks.dtype]:
+                return False
+
+            if column_checks.dtype == 'float64' and math.isnan(value):
+                if not column_checks.nullable:
+                    return False
+                continue
+
+            if column_checks.min_value is not None and not value >= column_checks.min_value:
+                return False
+            if column_checks.max_value is not None and not value <= column_checks.max_value:
+                return False
+            if column_checks.allowed_values is not None and value not in column_checks.allowed_values:
+                return False
+
+        return True
+
+    def accepts_data(self, data: pd.DataFrame) -> bool:
+        """
+        Whether 'data' is valid, the checks of a column run on its numpy array
+        """
+
+        if len(data) == 0:
+            return False
+
+        for column_checks in self._column_checks:
+            if column_checks.column not in data.columns:
+                if column_checks.required:
+                    return False
+                continue
+
+            series = data[column_checks.column]
+            if column_checks.dtype == 'str':
+                # an object column of strings without None values, None values are left to the schema
+                if series.dtype != object or pd.api.types.infer_dtype(series, skipna=False) != 'string':
+                    return False
+                values = series.to_numpy()
+            else:
+                if series.dtype != column_checks.dtype:
+                    return False
+                values = series.to_numpy()
+                if column_checks.dtype == 'float64':
+                    null_mask = np.isnan(values)
+                    if null_mask.any():
+                        if not column_checks.nullable:
+                            return False
+                        values = values[~null_mask]
+
+            if column_checks.min_value is not None and not (values >= column_checks.min_value).all():
+                return False
+            if column_checks.max_value is not None and not (values <= column_checks.max_value).all():
+                return False
+            if column_checks.allowed_values is not None and not column_checks.allowed_values.issuperset(values.tolist()):
+                return False
+
+        return True
+
+    def validate_values(self, values: Dict[str, Any]):
+        """
+        Validates the scalar 'values' of an instance, raises the error of the schema if they are invalid
+        """
+
+        if not self.accepts_values(values):
+            self.schema(pd.DataFrame([values]))
+
+    def validate_data(self, data: pd.DataFrame):
+        """
+        Validates 'data', raises the error of the schema if it is invalid
+        """
+
+        if not self.accepts_data(data):
+            self.schema(data)
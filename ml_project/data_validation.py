@@ -2,6 +2,8 @@ import pandas as pd
 import pandera as pa
 from pydantic import BaseModel
 
+from ml_project.batch_validation import log_validation_report, validate_as_batch
+from ml_project.compiled_validation import CompiledValidator
 from ml_project.config import Config
 
 
@@ -32,19 +34,61 @@ engineered_data_schema = pa.DataFrameSchema({
 })
 
 
-def validate_raw_data_per_instance(raw_data: pd.DataFrame):
+def get_compact_dtypes_schema(schema: pa.DataFrameSchema) -> pa.DataFrameSchema:
+    """
+    Copy of 'schema' for data with the compact dtypes of 'dtype_optimisation' (e.g. int8, float32, category):
+    instead of the exact dtype only the kind of the dtype is checked, the value checks stay the same
+    """
 
-    raw_data_schema(raw_data)
+    dtype_kind_checks = {
+        'int': pa.Check(pd.api.types.is_integer_dtype, element_wise=False, name='is_integer_dtype'),
+        'float': pa.Check(pd.api.types.is_float_dtype, element_wise=False, name='is_float_dtype'),
+        'str': pa.Check(lambda series: pd.api.types.is_string_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype), element_wise=False, name='is_string_dtype'),
+    }
 
+    return schema.update_columns({
+        column_name: {'dtype': None, 'checks': [dtype_kind_checks[str(column.dtype).rstrip('0123456789')]] + column.checks}
+        for column_name, column in schema.columns.items()
+    })
 
-def validate_engineered_data_per_instance(engineered_data: pd.DataFrame):
 
-    engineered_data_schema(engineered_data)
+compact_raw_data_schema = get_compact_dtypes_schema(raw_data_schema)
+compact_engineered_data_schema = get_compact_dtypes_schema(engineered_data_schema)
 
+# valid data is accepted by plain comparisons, pandera only runs on invalid data to raise its error
+compiled_raw_data_validator = CompiledValidator(raw_data_schema)
+compiled_engineered_data_validator = CompiledValidator(engineered_data_schema)
 
 
-def validate_engineered_data_as_batch(config: Config, engineered_data: pd.DataFrame) -> pd.DataFrame:
+def validate_raw_data_per_instance(raw_data: pd.DataFrame, compact_dtypes: bool = False):
+
+    if compact_dtypes:
+        compact_raw_data_schema(raw_data)
+    else:
+        compiled_raw_data_validator.validate_data(raw_data)
+
 
-    # TODO: Apply great_expectations
+def validate_engineered_data_per_instance(engineered_data: pd.DataFrame, compact_dtypes: bool = False):
 
-    pass
\ No newline at end of file
+    if compact_dtypes:
+        compact_engineered_data_schema(engineered_data)
+    else:
+        compiled_engineered_data_validator.validate_data(engineered_data)
+
+
+def validate_engineered_data_as_batch(config: Config, engineered_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Checks the engineered data (including the raw data columns) as a whole against the raw and engineered data schemas and the dataset expectations
+    of modelling data, and returns the report of all checks. Failed checks are logged instead of raised.
+    """
+
+    report = validate_as_batch(engineered_data,
+                               schemas=[raw_data_schema, engineered_data_schema],
+                               sample_size=config.batch_validation_sample_size,
+                               max_null_rate=config.batch_validation_max_null_rate,
+                               target_col=config.target_col,
+                               min_n_target_classes=2,
+                               )
+    log_validation_report(report)
+
+    return report
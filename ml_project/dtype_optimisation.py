@@ -0,0 +1,131 @@
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import pandera as pa
+
+logger = logging.getLogger('standard')
+
+# signed types only, so that differences computed by feature processes do not wrap around
+int_dtypes = [np.int8, np.int16, np.int32, np.int64]
+
+
+def get_check_statistics(column: pa.Column) -> Dict[str, Any]:
+    """
+    Merged statistics of the checks of a schema column, e.g. {'min_value': 0, 'max_value': 5} or {'allowed_values': ['male', 'female']}
+    """
+
+    check_statistics: Dict[str, Any] = {}
+    for check in column.checks:
+        check_statistics.update(check.statistics or {})
+
+    return check_statistics
+
+
+def get_compact_dtype(column: pa.Column) -> Optional[Any]:
+    """
+    Returns the most compact dtype for the values allowed by a schema column, or None if the column is left as it is:
+    - strings with allowed values become a 'category' with these categories
+    - integers become the smallest signed integer type holding the checked value range, or the allowed values
+    - floats with a checked value range become float32, the tree models of sklearn compute on float32 anyway
+    """
+
+    check_statistics = get_check_statistics(column)
+    dtype = str(column.dtype)
+
+    if dtype == 'str':
+        if 'allowed_values' in check_statistics:
+            return pd.CategoricalDtype(categories=sorted(check_statistics['allowed_values']))
+        return 'category'
+
+    if 'allowed_values' in check_statistics:
+        min_value, max_value = min(check_statistics['allowed_values']), max(check_statistics['allowed_values'])
+    elif 'min_value' in check_statistics and 'max_value' in check_statistics:
+        min_value, max_value = check_statistics['min_value'], check_statistics['max_value']
+    else:
+        return None
+
+    if dtype.startswith('int'):
+        return next(int_dtype for int_dtype in int_dtypes if np.iinfo(int_dtype).min <= min_value and max_value <= np.iinfo(int_dtype).max)
+
+    if dtype.startswith('float') and np.finfo(np.float32).min <= min_value and max_value <= np.finfo(np.float32).max:
+        return np.float32
+
+    return None
+
+
+def get_compact_dtypes(schema: pa.DataFrameSchema) -> Dict[str, Any]:
+
+    compact_dtypes = {column_name: get_compact_dtype(column) for column_name, column in schema.columns.items()}
+
+    return {column_name: compact_dtype for column_name, compact_dtype in compact_dtypes.items() if compact_dtype is not None}
+
+
+def is_within_dtype(series: pd.Series, compact_dtype: Any) -> bool:
+    """
+    Whether all values of 'series' are representable in 'compact_dtype', i.e. the conversion does not change any value
+    """
+
+    if isinstance(compact_dtype, pd.CategoricalDtype):
+        return bool(series.dropna().isin(compact_dtype.categories).all())
+
+    if compact_dtype in int_dtypes:
+        if len(series) == 0 or not pd.api.types.is_integer_dtype(series.dtype):
+            return len(series) == 0
+        return bool(np.iinfo(compact_dtype).min <= series.min() and series.max() <= np.iinfo(compact_dtype).max)
+
+    return True
+
+
+def optimise_dtypes(data: pd.DataFrame, schema: pa.DataFrameSchema) -> pd.DataFrame:
+    """
+    Converts the columns of 'data' that are defined in 'schema' into the compact dtypes of 'get_compact_dtypes'.
+    Data is expected to be validated against 'schema' before. Columns with values outside of the compact dtype keep their dtype.
+    """
+
+    compact_dtypes = {}
+    for column_name, compact_dtype in get_compact_dtypes(schema).items():
+        if column_name not in data.columns:
+            continue
+        if not is_within_dtype(data[column_name], compact_dtype):
+            logger.warning(f"Column '{column_name}' has values outside of its schema, keeping dtype {data[column_name].dtype}")
+            continue
+        compact_dtypes[column_name] = compact_dtype
+
+    return data.astype(compact_dtypes)
+
+
+def get_memory_report(data: pd.DataFrame, optimised_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Dtypes and memory of each column before and after 'optimise_dtypes', strings are measured including their python objects
+    """
+
+    memory_report = pd.DataFrame({
+        'dtype': data.dtypes.astype(str),
+        'optimised_dtype': optimised_data.dtypes.astype(str),
+        'memory_bytes': data.memory_usage(index=False, deep=True),
+        'optimised_memory_bytes': optimised_data.memory_usage(index=False, deep=True),
+    })
+    memory_report.loc['total'] = ['', '', memory_report['memory_bytes'].sum(), memory_report['optimised_memory_bytes'].sum()]
+    memory_report['reduction_percentage'] = 100 * (1 - memory_report['optimised_memory_bytes'] / memory_report['memory_bytes'])
+
+    return memory_report
+
+
+def log_memory_report(memory_report: pd.DataFrame):
+
+    for column_name, row in memory_report.iterrows():
+        logger.info(f"{column_name:<25} {row['dtype']:>8} -> {row['optimised_dtype']:<8} {row['memory_bytes'] / 1024:>10.1f} KB -> "
+                    f"{row['optimised_memory_bytes'] / 1024:>10.1f} KB ({row['reduction_percentage']:.1f}% less)")
+
+
+def get_optimised_data(data: pd.DataFrame, schema: pa.DataFrameSchema) -> pd.DataFrame:
+    """
+    'optimise_dtypes' that logs the memory reduction per column
+    """
+
+    optimised_data = optimise_dtypes(data, schema)
+    log_memory_report(get_memory_report(data, optimised_data))
+
+    return optimised_data
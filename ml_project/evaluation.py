@@ -2,7 +2,6 @@ import logging
 from typing import Any, List, Tuple
 
 import pandas as pd
-import shap
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
 
@@ -55,6 +54,7 @@ def get_model_feature_importances(model, feature_names: List[str]) -> pd.DataFra
 def get_shap_feature_importances(model, feature_names: List[str], evaluation_data: pd.DataFrame) -> pd.DataFrame:
 
     if type(model) in [RandomForestClassifier]:
+        import shap  # imported lazily, since shap is only needed for the model evaluation
         explainer = shap.TreeExplainer(model)
     else:
         explainer = None
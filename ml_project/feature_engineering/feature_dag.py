@@ -0,0 +1,199 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from ml_project.feature_engineering.fused_features import FusedFeatureProcesses
+from ml_project.feature_engineering.parallel_features import ChunkedFeatureProcesses
+
+logger = logging.getLogger('standard')
+
+
+def get_process_name(feature_process: Any) -> str:
+
+    return f"{type(feature_process).__name__}({', '.join(feature_process.output_columns)})"
+
+
+class FeatureDag:
+    """
+    Dependency graph of feature processes, built from the 'input_columns' and 'output_columns' they declare: a process depends on the
+    processes producing its input columns, input columns produced by no process are columns of the data. Raises if two processes produce
+    the same column or if the dependencies contain a cycle.
+    """
+
+    def __init__(self, feature_processes: List):
+
+        self.feature_processes = feature_processes
+
+        undeclared_processes = [type(feature_process).__name__ for feature_process in feature_processes
+                                if not hasattr(feature_process, 'input_columns') or not hasattr(feature_process, 'output_columns')]
+        if len(undeclared_processes) != 0:
+            raise(Exception(f"Feature processes {undeclared_processes} do not declare their 'input_columns' and 'output_columns'"))
+
+        # position of the process producing each engineered column
+        self.producers: Dict[str, int] = {}
+        for position, feature_process in enumerate(feature_processes):
+            for column in feature_process.output_columns:
+                if column in self.producers:
+                    raise(Exception(f"Column '{column}' is produced by {get_process_name(feature_processes[self.producers[column]])} and {get_process_name(feature_process)}"))
+                self.producers[column] = position
+
+        self.dependencies: List[List[int]] = [sorted({self.producers[column] for column in feature_process.input_columns if column in self.producers})
+                                              for feature_process in feature_processes]
+
+        self.order = self._get_topological_order()
+
+    def _get_topological_order(self) -> List[int]:
+        """
+        Positions of the processes such that each process comes after its dependencies, otherwise in the order of 'feature_processes'
+        """
+
+        order: List[int] = []
+        states: Dict[int, str] = {}
+
+        def visit(position: int, path: List[int]):
+            if states.get(position) == 'done':
+                return
+            if states.get(position) == 'visiting':
+                cycle = path[path.index(position):] + [position]
+                raise(Exception(f"Feature processes contain a cycle: {' -> '.join([get_process_name(self.feature_processes[cycle_position]) for cycle_position in cycle])}"))
+
+            states[position] = 'visiting'
+            for dependency in self.dependencies[position]:
+                visit(dependency, path + [position])
+            states[position] = 'done'
+            order.append(position)
+
+        for position in range(len(self.feature_processes)):
+            visit(position, [])
+
+        return order
+
+    def get_required_positions(self, required_columns: Optional[Iterable[str]] = None) -> Set[int]:
+        """
+        Positions of the processes producing 'required_columns' and of all processes they depend on, all processes if None
+        """
+
+        if required_columns is None:
+            return set(range(len(self.feature_processes)))
+
+        required_positions: Set[int] = set()
+        unvisited_positions = [self.producers[column] for column in required_columns if column in self.producers]
+        while len(unvisited_positions) != 0:
+            position = unvisited_positions.pop()
+            if position not in required_positions:
+                required_positions.add(position)
+                unvisited_positions.extend(self.dependencies[position])
+
+        return required_positions
+
+    def get_levels(self, positions: Set[int]) -> List[List[int]]:
+        """
+        Groups the processes at 'positions' into levels, each level only depends on the levels before, i.e. the processes of a level are independent
+        """
+
+        process_levels: Dict[int, int] = {}
+        for position in self.order:
+            if position in positions:
+                process_levels[position] = max([process_levels[dependency] + 1 for dependency in self.dependencies[position]], default=0)
+
+        levels: List[List[int]] = [[] for _ in range(max(process_levels.values(), default=-1) + 1)]
+        for position in self.order:
+            if position in process_levels:
+                levels[process_levels[position]].append(position)
+
+        return levels
+
+    def _execute_sequentially(self, data: pd.DataFrame, feature_processes: List, durations: Dict[str, float]) -> pd.DataFrame:
+
+        for feature_process in feature_processes:
+            start_time = time.perf_counter()
+            data = feature_process.execute(data)
+            durations[get_process_name(feature_process)] = time.perf_counter() - start_time
+
+        return data
+
+    def _execute_concurrently(self, data: pd.DataFrame, positions: Set[int], engineered_columns: List[str], max_workers: int, durations: Dict[str, float]) -> pd.DataFrame:
+
+        engineered_data: Dict[str, pd.Series] = {}
+
+        def execute_process(position: int) -> Tuple[int, Dict[str, pd.Series], float]:
+            feature_process = self.feature_processes[position]
+            start_time = time.perf_counter()
+            input_data = pd.DataFrame({column: engineered_data[column] if column in engineered_data else data[column] for column in feature_process.input_columns}, copy=False)
+            output_data = feature_process.execute(input_data)
+            return position, {column: output_data[column] for column in feature_process.output_columns}, time.perf_counter() - start_time
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='feature_engineering') as executor:
+            for level in self.get_levels(positions):
+                # the outputs of a level are only added after all its processes finished, the processes only read the outputs of earlier levels
+                for position, output_columns, duration in list(executor.map(execute_process, level)):
+                    engineered_data.update(output_columns)
+                    durations[get_process_name(self.feature_processes[position])] = duration
+
+        # added at the end in execution order, so that the columns are the same as in the sequential execution
+        for column in engineered_columns:
+            data[column] = engineered_data[column]
+
+        return data
+
+    def execute(self,
+                data: pd.DataFrame,
+                required_columns: Optional[Iterable[str]] = None,
+                max_workers: int = 1,
+                parallel_min_n_rows: int = 1000000,
+                fused: bool = False,
+                chunk_workers: int = 1,
+                chunk_size: int = 1000000,
+                ) -> Tuple[pd.DataFrame, List[str], Dict[str, float]]:
+        """
+        Executes the processes needed for 'required_columns' (all processes if None) in dependency order and adds their columns to 'data'.
+        With 'max_workers' > 1 and at least 'parallel_min_n_rows' rows, the independent processes of a level run concurrently in threads
+        (numpy releases the GIL in the column arithmetics), each on a DataFrame of only its input columns.
+        With 'fused', the processes that can be fused are evaluated in one pass by 'FusedFeatureProcesses' into a new DataFrame instead.
+        With 'chunk_workers' > 1 and more than 'chunk_size' rows, the processes that do not require the full data are executed on chunks of
+        'chunk_size' rows by 'chunk_workers' processes of 'ChunkedFeatureProcesses' instead, which takes precedence over the fusion.
+        The processes left over by the fusion or the chunks are executed sequentially afterwards.
+        Returns the data, the engineered columns in execution order and the duration of each process in seconds.
+        """
+
+        required_positions = self.get_required_positions(required_columns)
+        if len(required_positions) != len(self.feature_processes):
+            skipped_processes = [get_process_name(self.feature_processes[position]) for position in range(len(self.feature_processes)) if position not in required_positions]
+            logger.info(f"Skipping feature processes not needed by the model: {skipped_processes}")
+
+        missing_columns = sorted({column for position in required_positions for column in self.feature_processes[position].input_columns
+                                  if column not in self.producers and column not in data})
+        if len(missing_columns) != 0:
+            raise(Exception(f"Input columns {missing_columns} of the feature processes are missing in the data"))
+
+        ordered_processes = [self.feature_processes[position] for position in self.order if position in required_positions]
+        engineered_columns = [column for feature_process in ordered_processes for column in feature_process.output_columns]
+        durations: Dict[str, float] = {}
+
+        if chunk_workers > 1 and len(data) > chunk_size and data.columns.is_unique:
+            chunked_feature_processes = ChunkedFeatureProcesses(ordered_processes, data.dtypes.to_dict())
+            chunked_result = chunked_feature_processes.execute(data, chunk_workers, chunk_size) if len(chunked_feature_processes.chunked_processes) != 0 else None
+            if chunked_result is not None:
+                data, chunked_durations = chunked_result
+                durations.update({get_process_name(feature_process): duration for feature_process, duration in zip(chunked_feature_processes.chunked_processes, chunked_durations)})
+                data = self._execute_sequentially(data, chunked_feature_processes.remaining_processes, durations)
+
+                return data, chunked_feature_processes.output_columns + [column for feature_process in chunked_feature_processes.remaining_processes
+                                                                         for column in feature_process.output_columns], durations
+
+        if fused and data.columns.is_unique:
+            fused_feature_processes = FusedFeatureProcesses(ordered_processes, data.dtypes.to_dict())
+            data, fused_durations = fused_feature_processes.execute(data)
+            durations.update({get_process_name(feature_process): duration for feature_process, duration in zip(fused_feature_processes.fused_processes, fused_durations)})
+            data = self._execute_sequentially(data, fused_feature_processes.remaining_processes, durations)
+
+            return data, fused_feature_processes.output_columns + [column for feature_process in fused_feature_processes.remaining_processes
+                                                                   for column in feature_process.output_columns], durations
+
+        if max_workers <= 1 or len(data) < parallel_min_n_rows:
+            return self._execute_sequentially(data, ordered_processes, durations), engineered_columns, durations
+
+        return self._execute_concurrently(data, required_positions, engineered_columns, max_workers, durations), engineered_columns, durations
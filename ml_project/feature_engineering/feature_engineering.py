@@ -1,9 +1,10 @@
 import logging
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import pandas as pd
 
 from ml_project.config import Config
+from ml_project.feature_engineering.feature_dag import FeatureDag
 from ml_project.feature_engineering.feature_processes import Feature1Feature2Sum
 
 logger = logging.getLogger('standard')
@@ -21,15 +22,34 @@ def get_feature_processes(config: Config):
     return feature_processes
 
 
-def execute_feature_engineering(config: Config, data: pd.DataFrame, feature_processes: List) -> Tuple[pd.DataFrame, List]:
+def get_required_columns(config: Config, features: List[str]) -> List[str]:
     """
-    Executes each process in 'feature_processes' and adds the resulting feature to 'data'
+    Columns of the engineered data that the model 'features' (e.g. 'preprocessing_objects.features') are derived from,
+    one-hot encoded features like 'sex_male' are derived from the categorical column 'sex'
     """
 
-    for feature_process in feature_processes:
-        logger.info(f"Engineering feature '{feature_process.column_name}'")
-        data = feature_process.execute(data)
+    return list(features) + [cat_col for cat_col in config.cat_cols if any([feature.startswith(f"{cat_col}_") for feature in features])]
 
-    engineered_feature_columns = [feature_process.column_name for feature_process in feature_processes]
 
-    return data, engineered_feature_columns
\ No newline at end of file
+def execute_feature_engineering(config: Config, data: pd.DataFrame, feature_processes: List, required_features: Optional[List[str]] = None) -> Tuple[pd.DataFrame, List]:
+    """
+    Executes the processes in 'feature_processes' in the order of their dependencies and adds the resulting features to 'data'.
+    If the 'required_features' of a model are given, only the processes needed for them are executed.
+    """
+
+    feature_dag = FeatureDag(feature_processes)
+    required_columns = get_required_columns(config, required_features) if required_features is not None else None
+
+    data, engineered_feature_columns, durations = feature_dag.execute(data,
+                                                                      required_columns=required_columns,
+                                                                      max_workers=config.feature_engineering_max_workers,
+                                                                      parallel_min_n_rows=config.feature_engineering_parallel_min_n_rows,
+                                                                      fused=config.feature_engineering_fused,
+                                                                      chunk_workers=config.feature_engineering_chunk_workers,
+                                                                      chunk_size=config.feature_engineering_chunk_size,
+                                                                      )
+
+    for process_name, duration in durations.items():
+        logger.info(f"Engineered feature {process_name} in {duration * 1000:.1f} ms")
+
+    return data, engineered_feature_columns
@@ -1,5 +1,6 @@
-from typing import Optional
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 
 
@@ -8,6 +9,11 @@ class Feature1Feature2Sum:
     Calculates the sum of two input features
     """
 
+    # numpy equivalent of 'execute' on the input column arrays, used by the fused feature engineering
+    ufunc = np.add
+    # computed row by row, thus the data can be split into chunks
+    requires_full_data = False
+
     def __init__(self,
                  feature1_col: str,
                  feature2_col: str,
@@ -22,6 +28,14 @@ class Feature1Feature2Sum:
         else:
             self.column_name = column_name
 
+    @property
+    def input_columns(self) -> List[str]:
+        return [self.feature1_col, self.feature2_col]
+
+    @property
+    def output_columns(self) -> List[str]:
+        return [self.column_name]
+
     def execute(self, data: pd.DataFrame) -> pd.DataFrame:
 
         data[self.column_name] = data[self.feature1_col] + data[self.feature2_col]
@@ -34,6 +48,10 @@ class Feature1Feature2Ratio:
     Calculates the ratio of two input features
     """
 
+    # division by zero gives inf, -inf or NaN in numpy as in pandas
+    ufunc = np.true_divide
+    requires_full_data = False
+
     def __init__(self,
                  feature1_col: str,
                  feature2_col: str,
@@ -48,6 +66,14 @@ class Feature1Feature2Ratio:
         else:
             self.column_name = column_name
 
+    @property
+    def input_columns(self) -> List[str]:
+        return [self.feature1_col, self.feature2_col]
+
+    @property
+    def output_columns(self) -> List[str]:
+        return [self.column_name]
+
     def execute(self, data: pd.DataFrame) -> pd.DataFrame:
 
         data[self.column_name] = data[self.feature1_col] / data[self.feature2_col]
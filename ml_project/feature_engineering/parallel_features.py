@@ -0,0 +1,188 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('standard')
+
+# numpy dtype kinds of columns that are passed to the workers through shared memory: bool, integers and floats
+shared_dtype_kinds = 'biuf'
+
+
+@dataclass
+class SharedColumn:
+
+    column: str
+    dtype: str
+    offset: int  # in bytes from the start of the shared memory block
+
+
+def get_shared_layout(dtypes: Dict[str, Any], n_rows: int) -> Tuple[List[SharedColumn], int]:
+    """
+    Positions of the columns of 'dtypes' one after another in a shared memory block of 'n_rows' rows, returns them and the size of the block
+    """
+
+    shared_columns = []
+    offset = 0
+    for column, dtype in dtypes.items():
+        shared_columns.append(SharedColumn(column=column, dtype=np.dtype(dtype).str, offset=offset))
+        # columns start at multiples of 64 bytes, so that the arrays are aligned for numpy
+        offset += -(-n_rows * np.dtype(dtype).itemsize // 64) * 64
+
+    return shared_columns, max(offset, 1)
+
+
+def get_shared_array(shared_memory: SharedMemory, shared_column: SharedColumn, n_rows: int) -> np.ndarray:
+
+    return np.ndarray((n_rows,), dtype=np.dtype(shared_column.dtype), buffer=shared_memory.buf, offset=shared_column.offset)
+
+
+def execute_chunk(feature_processes: List,
+                  input_memory_name: str,
+                  input_layout: List[SharedColumn],
+                  output_memory_name: str,
+                  output_layout: List[SharedColumn],
+                  n_rows: int,
+                  start: int,
+                  stop: int,
+                  ) -> Tuple[List[float], List[str]]:
+    """
+    Executes 'feature_processes' on the rows 'start' to 'stop' of the input columns in shared memory and writes their outputs into the
+    same rows of the output columns in shared memory. Returns the duration of each process and the output columns whose dtype on this chunk
+    differs from the one of the output layout, which are not written.
+    """
+
+    input_memory = SharedMemory(name=input_memory_name)
+    output_memory = SharedMemory(name=output_memory_name)
+
+    def execute(durations: List[float], mismatched_columns: List[str]):
+        # in a function, so that all numpy views of the shared memory are released before it is closed
+        chunk = pd.DataFrame({shared_column.column: get_shared_array(input_memory, shared_column, n_rows)[start:stop] for shared_column in input_layout},
+                             index=pd.RangeIndex(start, stop), copy=False)
+
+        for feature_process in feature_processes:
+            start_time = time.perf_counter()
+            chunk = feature_process.execute(chunk)
+            durations.append(time.perf_counter() - start_time)
+
+        for shared_column in output_layout:
+            values = chunk[shared_column.column].to_numpy()
+            if values.dtype != np.dtype(shared_column.dtype):
+                mismatched_columns.append(shared_column.column)
+                continue
+            get_shared_array(output_memory, shared_column, n_rows)[start:stop] = values
+
+    durations: List[float] = []
+    mismatched_columns: List[str] = []
+    try:
+        execute(durations, mismatched_columns)
+    finally:
+        input_memory.close()
+        output_memory.close()
+
+    return durations, mismatched_columns
+
+
+class ChunkedFeatureProcesses:
+    """
+    Feature processes executed on row chunks of the data in a pool of worker processes. The numeric input columns are copied once into
+    a shared memory block, from which each worker reads its chunk without pickling, and the workers write the outputs into the rows of their
+    chunk in a second shared memory block, so that the result is in the original row order.
+    'feature_processes' are expected in dependency order. Processes that declare 'requires_full_data' (e.g. since they compute statistics
+    over all rows), processes on non-numeric columns and processes depending on such processes are left in 'remaining_processes',
+    to be executed on the whole data afterwards.
+    """
+
+    def __init__(self, feature_processes: List, input_dtypes: Dict[str, Any]):
+
+        dtypes = dict(input_dtypes)
+        chunked_columns = set()
+
+        self.input_columns: List[str] = []
+        self.chunked_processes: List = []
+        self.remaining_processes: List = []
+
+        for feature_process in feature_processes:
+            chunkable = not getattr(feature_process, 'requires_full_data', False) and all([
+                column in chunked_columns or (column in dtypes and isinstance(dtypes[column], np.dtype) and dtypes[column].kind in shared_dtype_kinds)
+                for column in feature_process.input_columns
+            ])
+            if not chunkable:
+                self.remaining_processes.append(feature_process)
+                continue
+
+            self.chunked_processes.append(feature_process)
+            self.input_columns.extend([column for column in feature_process.input_columns if column not in chunked_columns and column not in self.input_columns])
+            chunked_columns.update(feature_process.output_columns)
+
+        self.output_columns = [column for feature_process in self.chunked_processes for column in feature_process.output_columns]
+
+    def get_output_dtypes(self, data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """
+        Dtypes of the outputs, from an execution of the processes on the first rows of 'data'. None if an output is not numeric.
+        """
+
+        sample = data[self.input_columns].iloc[:2].copy()
+        for feature_process in self.chunked_processes:
+            sample = feature_process.execute(sample)
+
+        output_dtypes = {column: sample[column].dtype for column in self.output_columns}
+        if not all([isinstance(dtype, np.dtype) and dtype.kind in shared_dtype_kinds for dtype in output_dtypes.values()]):
+            return None
+
+        return output_dtypes
+
+    def execute(self, data: pd.DataFrame, n_workers: int, chunk_size: int) -> Optional[Tuple[pd.DataFrame, List[float]]]:
+        """
+        Returns a new DataFrame of the columns of 'data' and the outputs of the chunked processes, and the duration of each process
+        summed over all chunks. Returns None if the outputs have no fixed numeric dtype (the processes then have to be executed on the whole data).
+        """
+
+        output_dtypes = self.get_output_dtypes(data)
+        if output_dtypes is None:
+            logger.warning("Outputs of the feature processes are not numeric, they are not executed in chunks")
+            return None
+
+        n_rows = len(data)
+        input_layout, input_size = get_shared_layout({column: data[column].dtype for column in self.input_columns}, n_rows)
+        output_layout, output_size = get_shared_layout(output_dtypes, n_rows)
+
+        input_memory = SharedMemory(create=True, size=input_size)
+        output_memory = SharedMemory(create=True, size=output_size)
+        try:
+            for shared_column in input_layout:
+                get_shared_array(input_memory, shared_column, n_rows)[:] = data[shared_column.column].to_numpy()
+
+            chunk_starts = list(range(0, n_rows, chunk_size))
+            logger.info(f"Feature engineering of {n_rows} rows in {len(chunk_starts)} chunks by {n_workers} worker processes")
+
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [executor.submit(execute_chunk, self.chunked_processes, input_memory.name, input_layout, output_memory.name, output_layout,
+                                           n_rows, chunk_start, min(chunk_start + chunk_size, n_rows))
+                           for chunk_start in chunk_starts]
+                chunk_results = [future.result() for future in futures]
+
+            mismatched_columns = sorted({column for _, chunk_mismatched_columns in chunk_results for column in chunk_mismatched_columns})
+            if len(mismatched_columns) != 0:
+                logger.warning(f"Columns {mismatched_columns} have different dtypes in different chunks, they are not executed in chunks")
+                return None
+
+            # copied out of the shared memory, which is released at the end
+            outputs = {shared_column.column: get_shared_array(output_memory, shared_column, n_rows).copy() for shared_column in output_layout}
+        finally:
+            input_memory.close()
+            input_memory.unlink()
+            output_memory.close()
+            output_memory.unlink()
+
+        durations = np.sum([chunk_durations for chunk_durations, _ in chunk_results], axis=0).tolist()
+
+        columns = {column: data[column] for column in data.columns}
+        columns.update({column: pd.Series(outputs[column], index=data.index, copy=False) for column in self.output_columns})
+
+        return pd.DataFrame(columns, index=data.index, copy=False), durations
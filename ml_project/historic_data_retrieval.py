@@ -1,33 +1,220 @@
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 
 from ml_project.config import Config
 from ml_project.data_validation import raw_data_schema
+from ml_project.sql_data_retrieval import get_arrow_schema, get_connection_pool, retrieve_from_sql, retrieve_sql_chunks
 
+logger = logging.getLogger('standard')
 
-def retrieve_from_parquet(filepath_parquet: str) -> pd.DataFrame:
 
-    data = pd.read_parquet(filepath_parquet).iloc[:100]
+def get_parquet_dataset(filepath_parquet: str) -> ds.Dataset:
+    """
+    Returns the parquet dataset of a single file, of a directory of files or of a glob pattern of files (e.g. 'data/date=2023-*/*.parquet').
+    Directories named in the hive style 'column=value' add 'column' to the dataset, with the value of the directory holding a file.
+    """
+
+    if glob.has_magic(filepath_parquet):
+        filepaths = sorted(glob.glob(filepath_parquet, recursive=True))
+        if len(filepaths) == 0:
+            raise(FileNotFoundError(f"No parquet files match {filepath_parquet}"))
+
+        # partition directories are parsed relative to the part of the pattern before the first wildcard
+        pattern_prefix = filepath_parquet[:min([filepath_parquet.index(character) for character in '*?[' if character in filepath_parquet])]
+        partition_base_dir = pattern_prefix if pattern_prefix.endswith(os.sep) else os.path.dirname(pattern_prefix)
+
+        return ds.dataset(filepaths, format='parquet', partitioning='hive', partition_base_dir=partition_base_dir)
+
+    return ds.dataset(filepath_parquet, format='parquet', partitioning='hive')
+
+
+def read_parquet_fragments(dataset: ds.Dataset,
+                           columns: Optional[List[str]] = None,
+                           filter_expression: Optional[ds.Expression] = None,
+                           max_workers: Optional[int] = None,
+                           ) -> Tuple[pa.Table, List[Dict[str, Any]]]:
+    """
+    Reads the files of 'dataset' in parallel in a thread pool and returns them as one table in file order, together with the
+    read timings per file. Files of partitions excluded by 'filter_expression' are not read at all (partition pruning).
+    The tables of the files are concatenated without copying their columns.
+    """
+
+    fragments = list(dataset.get_fragments(filter=filter_expression))
+
+    def read_fragment(fragment: ds.Fragment) -> Tuple[pa.Table, Dict[str, Any]]:
+        start_time = time.perf_counter()
+        # the scanner of a fragment fills the partition columns from its partition directories
+        table = ds.Scanner.from_fragment(fragment, schema=dataset.schema, columns=columns, filter=filter_expression).to_table()
+        return table, {'filepath': fragment.path, 'n_rows': table.num_rows, 'read_s': time.perf_counter() - start_time}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='parquet_reader') as executor:
+        results = list(executor.map(read_fragment, fragments))
+
+    if len(results) == 0:
+        return dataset.schema.empty_table().select(columns) if columns is not None else dataset.schema.empty_table(), []
+
+    table = pa.concat_tables([fragment_table for fragment_table, _ in results])
+
+    return table, [read_timing for _, read_timing in results]
+
+
+def retrieve_from_parquet(filepath_parquet: str,
+                          columns: Optional[List[str]] = None,
+                          n_rows: Optional[int] = 100,
+                          filters: Optional[List[Tuple[str, str, Any]]] = None,
+                          max_workers: Optional[int] = None,
+                          ) -> pd.DataFrame:
+    """
+    Reads the first 'n_rows' rows (all rows if None) of the 'columns' (all columns if None) of a parquet file, directory or glob pattern
+    that satisfy 'filters'. Projection, filters and row limit are pushed down into the pyarrow scanner: only the requested columns are decoded,
+    row groups are skipped based on their statistics, partitions based on their directory names, and the scan stops as soon as 'n_rows' rows are read.
+    'filters' are conjunctions of (column, operator, value) tuples, e.g. [('pclass', '==', 1), ('age', '>', 30)].
+    Without a row limit, the files are read in parallel by 'max_workers' threads.
+    """
+
+    dataset = get_parquet_dataset(filepath_parquet)
+    filter_expression = pq.filters_to_expression(filters) if filters is not None else None
+
+    if n_rows is not None:
+        # without readahead the scan does not decode row groups beyond the ones holding the first 'n_rows' rows
+        scanner = dataset.scanner(columns=columns, filter=filter_expression, batch_size=max(n_rows, 1), batch_readahead=0, fragment_readahead=0)
+        table = scanner.head(n_rows)
+    else:
+        table, read_timings = read_parquet_fragments(dataset, columns, filter_expression, max_workers)
+        for read_timing in read_timings:
+            logger.info(f"Read {read_timing['n_rows']} rows in {read_timing['read_s'] * 1000:.1f} ms from {read_timing['filepath']}")
+
+    data = table.to_pandas()
 
     return data
 
 
+def retrieve_parquet_chunks(filepath_parquet: str,
+                            chunk_size: int,
+                            columns: Optional[List[str]] = None,
+                            n_rows: Optional[int] = None,
+                            filters: Optional[List[Tuple[str, str, Any]]] = None,
+                            ) -> Iterator[pd.DataFrame]:
+    """
+    Yields the rows of a parquet file as DataFrames of at most 'chunk_size' rows, with the same projection, row limit and filters as
+    'retrieve_from_parquet'. The index continues across chunks, i.e. the concatenated chunks equal the result of 'retrieve_from_parquet'.
+    Batches are read without readahead, so that the memory is bounded by the chunk size and the row group size instead of the file size.
+    """
+
+    dataset = get_parquet_dataset(filepath_parquet)
+    filter_expression = pq.filters_to_expression(filters) if filters is not None else None
+    scanner = dataset.scanner(columns=columns, filter=filter_expression, batch_size=chunk_size, batch_readahead=0, fragment_readahead=0)
+
+    n_retrieved_rows = 0
+    for record_batch in scanner.to_batches():
+        if n_rows is not None:
+            record_batch = record_batch.slice(0, n_rows - n_retrieved_rows)
+
+        if record_batch.num_rows != 0:
+            chunk = record_batch.to_pandas()
+            chunk.index = pd.RangeIndex(n_retrieved_rows, n_retrieved_rows + len(chunk))
+            n_retrieved_rows += len(chunk)
+
+            yield chunk
+
+        if n_rows is not None and n_retrieved_rows >= n_rows:
+            return
+
+
+def get_historic_data_columns(config: Config) -> List[str]:
+
+    return list(raw_data_schema.columns) + ([config.target_col] if config.target_col not in raw_data_schema.columns else [])
+
+
 def retrieve_historic_data(config: Config) -> pd.DataFrame:
     """
     Retrieves historical data from the relevant data source (files, databases, S3 buckets, etc.)
     """
 
-    # from parquet file
-    historic_data = retrieve_from_parquet(filepath_parquet=config.data_filepath)
-    historic_data = historic_data[list(raw_data_schema.columns)] # only keep columns defined in the data_schema
+    # from the parquet file or the database, only the columns defined in the data_schema (and the target) are read
+    columns = get_historic_data_columns(config)
+    if config.historic_data_sql_uri is not None:
+        historic_data = retrieve_from_sql(connection_pool=get_connection_pool(config.historic_data_sql_uri, config.historic_data_sql_max_connections),
+                                          table=config.historic_data_sql_table,
+                                          query=config.historic_data_sql_query,
+                                          columns=columns,
+                                          n_rows=config.historic_data_n_rows,
+                                          filters=config.historic_data_filters,
+                                          chunk_size=config.historic_data_sql_fetch_size,
+                                          arrow_schema=get_arrow_schema(raw_data_schema, columns),
+                                          )
+    else:
+        historic_data = retrieve_from_parquet(filepath_parquet=config.data_filepath,
+                                              columns=columns,
+                                              n_rows=config.historic_data_n_rows,
+                                              filters=config.historic_data_filters,
+                                              max_workers=config.historic_data_read_workers,
+                                              )
+    historic_data = historic_data[list(raw_data_schema.columns)]
 
     return historic_data
 
 
-def process_historic_data_into_raw_data(config: Config, historic_data: pd.DataFrame) -> pd.DataFrame:
+def retrieve_historic_data_chunks(config: Config, chunk_size: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Retrieves historical data in chunks of at most 'chunk_size' rows, for data that does not fit into memory at once.
+    Only 'columns' are read, by default the columns defined in the data_schema.
+    """
+
+    columns = columns if columns is not None else list(raw_data_schema.columns)
+
+    if config.historic_data_sql_uri is not None:
+        return retrieve_sql_chunks(connection_pool=get_connection_pool(config.historic_data_sql_uri, config.historic_data_sql_max_connections),
+                                   chunk_size=chunk_size,
+                                   table=config.historic_data_sql_table,
+                                   query=config.historic_data_sql_query,
+                                   columns=columns,
+                                   n_rows=config.historic_data_n_rows,
+                                   filters=config.historic_data_filters,
+                                   arrow_schema=get_arrow_schema(raw_data_schema, columns),
+                                   )
+
+    return retrieve_parquet_chunks(filepath_parquet=config.data_filepath,
+                                   chunk_size=chunk_size,
+                                   columns=columns,
+                                   n_rows=config.historic_data_n_rows,
+                                   filters=config.historic_data_filters,
+                                   )
+
+
+def get_cont_cols_fill_values(config: Config, historic_data: pd.DataFrame) -> pd.Series:
+    """
+    Returns the values that replace NaNs of the continuous columns: far below the minimum of each column
+    """
+
+    return historic_data[config.cont_cols].min() - 999999
+
+
+def get_cont_cols_fill_values_from_chunks(config: Config, historic_data_chunks: Iterator[pd.DataFrame]) -> pd.Series:
+    """
+    Returns the fill values of 'get_cont_cols_fill_values' from the global minima of all chunks, so that chunks are imputed
+    identically to the data as a whole
+    """
+
+    chunk_minima = pd.DataFrame([historic_data_chunk[config.cont_cols].min() for historic_data_chunk in historic_data_chunks], columns=config.cont_cols)
+
+    return chunk_minima.min() - 999999
+
+
+def process_historic_data_into_raw_data(config: Config, historic_data: pd.DataFrame, cont_cols_fill_values: Optional[pd.Series] = None) -> pd.DataFrame:
     """
     Processing of the historic data into raw data that adheres to a given schema (column names, column types, NaN handling, etc.).
     Raw data originating from historic data has the exact same schema as raw_data retrieved from production sources in order to allow unified further processing.
+    NaNs of continuous columns are replaced by 'cont_cols_fill_values', by default computed from 'historic_data' itself.
     """
 
     #####
@@ -38,7 +225,9 @@ def process_historic_data_into_raw_data(config: Config, historic_data: pd.DataFr
     #####
     ### NaN imputing for continuous and categorical columns
     historic_data.loc[:, config.cat_cols] = historic_data[config.cat_cols].fillna('<missing>')
-    historic_data.loc[:, config.cont_cols] = historic_data[config.cont_cols].fillna(historic_data[config.cont_cols].min() - 999999)
+    if cont_cols_fill_values is None:
+        cont_cols_fill_values = get_cont_cols_fill_values(config, historic_data)
+    historic_data.loc[:, config.cont_cols] = historic_data[config.cont_cols].fillna(cont_cols_fill_values)
     #####
 
     return historic_data
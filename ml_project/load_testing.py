@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import requests
+
+from ml_project.batch_prediction import parse_batch_records
+from ml_project.data_validation import ProductionData, raw_data_schema
+
+logger = logging.getLogger('standard')
+
+
+def read_records(records_filepath: str) -> List[Dict]:
+    """
+    Reads the records to replay from a json lines file (or a json array) of 'ProductionData' instances
+    """
+
+    with open(records_filepath, "r") as file:
+        records = parse_batch_records(file.read())
+
+    # validate the records up front, so that invalid records are not counted as errors of the service
+    return [ProductionData(**record).dict() for record in records]
+
+
+def get_synthetic_records(n_records: int, seed: Optional[int] = None) -> List[Dict]:
+    """
+    Samples 'ProductionData' records whose values satisfy the checks of 'raw_data_schema':
+    values of 'isin' checks are drawn from the allowed values, all other values uniformly from the range of the 'ge' and 'le' checks
+    """
+
+    random_generator = np.random.default_rng(seed)
+
+    columns = {}
+    for field_name, field in ProductionData.__fields__.items():
+        check_statistics = {key: value for check in raw_data_schema.columns[field_name].checks for key, value in check.statistics.items()}
+
+        if 'allowed_values' in check_statistics:
+            column = random_generator.choice(sorted(check_statistics['allowed_values']), size=n_records)
+        elif field.outer_type_ is int:
+            column = random_generator.integers(check_statistics['min_value'], check_statistics['max_value'], size=n_records, endpoint=True)
+        else:
+            column = np.round(random_generator.uniform(check_statistics['min_value'], check_statistics['max_value'], size=n_records), 2)
+
+        columns[field_name] = [field.outer_type_(value) for value in column.tolist()]
+
+    return [{field_name: columns[field_name][position] for field_name in columns} for position in range(n_records)]
+
+
+def get_load_test_summary(latencies: List[float], n_errors: int, duration: float) -> Dict[str, float]:
+
+    n_requests = len(latencies)
+    latencies_ms = np.array(latencies) * 1000 if n_requests != 0 else np.zeros(1)
+
+    return {
+        'n_requests': n_requests,
+        'n_errors': n_errors,
+        'error_rate': n_errors / n_requests if n_requests != 0 else 0.,
+        'duration_s': duration,
+        'throughput_per_s': n_requests / duration if duration > 0 else 0.,
+        'latency_mean_ms': float(latencies_ms.mean()),
+        'latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+        'latency_p95_ms': float(np.percentile(latencies_ms, 95)),
+        'latency_p99_ms': float(np.percentile(latencies_ms, 99)),
+        'latency_max_ms': float(latencies_ms.max()),
+    }
+
+
+class LoadGenerator:
+    """
+    Replays records against a prediction service, either with 'concurrency' clients sending their next request as soon as the
+    previous one returned (closed loop), or at a fixed 'rate' of requests per second (open loop, at most 'concurrency' requests in flight).
+    In the open loop the latency is measured from the scheduled send time, so that a slow service is not hidden by delayed sending.
+    With a 'batch_size' above one, lists of records are sent, e.g. to the '/predict_batch' endpoint.
+    """
+
+    def __init__(self,
+                 url: str,
+                 records: List[Dict],
+                 concurrency: int = 1,
+                 rate: Optional[float] = None,
+                 batch_size: int = 1,
+                 timeout: float = 10.,
+                 ):
+
+        if len(records) == 0:
+            raise(ValueError("No records to send provided"))
+
+        self.url = url
+        self.records = records
+        self.concurrency = concurrency
+        self.rate = rate
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+        self._sessions = threading.local()
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []
+        self._n_errors = 0
+
+    def _get_payload(self, request_index: int) -> Any:
+
+        if self.batch_size == 1:
+            return self.records[request_index % len(self.records)]
+
+        start = request_index * self.batch_size
+        return [self.records[position % len(self.records)] for position in range(start, start + self.batch_size)]
+
+    def _send(self, request_index: int, start_time: Optional[float] = None):
+
+        session = getattr(self._sessions, 'session', None)
+        if session is None:
+            session = self._sessions.session = requests.Session()
+
+        if start_time is None:
+            start_time = time.perf_counter()
+
+        try:
+            response = session.post(self.url, json=self._get_payload(request_index), timeout=self.timeout)
+            failed = response.status_code >= 400
+        except requests.exceptions.RequestException:
+            failed = True
+
+        latency = time.perf_counter() - start_time
+        with self._lock:
+            self._latencies.append(latency)
+            self._n_errors += failed
+
+    def _run_closed_loop(self, n_requests: int):
+
+        request_indexes = iter(range(n_requests))
+        indexes_lock = threading.Lock()
+
+        def run_client():
+            while True:
+                with indexes_lock:
+                    request_index = next(request_indexes, None)
+                if request_index is None:
+                    return
+                self._send(request_index)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for client in [executor.submit(run_client) for _ in range(self.concurrency)]:
+                client.result()
+
+    def _run_open_loop(self, n_requests: int):
+
+        assert self.rate is not None
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for request_index in range(n_requests):
+                scheduled_time = start_time + request_index / self.rate
+                delay = scheduled_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._send, request_index, scheduled_time)
+
+    def run(self, n_requests: int) -> Dict[str, float]:
+        """
+        Sends 'n_requests' requests and returns the summary of their latencies, throughput and error rate
+        """
+
+        self._latencies, self._n_errors = [], 0
+
+        start_time = time.perf_counter()
+        if self.rate is not None:
+            self._run_open_loop(n_requests)
+        else:
+            self._run_closed_loop(n_requests)
+        duration = time.perf_counter() - start_time
+
+        return get_load_test_summary(self._latencies, self._n_errors, duration)
+
+    def get_settings(self) -> Dict[str, Any]:
+
+        return {'url': self.url, 'n_records': len(self.records), 'concurrency': self.concurrency, 'rate': self.rate,
+                'batch_size': self.batch_size, 'timeout': self.timeout}
+
+
+def save_load_test_results(results_filepath: str, settings: Dict[str, Any], summary: Dict[str, float]):
+    """
+    Appends the settings and the summary of a load test run as one json line to 'results_filepath', so that runs can be compared
+    """
+
+    results_folderpath = os.path.dirname(results_filepath)
+    if results_folderpath:
+        os.makedirs(results_folderpath, exist_ok=True)
+
+    results = {'timestamp': datetime.now(timezone.utc).isoformat(), 'settings': settings, 'summary': summary}
+    with open(results_filepath, "a") as file:
+        file.write(json.dumps(results) + "\n")
+
+    logger.info(f"Load test results appended to {results_filepath}")
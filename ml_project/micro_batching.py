@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml_project.data_validation import ProductionData
+
+logger = logging.getLogger('standard')
+
+
+class MicroBatchingStats:
+    """
+    Collects the sizes of the batches produced by a 'MicroBatcher' and the time each request waited in its queue.
+    Only the most recent 'window_size' values are kept for the summary statistics.
+    """
+
+    def __init__(self, window_size: int = 10000):
+
+        self.n_batches = 0
+        self.n_requests = 0
+        self.batch_sizes: Deque[int] = deque(maxlen=window_size)
+        self.queue_wait_times: Deque[float] = deque(maxlen=window_size)
+
+    def add_batch(self, queue_wait_times: List[float]):
+
+        self.n_batches += 1
+        self.n_requests += len(queue_wait_times)
+        self.batch_sizes.append(len(queue_wait_times))
+        self.queue_wait_times.extend(queue_wait_times)
+
+    def get_summary(self) -> Dict[str, Any]:
+
+        summary: Dict[str, Any] = {'n_batches': self.n_batches, 'n_requests': self.n_requests}
+
+        if len(self.batch_sizes) != 0:
+            queue_wait_times = np.array(self.queue_wait_times)
+            summary.update({
+                'batch_size_mean': statistics.mean(self.batch_sizes),
+                'batch_size_max': max(self.batch_sizes),
+                'queue_wait_time_mean': float(queue_wait_times.mean()),
+                'queue_wait_time_p95': float(np.percentile(queue_wait_times, 95)),
+                'queue_wait_time_max': float(queue_wait_times.max()),
+            })
+
+        return summary
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrently incoming single-instance requests into batches that are scored with one vectorised call of 'predict_batch'.
+    'predict_batch' returns a tuple of per-instance outputs, e.g. the predictions and prediction probabilities, of which each request receives its row.
+    A batch is closed as soon as it holds 'max_batch_size' requests or its oldest request waited 'max_wait_time' seconds.
+    The waiting is adaptive: if the previous batch contained a single request only, i.e. the service is not under concurrent load,
+    a request is scored immediately without waiting for further requests.
+    If an 'executor' is provided, the batches are scored in its workers instead of blocking the event loop.
+    """
+
+    def __init__(self,
+                 predict_batch: Callable[[pd.DataFrame], Tuple],
+                 max_batch_size: int = 32,
+                 max_wait_time: float = 0.005,
+                 executor: Optional[Executor] = None,
+                 ):
+
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_time = max_wait_time
+        self.executor = executor
+
+        self.stats = MicroBatchingStats()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._last_batch_size = 0
+
+    async def start(self):
+        """
+        Starts the batching worker, has to be called from within the running event loop of the service
+        """
+
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops the batching worker, the requests still waiting in the queue are cancelled
+        """
+
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                future.cancel()
+
+    async def predict(self, production_data: ProductionData) -> Tuple:
+        """
+        Returns the rows of the outputs of 'predict_batch' for a single instance, e.g. its predicted label and prediction probabilities,
+        once its batch is scored
+        """
+
+        if self._queue is None:
+            raise(Exception("MicroBatcher is not started"))
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((production_data, future, time.perf_counter()))
+
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[ProductionData, asyncio.Future, float]]:
+
+        assert self._queue is not None
+
+        batch = [await self._queue.get()]
+        deadline = batch[0][2] + self.max_wait_time
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0 or self._last_batch_size <= 1:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    def _score_batch(self, batch: List[ProductionData]) -> List[Any]:
+        """
+        Returns per instance of 'batch' either the tuple of its rows of the outputs of 'predict_batch' or the raised exception
+        """
+
+        production_data = pd.DataFrame.from_dict([instance.dict() for instance in batch])
+
+        try:
+            outputs = [np.asarray(output) for output in self.predict_batch(production_data)]
+        except Exception as error:
+            if len(batch) == 1:
+                return [error]
+            # score the instances one by one so that only the requests with invalid data fail
+            return [result for instance in batch for result in self._score_batch([instance])]
+
+        return [tuple(output[position] for output in outputs) for position in range(len(batch))]
+
+    async def _run(self):
+        """
+        Scores one batch after the other. An error outside of 'predict_batch' (e.g. of the executor or of outputs that do not match the batch)
+        fails the requests of its batch only, the worker continues with the next batch. On 'stop' the requests of the batch in flight are cancelled.
+        """
+
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self._process_batch(batch)
+            except asyncio.CancelledError:
+                for _, future, _ in batch:
+                    future.cancel()
+                raise
+            except Exception as error:
+                logger.exception(f"Scoring a micro-batch of {len(batch)} requests failed")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    async def _process_batch(self, batch: List[Tuple[ProductionData, asyncio.Future, float]]):
+
+        scoring_start_time = time.perf_counter()
+
+        batch_data = [instance for instance, _, _ in batch]
+        if self.executor is not None:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self._score_batch, batch_data)
+        else:
+            results = self._score_batch(batch_data)
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        self._last_batch_size = len(batch)
+        self.stats.add_batch([scoring_start_time - enqueue_time for _, _, enqueue_time in batch])
@@ -3,8 +3,6 @@ import os
 from typing import Dict, List, Optional, Union
 
 import pandas as pd
-from evidently.dashboard import Dashboard
-from evidently.tabs import CatTargetDriftTab, DataDriftTab, ProbClassificationPerformanceTab
 
 logger = logging.getLogger('standard')
 
@@ -16,6 +14,10 @@ def create_drift_dashboard(reference_data: pd.DataFrame, reference_data_predicti
     Creates evidently plots for comparison of feature distribution and model predictions between reference (training) and production data
     """
 
+    # imported lazily, since evidently is only needed for the monitoring reports
+    from evidently.dashboard import Dashboard
+    from evidently.tabs import CatTargetDriftTab, DataDriftTab, ProbClassificationPerformanceTab
+
     reference_data['prediction'] = reference_data_predictions.values
     production_data['prediction'] = production_data_predictions.values
 
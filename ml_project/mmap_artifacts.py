@@ -0,0 +1,271 @@
+import dataclasses
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import OneHotEncoder
+
+from ml_project.config import Config
+from ml_project.modelling_process.data_processing import PreprocessingObjects
+
+logger = logging.getLogger('standard')
+
+mmap_artifacts_format_version = 1
+metadata_filename = "metadata.json"
+# each export is a new folder under 'versions', the pointer file names the current one and is replaced last
+versions_foldername = "versions"
+current_version_filename = "current_version.json"
+# exported versions kept besides the current one, older ones are removed (files memory-mapped by a running service stay readable after removal)
+n_kept_previous_versions = 1
+
+# node arrays of all trees of a forest, concatenated in the order of the trees
+tree_array_names = ['children_left', 'children_right', 'feature', 'threshold', 'value']
+
+
+class MappedRandomForestClassifier:
+    """
+    Random forest classifier that predicts from flat node arrays, which are memory-mapped from the files of the mmap artifact format.
+    The node arrays of all trees are concatenated, the child indexes point into the concatenated arrays and are -1 for leaves.
+    The leaf values hold the class probabilities of each tree, thus the predictions equal the ones of the exported 'RandomForestClassifier'.
+    """
+
+    def __init__(self, tree_arrays: Dict[str, np.ndarray], tree_roots: np.ndarray, classes: np.ndarray, feature_names: np.ndarray):
+
+        self.children_left = tree_arrays['children_left']
+        self.children_right = tree_arrays['children_right']
+        self.feature = tree_arrays['feature']
+        self.threshold = tree_arrays['threshold']
+        self.value = tree_arrays['value']
+
+        self.tree_roots = tree_roots
+        self.classes_ = classes
+        self.n_classes_ = len(classes)
+        self.feature_names_in_ = feature_names
+        self.n_features_in_ = len(feature_names)
+
+    def _get_data_array(self, data: Any) -> np.ndarray:
+
+        if isinstance(data, pd.DataFrame):
+            if data.columns.tolist() != self.feature_names_in_.tolist():
+                raise(ValueError("The feature names should match those that were passed during fit"))
+            data = data.values
+
+        # trees compare the features in single precision, same as the scikit-learn trees
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim != 2 or data.shape[1] != self.n_features_in_:
+            raise(ValueError(f"Data has shape {data.shape}, expected (n_samples, {self.n_features_in_})"))
+        if not np.isfinite(data).all():
+            raise(ValueError("Input contains NaN, infinity or a value too large for dtype('float32')"))
+
+        return data
+
+    def apply(self, data: Any) -> np.ndarray:
+        """
+        Returns the leaf node indexes of shape (n_trees, n_samples) that the samples of 'data' end up in
+        """
+
+        data = self._get_data_array(data)
+        n_samples = len(data)
+
+        nodes = np.repeat(self.tree_roots, n_samples)
+        samples = np.tile(np.arange(n_samples), len(self.tree_roots))
+
+        # all trees descend one level per iteration, 'active' holds the positions that did not reach a leaf yet
+        active = np.flatnonzero(self.children_left[nodes] != -1)
+        while active.size != 0:
+            active_nodes = nodes[active]
+            go_left = data[samples[active], self.feature[active_nodes]] <= self.threshold[active_nodes]
+            nodes[active] = np.where(go_left, self.children_left[active_nodes], self.children_right[active_nodes])
+            active = active[self.children_left[nodes[active]] != -1]
+
+        return nodes.reshape(len(self.tree_roots), n_samples)
+
+    def predict_proba(self, data: Any) -> np.ndarray:
+
+        leaves = self.apply(data)
+
+        return self.value[leaves].sum(axis=0) / len(self.tree_roots)
+
+    def predict(self, data: Any) -> np.ndarray:
+
+        return self.classes_.take(np.argmax(self.predict_proba(data), axis=1), axis=0)
+
+
+def get_tree_arrays(model: RandomForestClassifier) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Concatenates the node arrays of the trees of 'model', returns them with the index of each tree's root node
+    """
+
+    if not isinstance(model, RandomForestClassifier) or model.n_outputs_ != 1:
+        raise(Exception(f"mmap artifact format only supports single-output 'RandomForestClassifier' models, got {type(model)}"))
+
+    tree_arrays: Dict[str, list] = {array_name: [] for array_name in tree_array_names}
+    tree_roots = []
+    n_nodes = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+
+        tree_roots.append(n_nodes)
+        tree_arrays['children_left'].append(np.where(is_leaf, -1, tree.children_left + n_nodes))
+        tree_arrays['children_right'].append(np.where(is_leaf, -1, tree.children_right + n_nodes))
+        tree_arrays['feature'].append(tree.feature)
+        tree_arrays['threshold'].append(tree.threshold)
+
+        # class probabilities per node, normalised the same way as 'DecisionTreeClassifier.predict_proba'
+        value = tree.value[:, 0, :]
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.] = 1.
+        tree_arrays['value'].append(value / normalizer)
+
+        n_nodes += tree.node_count
+
+    concatenated_tree_arrays = {
+        'children_left': np.concatenate(tree_arrays['children_left']).astype(np.int32),
+        'children_right': np.concatenate(tree_arrays['children_right']).astype(np.int32),
+        'feature': np.concatenate(tree_arrays['feature']).astype(np.int32),
+        'threshold': np.concatenate(tree_arrays['threshold']).astype(np.float64),
+        'value': np.concatenate(tree_arrays['value']).astype(np.float64),
+    }
+
+    return concatenated_tree_arrays, np.array(tree_roots, dtype=np.int64)
+
+
+def write_mmap_version(config: Config, model: Any, preprocessing_objects: PreprocessingObjects, version_folderpath: str):
+
+    os.makedirs(version_folderpath)
+
+    tree_arrays, tree_roots = get_tree_arrays(model)
+    for array_name, array in tree_arrays.items():
+        np.save(os.path.join(version_folderpath, f"{array_name}.npy"), array)
+    np.save(os.path.join(version_folderpath, "tree_roots.npy"), tree_roots)
+    np.save(os.path.join(version_folderpath, "classes.npy"), model.classes_)
+
+    one_hot_encoder_categories = {}
+    for cat_col, one_hot_encoder in (preprocessing_objects.one_hot_encoders or {}).items():
+        categories = one_hot_encoder.categories_[0]
+        if categories.dtype == object:
+            categories = categories.astype(str)  # fixed-width unicode array, object arrays can not be stored as raw buffers
+        categories_filename = f"categories_{cat_col}.npy"
+        np.save(os.path.join(version_folderpath, categories_filename), categories)
+        one_hot_encoder_categories[cat_col] = categories_filename
+
+    metadata = {
+        'format_version': mmap_artifacts_format_version,
+        'model_type': type(model).__name__,
+        'feature_names': list(getattr(model, 'feature_names_in_', preprocessing_objects.features)),
+        'features': preprocessing_objects.features,
+        'one_hot_encoder_categories': one_hot_encoder_categories,
+        'config': dataclasses.asdict(config),
+    }
+    with open(os.path.join(version_folderpath, metadata_filename), "w") as file:
+        json.dump(metadata, file, indent=2)
+
+
+def export_mmap_model_artifacts(config: Config, model: Any, preprocessing_objects: PreprocessingObjects, export_folderpath: str):
+    """
+    Stores model artifacts as a folder of raw numpy arrays, i.e. the tree arrays of the forest and the category tables of the encoders,
+    and a small json metadata header with the config, the features and the array filenames.
+    Files that may be memory-mapped by a running service are never overwritten: each export is written into a temporary folder, renamed
+    into a new folder under 'versions' and published by replacing the pointer file 'current_version.json', which is written last.
+    """
+
+    versions_folderpath = os.path.join(export_folderpath, versions_foldername)
+    os.makedirs(versions_folderpath, exist_ok=True)
+
+    # sortable by export time, unique across concurrent exports
+    version = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
+    temporary_folderpath = os.path.join(versions_folderpath, f".{version}.tmp")
+    try:
+        write_mmap_version(config, model, preprocessing_objects, temporary_folderpath)
+        os.replace(temporary_folderpath, os.path.join(versions_folderpath, version))
+    except BaseException:
+        shutil.rmtree(temporary_folderpath, ignore_errors=True)
+        raise
+
+    temporary_filepath = os.path.join(export_folderpath, f"{current_version_filename}.tmp")
+    with open(temporary_filepath, "w") as file:
+        json.dump({'version': version}, file)
+    os.replace(temporary_filepath, os.path.join(export_folderpath, current_version_filename))
+
+    remove_previous_mmap_versions(export_folderpath, version)
+
+
+def remove_previous_mmap_versions(export_folderpath: str, current_version: str):
+    """
+    Removes the exported versions older than the current one and the 'n_kept_previous_versions' before it
+    """
+
+    versions_folderpath = os.path.join(export_folderpath, versions_foldername)
+    previous_versions = sorted([version for version in os.listdir(versions_folderpath) if not version.startswith(".") and version < current_version])
+
+    for version in previous_versions[:max(len(previous_versions) - n_kept_previous_versions, 0)]:
+        shutil.rmtree(os.path.join(versions_folderpath, version), ignore_errors=True)
+
+
+def get_mmap_version_folderpath(model_objects_folderpath: str) -> str:
+    """
+    Folder of the current version of the mmap artifacts in 'model_objects_folderpath', which is the folder itself for a single version
+    (e.g. a folder exported before versioning or the folder of a version)
+    """
+
+    current_version_filepath = os.path.join(model_objects_folderpath, current_version_filename)
+    if not os.path.exists(current_version_filepath):
+        return model_objects_folderpath
+
+    with open(current_version_filepath, "r") as file:
+        version = json.load(file)['version']
+
+    return os.path.join(model_objects_folderpath, versions_foldername, version)
+
+
+def get_one_hot_encoder(categories: np.ndarray) -> OneHotEncoder:
+    """
+    Rebuilds the fitted 'OneHotEncoder' of 'apply_categorical_encoding' from its category table
+    """
+
+    if categories.dtype.kind == 'U':
+        categories = categories.astype(object)
+
+    one_hot_encoder = OneHotEncoder(sparse=False, categories='auto')
+    one_hot_encoder.fit(categories.reshape(-1, 1))
+
+    return one_hot_encoder
+
+
+def load_mmap_model_artifacts(model_objects_folderpath: str) -> Tuple[MappedRandomForestClassifier, PreprocessingObjects, Config]:
+    """
+    Loads model artifacts of the mmap artifact format, the tree arrays are memory-mapped read-only instead of being read into memory,
+    so that several worker processes share their pages via the page cache of the operating system
+    """
+
+    model_objects_folderpath = get_mmap_version_folderpath(model_objects_folderpath)
+
+    with open(os.path.join(model_objects_folderpath, metadata_filename), "r") as file:
+        metadata = json.load(file)
+
+    if metadata['format_version'] != mmap_artifacts_format_version:
+        raise(Exception(f"Unsupported mmap artifact format version {metadata['format_version']}, supported is {mmap_artifacts_format_version}"))
+
+    tree_arrays = {array_name: np.load(os.path.join(model_objects_folderpath, f"{array_name}.npy"), mmap_mode='r') for array_name in tree_array_names}
+    model = MappedRandomForestClassifier(tree_arrays=tree_arrays,
+                                         tree_roots=np.load(os.path.join(model_objects_folderpath, "tree_roots.npy")),
+                                         classes=np.load(os.path.join(model_objects_folderpath, "classes.npy")),
+                                         feature_names=np.array(metadata['feature_names'], dtype=object),
+                                         )
+
+    one_hot_encoders = {cat_col: get_one_hot_encoder(np.load(os.path.join(model_objects_folderpath, categories_filename)))
+                        for cat_col, categories_filename in metadata['one_hot_encoder_categories'].items()}
+    preprocessing_objects = PreprocessingObjects(one_hot_encoders=one_hot_encoders, features=metadata['features'])
+
+    config = Config(**metadata['config'])
+
+    return model, preprocessing_objects, config
@@ -1,9 +1,12 @@
+import hashlib
 import logging
+import os
 import pickle
 from dataclasses import dataclass
 from typing import Any, Optional, Tuple
 
 from ml_project.config import Config
+from ml_project.mmap_artifacts import export_mmap_model_artifacts, get_mmap_version_folderpath, load_mmap_model_artifacts
 from ml_project.modelling_process.data_processing import PreprocessingObjects
 
 logger = logging.getLogger('standard')
@@ -19,7 +22,7 @@ class ModelArtifacts:
 
 def export_model_artifacts(config: Config, model: Any, preprocessing_objects: PreprocessingObjects) -> Optional[ModelArtifacts]:
     """
-    Stores model artifacts as a serialised object
+    Stores model artifacts as a serialised object, or as a folder of memory-mappable arrays if 'config.export_format' is 'mmap'
     """
 
     model_artifacts: Optional[ModelArtifacts]
@@ -29,8 +32,14 @@ def export_model_artifacts(config: Config, model: Any, preprocessing_objects: Pr
                                        config=config,
                                        )
 
-        with open(config.export_filepath, "wb+") as file:
-            pickle.dump(model_artifacts, file)
+        if config.export_format == 'mmap':
+            export_mmap_model_artifacts(config, model, preprocessing_objects, config.export_filepath)
+        else:
+            # written to a temporary file first, so that services watching the filepath never load a partially written file
+            temporary_filepath = f"{config.export_filepath}.tmp"
+            with open(temporary_filepath, "wb+") as file:
+                pickle.dump(model_artifacts, file)
+            os.replace(temporary_filepath, config.export_filepath)
 
         logger.info(f"Model artifacts stored to {config.export_filepath}")
     else:
@@ -41,23 +50,64 @@ def export_model_artifacts(config: Config, model: Any, preprocessing_objects: Pr
 
 def load_model_artifacts(model_objects_filepath: Optional[str]) -> Tuple[Optional[Any], Optional[PreprocessingObjects], Optional[Config]]:
     """
-    Loads and returns model artifacts from the provided filepath
+    Loads and returns model artifacts from the provided filepath, which is a folder for artifacts of the mmap format
     """
 
     model: Optional[Any]
     preprocessing_objects: Optional[PreprocessingObjects]
     config: Optional[Config]
 
-    if model_objects_filepath is not None:
+    if model_objects_filepath is not None and os.path.isdir(model_objects_filepath):
+        model, preprocessing_objects, config = load_mmap_model_artifacts(model_objects_filepath)
+    elif model_objects_filepath is not None:
 
         with open(model_objects_filepath, "rb") as file:
             model_objects: ModelArtifacts = pickle.load(file)
 
-        model = model_objects.model
-        preprocessing_objects = model_objects.preprocessing_objects
-        config = model_objects.config
+        model, preprocessing_objects, config = model_objects.model, model_objects.preprocessing_objects, model_objects.config
     else:
         logger.warning(f"Export_filepath is None")
         model, preprocessing_objects, config = None, None, None
 
-    return model, preprocessing_objects, config
\ No newline at end of file
+    return model, preprocessing_objects, config
+
+
+def load_model_artifacts_version(model_objects_filepath: str) -> Tuple[str, Any, PreprocessingObjects, Config]:
+    """
+    Loads model artifacts together with their identity (see 'get_model_artifacts_identity') from one state of the artifacts: a pickle file
+    is read once and both hashed and deserialised from the same bytes, a versioned mmap export from the folder of its current version,
+    which is never modified. Thus the identity always belongs to the loaded model, even if new artifacts are published meanwhile.
+    """
+
+    if os.path.isdir(model_objects_filepath):
+        version_folderpath = get_mmap_version_folderpath(model_objects_filepath)
+        model, preprocessing_objects, config = load_mmap_model_artifacts(version_folderpath)
+        return get_model_artifacts_identity(version_folderpath), model, preprocessing_objects, config
+
+    with open(model_objects_filepath, "rb") as file:
+        model_objects_bytes = file.read()
+    model_objects: ModelArtifacts = pickle.loads(model_objects_bytes)
+
+    return hashlib.sha256(model_objects_bytes).hexdigest()[:16], model_objects.model, model_objects.preprocessing_objects, model_objects.config
+
+
+def get_model_artifacts_identity(model_objects_filepath: str) -> str:
+    """
+    Returns a content hash of the serialised model artifacts that identifies the model version stored in the file or folder
+    """
+
+    if os.path.isdir(model_objects_filepath):
+        version_folderpath = get_mmap_version_folderpath(model_objects_filepath)
+        filepaths = [os.path.join(version_folderpath, filename) for filename in sorted(os.listdir(version_folderpath))]
+    else:
+        filepaths = [model_objects_filepath]
+
+    artifacts_hash = hashlib.sha256()
+    for filepath in filepaths:
+        if len(filepaths) > 1:
+            artifacts_hash.update(os.path.basename(filepath).encode())
+        with open(filepath, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 ** 2), b""):
+                artifacts_hash.update(chunk)
+
+    return artifacts_hash.hexdigest()[:16]
@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from ml_project.compiled_pipeline import CompiledPipeline, get_compiled_pipeline
+from ml_project.config import Config
+from ml_project.data_validation import ProductionData
+from ml_project.mmap_artifacts import get_mmap_version_folderpath, metadata_filename
+from ml_project.model_export import get_model_artifacts_identity, load_model_artifacts_version
+from ml_project.modelling_process.data_processing import PreprocessingObjects
+
+logger = logging.getLogger('standard')
+
+# instance scored by every newly loaded model before it is swapped in
+warmup_production_data = ProductionData(pclass=3, sex='male', age=30., siblings_spouses_aboard=0, parents_children_aboard=0, fare=10.)
+
+
+@dataclass
+class ModelVersion:
+    """
+    Loaded model artifacts together with the version identifying them, requests keep a reference to the version they started with
+    """
+
+    model: Any
+    preprocessing_objects: PreprocessingObjects
+    config: Config
+    version: str
+    loaded_at: float
+    compiled_pipeline: Optional[CompiledPipeline] = None
+
+
+class ModelManager:
+    """
+    Holds the model version served by a prediction service and replaces it by newly exported model artifacts at runtime.
+    A reload is triggered by 'reload' (e.g. from an admin endpoint) or by newly published artifacts (see '_get_artifacts_marker'),
+    which are polled every 'watch_interval' seconds once 'start_watching' is called.
+    New artifacts are loaded and warmed up with a test prediction in a background thread, and only swapped in if this succeeds.
+    The swap is a single reference assignment: requests that are in flight finish with the version they started with.
+    """
+
+    def __init__(self,
+                 model_objects_filepath: str,
+                 warmup: Callable[[ModelVersion], Any],
+                 use_compiled_pipeline: bool = False,
+                 model_n_jobs: Optional[int] = None,
+                 watch_interval: Optional[float] = None,
+                 on_swap: Optional[Callable[[ModelVersion], None]] = None,
+                 ):
+
+        self.model_objects_filepath = model_objects_filepath
+        self.warmup = warmup
+        self.use_compiled_pipeline = use_compiled_pipeline
+        self.model_n_jobs = model_n_jobs
+        self.watch_interval = watch_interval
+        self.on_swap = on_swap
+
+        self.n_reloads = 0
+        self.last_reload_error: Optional[str] = None
+
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        self._last_artifacts_marker = self._get_artifacts_marker()
+        self.model_version: ModelVersion = self.load_model_version()
+
+    def _get_artifacts_marker(self) -> Optional[str]:
+        """
+        Changes only once new artifacts are completely written: the version named by the pointer file of versioned mmap artifacts (replaced
+        last by the export), the modification time of the metadata file of unversioned mmap artifacts (written last), or the modification
+        time of a pickle file (replaced atomically by the export)
+        """
+
+        try:
+            if os.path.isdir(self.model_objects_filepath):
+                version_folderpath = get_mmap_version_folderpath(self.model_objects_filepath)
+                if version_folderpath != self.model_objects_filepath:
+                    return version_folderpath
+                return str(os.path.getmtime(os.path.join(self.model_objects_filepath, metadata_filename)))
+            return str(os.path.getmtime(self.model_objects_filepath))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def load_model_version(self) -> ModelVersion:
+        """
+        Loads the model artifacts and returns them as warmed-up model version, without swapping it in
+        """
+
+        # identity and model are of the same artifacts even if new ones are published meanwhile
+        version, model, preprocessing_objects, config = load_model_artifacts_version(self.model_objects_filepath)
+
+        if model is None or preprocessing_objects is None or config is None:
+            raise(Exception(f"No model artifacts could be loaded from {self.model_objects_filepath}"))
+
+        if self.model_n_jobs is not None and hasattr(model, 'n_jobs'):
+            model.n_jobs = self.model_n_jobs
+
+        compiled_pipeline = get_compiled_pipeline(config, model, preprocessing_objects) if self.use_compiled_pipeline else None
+
+        model_version = ModelVersion(model=model,
+                                     preprocessing_objects=preprocessing_objects,
+                                     config=config,
+                                     version=version,
+                                     loaded_at=time.time(),
+                                     compiled_pipeline=compiled_pipeline,
+                                     )
+        self.warmup(model_version)
+
+        return model_version
+
+    def _reload(self):
+
+        try:
+            if get_model_artifacts_identity(self.model_objects_filepath) == self.model_version.version:
+                logger.info(f"Model artifacts at {self.model_objects_filepath} are unchanged, version {self.model_version.version}")
+                return
+
+            model_version = self.load_model_version()
+
+            previous_version = self.model_version.version
+            self.model_version = model_version
+            self.n_reloads += 1
+            self.last_reload_error = None
+
+            if self.on_swap is not None:
+                self.on_swap(model_version)
+
+            logger.info(f"Swapped model version {previous_version} for {model_version.version}")
+        except Exception as error:
+            # the current model version keeps serving if the new artifacts can not be loaded, e.g. while they are still being written
+            self.last_reload_error = f"{type(error).__name__}: {error}"
+            logger.warning(f"Reloading the model artifacts failed, keeping version {self.model_version.version}: {self.last_reload_error}")
+        finally:
+            self._reload_lock.release()
+
+    def reload(self, wait: bool = False) -> bool:
+        """
+        Starts loading the model artifacts in a background thread, returns False if a reload is already in progress
+        """
+
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        self._reload_thread = threading.Thread(target=self._reload, name='model_reload', daemon=True)
+        self._reload_thread.start()
+
+        if wait:
+            self._reload_thread.join()
+
+        return True
+
+    def _watch(self):
+
+        assert self.watch_interval is not None
+
+        while not self._stop_watching.wait(self.watch_interval):
+            artifacts_marker = self._get_artifacts_marker()
+            if artifacts_marker is not None and artifacts_marker != self._last_artifacts_marker:
+                if self.reload():
+                    self._last_artifacts_marker = artifacts_marker
+
+    def start_watching(self):
+
+        if self.watch_interval is not None and self._watcher is None:
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(target=self._watch, name='model_watcher', daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def get_status(self) -> Dict[str, Any]:
+
+        return {
+            'model_version': self.model_version.version,
+            'model_objects_filepath': self.model_objects_filepath,
+            'loaded_at': self.model_version.loaded_at,
+            'n_reloads': self.n_reloads,
+            'reload_in_progress': self._reload_lock.locked(),
+            'last_reload_error': self.last_reload_error,
+        }
+
+
+def get_model_manager(project_configs: Dict[str, Any],
+                      model_objects_filepath: str,
+                      warmup: Callable[[ModelVersion], Any],
+                      model_n_jobs: Optional[int] = None,
+                      on_swap: Optional[Callable[[ModelVersion], None]] = None,
+                      ) -> ModelManager:
+    """
+    Creates the model manager of a prediction service from the settings in 'project_config.yaml'
+    """
+
+    model_manager = ModelManager(model_objects_filepath=model_objects_filepath,
+                                 warmup=warmup,
+                                 use_compiled_pipeline=project_configs.get('USE_COMPILED_PIPELINE', False),
+                                 model_n_jobs=model_n_jobs,
+                                 watch_interval=project_configs.get('MODEL_RELOAD_WATCH_INTERVAL', None),
+                                 on_swap=on_swap,
+                                 )
+
+    logger.info(f"Serving model version {model_manager.model_version.version} from {model_objects_filepath}")
+
+    return model_manager
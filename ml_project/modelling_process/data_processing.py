@@ -65,11 +65,12 @@ def apply_categorical_encoding(config: Config,
     if preprocessing_objects.one_hot_encoders is None:
         preprocessing_objects.one_hot_encoders = {}
 
+    # 'to_numpy' instead of 'values', which is a non-reshapeable Categorical for columns with compact 'category' dtype
     for cat_feature in config.cat_cols:
 
         if cat_feature not in preprocessing_objects.one_hot_encoders:
             one_hot_encoder = OneHotEncoder(sparse=False, categories='auto')
-            one_hot_encoder.fit(train_data[cat_feature].values.reshape(-1, 1))  # Reshape for single feature
+            one_hot_encoder.fit(train_data[cat_feature].to_numpy().reshape(-1, 1))  # Reshape for single feature
             preprocessing_objects.one_hot_encoders[cat_feature] = one_hot_encoder
         else:
             one_hot_encoder = preprocessing_objects.one_hot_encoders[cat_feature]
@@ -77,14 +78,14 @@ def apply_categorical_encoding(config: Config,
         cat_values = one_hot_encoder.categories_[0].tolist()
         one_hot_encoded_column_names = [f"{cat_feature}_{category}" for category in cat_values]
 
-        train_one_hot_encoded_columns = pd.DataFrame(one_hot_encoder.transform(train_data[cat_feature].values.reshape(-1, 1)),
+        train_one_hot_encoded_columns = pd.DataFrame(one_hot_encoder.transform(train_data[cat_feature].to_numpy().reshape(-1, 1)),
                                                        columns=one_hot_encoded_column_names,
                                                        index=train_data.index)
         train_data = train_data.join(train_one_hot_encoded_columns, how='left')
         train_data = train_data.drop(columns=[cat_feature])
 
         if validation_data is not None:
-            validation_one_hot_encoded_columns = pd.DataFrame(one_hot_encoder.transform(validation_data[cat_feature].values.reshape(-1, 1)),
+            validation_one_hot_encoded_columns = pd.DataFrame(one_hot_encoder.transform(validation_data[cat_feature].to_numpy().reshape(-1, 1)),
                                                    columns=one_hot_encoded_column_names,
                                                    index=validation_data.index)
             validation_data = validation_data.join(validation_one_hot_encoded_columns, how='left')
@@ -1,12 +1,9 @@
 import logging
 import statistics
-from typing import Any, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
-import mlflow
 import pandas as pd
-import skopt.space as skopt_space
 from sklearn.model_selection import KFold, StratifiedKFold
-from skopt import Optimizer
 
 from ml_project.config import Config
 from ml_project.evaluation import evaluate_predictions
@@ -14,10 +11,17 @@ from ml_project.modelling_process.data_processing import get_processed_data
 from ml_project.modelling_process.model_functions import get_model, train_model
 from ml_project.prediction_process import get_predictions
 
+if TYPE_CHECKING:
+    from skopt import Optimizer
+
 logger = logging.getLogger('standard')
 
 
-def get_hyperparameter_optimizer() -> Tuple[Optimizer, List[str]]:
+def get_hyperparameter_optimizer() -> Tuple['Optimizer', List[str]]:
+
+    # skopt and mlflow are imported lazily in the training functions, so that importing this module stays cheap for the prediction use cases
+    import skopt.space as skopt_space
+    from skopt import Optimizer
 
     #####
     # Skopt Bayesian Optimizer
@@ -208,6 +212,8 @@ def get_optimised_model(config: Config, modelling_data: pd.DataFrame):
         raise(Exception("Not supported currently"))
         best_hyperparameters = {}
 
+    import mlflow
+
     mlflow.log_metrics({'optimisation_metric': best_optimisation_metric_value})
     mlflow.log_params(best_hyperparameters)
 
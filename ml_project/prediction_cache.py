@@ -0,0 +1,144 @@
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from ml_project.data_validation import ProductionData
+from ml_project.model_export import get_model_artifacts_identity
+
+# rough per-entry overhead of the cache's bookkeeping (ordered dict node, tuple and timestamp objects)
+cache_entry_overhead_bytes = 200
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache for the predictions of single instances, keyed on a canonical hash of the validated 'ProductionData'
+    and the identity of the model artifacts, so that swapping the model invalidates all of its entries.
+    After a model swap 'model_identity' is set to the new model, the entries of the previous model are evicted as least recently used.
+    Entries are evicted once 'max_entries' or 'max_memory_bytes' is exceeded, and optionally expire after 'ttl' seconds.
+    """
+
+    def __init__(self,
+                 model_identity: str,
+                 max_entries: int = 100000,
+                 max_memory_bytes: int = 64 * 1024 ** 2,
+                 ttl: Optional[float] = None,
+                 ):
+
+        self.model_identity = model_identity
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.memory_bytes = 0
+
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_key(self, production_data: ProductionData, model_identity: Optional[str] = None) -> str:
+        """
+        Returns the cache key of 'production_data' predicted by the model 'model_identity', by default the current model of the cache
+        """
+
+        if model_identity is None:
+            model_identity = self.model_identity
+
+        canonical_data = json.dumps(production_data.dict(), sort_keys=True, separators=(',', ':'))
+
+        return hashlib.sha256(f"{model_identity}|{canonical_data}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Any, np.ndarray]]:
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                self._remove(key)
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[0]
+
+    def put(self, key: str, prediction: Tuple[Any, np.ndarray]):
+
+        prediction_label, prediction_probas_row = prediction
+        prediction_probas_row = np.array(prediction_probas_row)
+        prediction_probas_row.setflags(write=False)  # entries are shared between requests
+        entry_size = sys.getsizeof(key) + prediction_probas_row.nbytes + cache_entry_overhead_bytes
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = ((prediction_label, prediction_probas_row), time.monotonic(), entry_size)
+            self.memory_bytes += entry_size
+
+            while len(self._entries) > self.max_entries or self.memory_bytes > self.max_memory_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_predict(self,
+                       production_data: ProductionData,
+                       predict: Callable[[ProductionData], Tuple[Any, np.ndarray]],
+                       model_identity: Optional[str] = None,
+                       ) -> Tuple[Any, np.ndarray]:
+        """
+        Returns the cached prediction of 'production_data' or computes and caches it via 'predict'
+        """
+
+        key = self.get_key(production_data, model_identity)
+
+        prediction = self.get(key)
+        if prediction is None:
+            prediction = predict(production_data)
+            self.put(key, prediction)
+
+        return prediction
+
+    def _remove(self, key: str):
+
+        _, _, entry_size = self._entries.pop(key)
+        self.memory_bytes -= entry_size
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'memory_bytes': self.memory_bytes,
+            'model_identity': self.model_identity,
+        }
+
+
+def get_prediction_cache(project_configs: Dict[str, Any], model_objects_filepath: str) -> Optional[PredictionCache]:
+    """
+    Creates the prediction cache of a prediction service from the settings in 'project_config.yaml', if enabled
+    """
+
+    if not project_configs.get('USE_PREDICTION_CACHE', False):
+        return None
+
+    prediction_cache = PredictionCache(model_identity=get_model_artifacts_identity(model_objects_filepath),
+                                       max_entries=project_configs.get('PREDICTION_CACHE_MAX_ENTRIES', 100000),
+                                       max_memory_bytes=int(project_configs.get('PREDICTION_CACHE_MAX_MEMORY_MB', 64) * 1024 ** 2),
+                                       ttl=project_configs.get('PREDICTION_CACHE_TTL', None),
+                                       )
+
+    return prediction_cache
@@ -0,0 +1,169 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger('standard')
+
+# statuses of overloaded or restarting services, requests failing with them are retried with backoff
+retry_status_codes = (429, 502, 503, 504)
+
+
+def get_batch_url(prediction_service_url: str) -> Optional[str]:
+    """
+    Returns the url of the batch endpoint that the flask and fastapi services provide next to their '/predict' endpoint
+    """
+
+    if prediction_service_url.rstrip('/').endswith('/predict'):
+        return prediction_service_url.rstrip('/') + '_batch'
+
+    return None
+
+
+class PredictionClient:
+    """
+    Client of a prediction service that reuses its connections via a shared connection pool and retries failed requests with
+    exponential backoff. Several instances are predicted concurrently by at most 'max_concurrency' requests in flight.
+    With a 'batch_size', instances are sent in batches to 'batch_url', falling back to single requests if the service has no batch endpoint.
+    Predictions are idempotent, thus also the POST requests are retried.
+    """
+
+    def __init__(self,
+                 prediction_service_url: str,
+                 batch_url: Optional[str] = None,
+                 batch_size: Optional[int] = None,
+                 max_concurrency: int = 8,
+                 timeout: Union[float, Tuple[float, float]] = (3.05, 10.),
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.1,
+                 ):
+
+        self.prediction_service_url = prediction_service_url
+        self.batch_url = batch_url if batch_url is not None else get_batch_url(prediction_service_url)
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+        retry = Retry(total=max_retries,
+                      backoff_factor=backoff_factor,
+                      status_forcelist=retry_status_codes,
+                      allowed_methods=None,  # retry all methods, including POST
+                      raise_on_status=False,
+                      )
+        # one adapter, i.e. one connection pool, shared by the sessions of all threads
+        self._adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_concurrency, max_retries=retry)
+        self._sessions = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._batch_endpoint_confirmed = False
+
+    def _get_session(self) -> requests.Session:
+
+        session = getattr(self._sessions, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._sessions.session = session
+
+        return session
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='prediction_client')
+
+        return self._executor
+
+    def _post(self, url: str, payload: Any) -> Dict:
+
+        response = self._get_session().post(url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+        return response.json()
+
+    def predict(self, data_dict: Dict) -> Tuple[Any, List[float]]:
+        """
+        Returns the predicted label and the prediction probabilities of a single instance
+        """
+
+        response_dict = self._post(self.prediction_service_url, data_dict)
+
+        return response_dict['label'], response_dict['probas']
+
+    def submit(self, data_dict: Dict) -> Future:
+        """
+        Sends a single instance without waiting for its response, the returned future resolves to the result of 'predict'
+        """
+
+        return self._get_executor().submit(self.predict, data_dict)
+
+    def _predict_batch(self, data_dicts: List[Dict]) -> List[Tuple[Any, List[float]]]:
+
+        response_dict = self._post(self.batch_url, data_dicts)
+
+        return list(zip(response_dict['labels'], response_dict['probas']))
+
+    def _predict_batches(self, data_dicts: List[Dict]) -> Optional[List[Tuple[Any, List[float]]]]:
+        """
+        Returns the predictions of the batches of 'data_dicts', or None if the service turns out to have no batch endpoint
+        """
+
+        assert self.batch_size is not None and self.batch_url is not None
+
+        batches = [data_dicts[start:start + self.batch_size] for start in range(0, len(data_dicts), self.batch_size)]
+
+        if not self._batch_endpoint_confirmed:
+            # the first batch is sent alone to find out whether the batch endpoint exists
+            try:
+                first_batch_predictions = self._predict_batch(batches[0])
+            except requests.exceptions.HTTPError as error:
+                if error.response is not None and error.response.status_code in [404, 405]:
+                    logger.warning(f"No batch endpoint found at {self.batch_url}, sending single requests")
+                    self.batch_url = None
+                    return None
+                raise
+            self._batch_endpoint_confirmed = True
+        else:
+            first_batch_predictions = None
+
+        remaining_batches = batches[1:] if first_batch_predictions is not None else batches
+        batches_predictions = list(self._get_executor().map(self._predict_batch, remaining_batches))
+        if first_batch_predictions is not None:
+            batches_predictions.insert(0, first_batch_predictions)
+
+        return [prediction for batch_predictions in batches_predictions for prediction in batch_predictions]
+
+    def predict_many(self, data_dicts: List[Dict]) -> List[Tuple[Any, List[float]]]:
+        """
+        Returns the predicted labels and prediction probabilities of several instances, in the order of 'data_dicts'.
+        The requests are sent concurrently, as batches if a 'batch_size' is set and the service provides a batch endpoint.
+        """
+
+        if len(data_dicts) == 0:
+            return []
+
+        if self.batch_size is not None and self.batch_url is not None:
+            predictions = self._predict_batches(data_dicts)
+            if predictions is not None:
+                return predictions
+
+        return list(self._get_executor().map(self.predict, data_dicts))
+
+    def close(self):
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._adapter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,38 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+logger = logging.getLogger('standard')
+
+
+def get_model_n_jobs(pool_size: int, n_cpus: Optional[int] = None) -> int:
+    """
+    Returns the number of jobs a model may use per prediction so that 'pool_size' concurrently predicting workers
+    do not use more threads than cpu cores are available
+    """
+
+    if n_cpus is None:
+        n_cpus = os.cpu_count() or 1
+
+    return max(1, n_cpus // pool_size)
+
+
+def get_prediction_executor(model: Any, pool_size: Optional[int]) -> Optional[ThreadPoolExecutor]:
+    """
+    Creates a bounded thread pool for running the CPU-bound prediction pipeline outside of a service's event loop.
+    The 'n_jobs' of the model is lowered accordingly, since e.g. the random forest of 'get_model' predicts with all cores ('n_jobs=-1')
+    and would oversubscribe the cores when called from several pool workers at the same time.
+    Returns None if no pool size is given, in which case predictions are run in the calling thread.
+    """
+
+    if pool_size is None or pool_size < 1:
+        return None
+
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = get_model_n_jobs(pool_size)
+        logger.info(f"Prediction pool of {pool_size} workers, model 'n_jobs' set to {model.n_jobs}")
+
+    prediction_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='prediction')
+
+    return prediction_executor
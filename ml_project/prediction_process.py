@@ -1,10 +1,15 @@
-from typing import Any, Tuple
+import threading
+from typing import Any, Dict, Tuple, Union
 
 import pandas as pd
-import requests
 
 from ml_project.config import Config
 from ml_project.data_validation import ProductionData
+from ml_project.prediction_client import PredictionClient
+
+# clients by prediction service settings, so that their connections are reused across calls of 'get_server_predictions'
+_prediction_clients: Dict[Tuple, PredictionClient] = {}
+_prediction_clients_lock = threading.Lock()
 
 
 def get_predictions(config: Config, model: Any, data: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
@@ -15,19 +20,44 @@ def get_predictions(config: Config, model: Any, data: pd.DataFrame) -> Tuple[pd.
     return predictions, prediction_probas
 
 
-def get_server_predictions(config: Config, data: pd.Series) -> Tuple[pd.Series, pd.Series]:
-
-    # validate and parse data
-    data_dict = vars(ProductionData(**data.to_dict()))
+def get_prediction_client(config: Config) -> PredictionClient:
+    """
+    Returns the pooled client of the prediction service at 'config.prediction_service_url'
+    """
 
-    if config.prediction_service_url is not None:
-        response = requests.post(config.prediction_service_url, json=data_dict)
-    else:
+    if config.prediction_service_url is None:
         raise(Exception("No 'config.prediction_service_url' provided"))
 
-    response_dict = response.json()
+    client_key = (config.prediction_service_url, config.prediction_service_batch_size, config.prediction_service_max_concurrency, config.prediction_service_timeout)
+    with _prediction_clients_lock:
+        if client_key not in _prediction_clients:
+            _prediction_clients[client_key] = PredictionClient(config.prediction_service_url,
+                                                               batch_size=config.prediction_service_batch_size,
+                                                               max_concurrency=config.prediction_service_max_concurrency,
+                                                               timeout=(3.05, config.prediction_service_timeout),
+                                                               )
+
+    return _prediction_clients[client_key]
+
+
+def get_server_predictions(config: Config, data: Union[pd.Series, pd.DataFrame]) -> Tuple[Any, Any]:
+    """
+    Returns the predictions of the prediction service for a single instance (pd.Series) or for all rows of a pd.DataFrame.
+    The rows of a pd.DataFrame are sent concurrently (and in batches if 'config.prediction_service_batch_size' is set).
+    """
 
-    predictions = response_dict['label']
-    prediction_probas = response_dict['probas']
+    prediction_client = get_prediction_client(config)
 
-    return predictions, prediction_probas
\ No newline at end of file
+    if isinstance(data, pd.Series):
+        # validate and parse data
+        data_dict = vars(ProductionData(**data.to_dict()))
+
+        return prediction_client.predict(data_dict)
+
+    data_dicts = [vars(ProductionData(**record)) for record in data.to_dict(orient='records')]
+    labels_and_probas = prediction_client.predict_many(data_dicts)
+
+    predictions = pd.Series([label for label, _ in labels_and_probas], index=data.index)
+    prediction_probas = pd.DataFrame([probas for _, probas in labels_and_probas], index=data.index)
+
+    return predictions, prediction_probas
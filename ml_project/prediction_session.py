@@ -0,0 +1,98 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+
+import pandas as pd
+
+from ml_project.batch_prediction import RowError, get_production_data_batch, parse_production_data_columns
+from ml_project.compiled_pipeline import CompiledPipeline
+from ml_project.config import Config
+from ml_project.data_validation import ProductionData, validate_engineered_data_per_instance, validate_raw_data_per_instance
+from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
+from ml_project.model_export import load_model_artifacts
+from ml_project.modelling_process.data_processing import get_processed_data
+from ml_project.prediction_process import get_predictions
+from ml_project.production_data_retrieval import process_production_input_data_into_raw_data
+from ml_project.streaming_ingestion import consume_micro_batches, get_micro_batches
+
+logger = logging.getLogger('standard')
+
+
+class PredictionSession:
+    """
+    Local prediction pipeline that loads the model artifacts and builds the feature processes once, and then scores
+    single records, batches of records or a stream of records with them.
+    With 'use_compiled_pipeline', single records are scored via the compiled pipeline instead of the pandas-based pipeline.
+    """
+
+    def __init__(self,
+                 config: Config,
+                 model_objects_filepath: Optional[str] = None,
+                 use_compiled_pipeline: bool = False,
+                 ):
+
+        self.config = config
+        self.model_objects_filepath = model_objects_filepath if model_objects_filepath is not None else config.export_filepath
+
+        logger.info(f"Loading model objects from {self.model_objects_filepath}")
+        self.model, self.preprocessing_objects, _ = load_model_artifacts(model_objects_filepath=self.model_objects_filepath)
+        if self.model is None or self.preprocessing_objects is None:
+            raise(Exception(f"No model artifacts could be loaded from {self.model_objects_filepath}"))
+
+        self.feature_processes = get_feature_processes(config)
+
+        self.compiled_pipeline = CompiledPipeline(config, self.model, self.preprocessing_objects, self.feature_processes) if use_compiled_pipeline else None
+
+    def predict_batch(self, production_data: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+        """
+        Returns the predictions and prediction probabilities of all rows of 'production_data' from one pass through the pipeline
+        """
+
+        # data into raw_data
+        raw_data = process_production_input_data_into_raw_data(self.config, production_data)
+        validate_raw_data_per_instance(raw_data)
+
+        # feature engineering
+        data_x, engineered_feature_columns = execute_feature_engineering(self.config, raw_data, self.feature_processes, required_features=self.preprocessing_objects.features)
+        validate_engineered_data_per_instance(data_x[engineered_feature_columns])
+
+        # predictions
+        data_x_prepared, _, _ = get_processed_data(self.config, self.preprocessing_objects, data_x)
+        predictions, prediction_probas = get_predictions(self.config, self.model, data_x_prepared)
+
+        return predictions, prediction_probas
+
+    def predict_records(self, records: List[Dict]) -> Tuple[pd.Series, pd.DataFrame]:
+
+        return self.predict_batch(get_production_data_batch(records))
+
+    def validate_records(self, records: List[Any]) -> List[RowError]:
+        """
+        Returns the errors of the records that can not be converted into production data, by their position in 'records'
+        """
+
+        _, row_errors = parse_production_data_columns(records)
+
+        return row_errors
+
+    def predict_record(self, record: Dict) -> Tuple[Any, List[float]]:
+        """
+        Returns the predicted label and the prediction probabilities of a single record
+        """
+
+        if self.compiled_pipeline is not None:
+            predictions, prediction_probas = self.compiled_pipeline.predict(ProductionData(**record))
+            return predictions[0], prediction_probas[0].tolist()
+
+        predictions, prediction_probas = self.predict_records([record])
+
+        return predictions.values[0], prediction_probas.values[0].tolist()
+
+    def predict_stream(self, records: Iterable[Dict], output_file: TextIO, batch_size: int = 100, error_file: Optional[TextIO] = None) -> Dict[str, float]:
+        """
+        Scores the records of 'records' in batches of 'batch_size', writes one json line per record with its position, label and probabilities
+        to 'output_file', the invalid records to 'error_file', and returns the throughput of the stream
+        """
+
+        micro_batches = get_micro_batches(enumerate(records, start=1), max_batch_size=batch_size)
+
+        return consume_micro_batches(micro_batches, self.predict_records, output_file, error_file=error_file, validate_records=self.validate_records)
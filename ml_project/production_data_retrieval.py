@@ -1,6 +1,6 @@
 import json
 import logging
-from typing import Callable
+from typing import Callable, Optional
 
 import pandas as pd
 
@@ -12,12 +12,13 @@ logger = logging.getLogger('standard')
 
 def retrieve_production_data(config: Config, json_string: str, ) -> pd.DataFrame:
     """
-    Retrieves production data from the relevant data source (dict object, json object)
+    Retrieves production data from the relevant data source (dict object, json object or json array of objects)
     :return:
     """
 
     # from json string
-    production_data = pd.DataFrame([json.loads(json_string)])
+    records = json.loads(json_string)
+    production_data = pd.DataFrame(records if isinstance(records, list) else [records])
 
     return production_data
 
@@ -34,17 +35,31 @@ def process_production_input_data_into_raw_data(config: Config, production_data:
     return production_data
 
 
-def run_production_simulator(config: Config, callable_function: Callable):
+def run_production_simulator(config: Config, callable_function: Callable, chunk_size: Optional[int] = None):
     '''
     simulates a stream of single data instances - here retrieved from the historic data.
-    Each instance is passed to the provided 'callable_function'
+    Each instance is passed to the provided 'callable_function',
+    or with a 'chunk_size', chunks of instances are passed as json arrays, e.g. to be predicted concurrently by a prediction service
     '''
 
     historic_data = retrieve_historic_data(config).drop(columns=config.target_col)
 
-    for row_index, row in historic_data.iterrows():
+    if chunk_size is not None:
+        for start in range(0, len(historic_data), chunk_size):
 
-        json_string = json.dumps(row.to_dict())
+            json_string = historic_data.iloc[start:start + chunk_size].to_json(orient='records')
+            predictions, prediction_probas = callable_function(config, json_string)
+
+            logger.info("")
+            logger.info(f"predictions of rows {start} to {start + len(predictions) - 1}: {predictions.tolist()}")
+            logger.info("")
+
+        return
+
+    # records keep the column dtypes, unlike the rows of 'iterrows' which are upcast to a common dtype
+    for record in historic_data.to_dict(orient='records'):
+
+        json_string = json.dumps(record)
         predictions, prediction_probas = callable_function(config, json_string)
 
         logger.info("")
@@ -0,0 +1,200 @@
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# upper bounds in seconds of the latency histogram buckets, from sub-millisecond stages up to slow batch requests
+default_latency_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+
+
+def _format_labels(label_names: Sequence[str], label_values: Tuple[str, ...], extra_labels: str = "") -> str:
+
+    labels = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra_labels:
+        labels.append(extra_labels)
+
+    return "{" + ",".join(labels) + "}" if len(labels) != 0 else ""
+
+
+class Counter:
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, label_values: Tuple[str, ...] = (), amount: float = 1.):
+
+        self.values[label_values] = self.values.get(label_values, 0.) + amount
+
+    def render(self, metric_type: str = 'counter') -> List[str]:
+
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {metric_type}"]
+        lines += [f"{self.name}{_format_labels(self.label_names, label_values)} {value}" for label_values, value in sorted(self.values.items())]
+
+        return lines
+
+
+class Gauge(Counter):
+
+    def dec(self, label_values: Tuple[str, ...] = (), amount: float = 1.):
+
+        self.inc(label_values, -amount)
+
+    def render(self, metric_type: str = 'gauge') -> List[str]:
+
+        return super().render(metric_type)
+
+
+class Histogram:
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = (), buckets: Sequence[float] = default_latency_buckets):
+
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = list(buckets)
+
+        # per label values: non-cumulative bucket counts (last bucket is +Inf), sum and count of the observations
+        self.bucket_counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, label_values: Tuple[str, ...] = ()):
+
+        bucket_counts = self.bucket_counts.get(label_values)
+        if bucket_counts is None:
+            bucket_counts = self.bucket_counts[label_values] = [0] * (len(self.buckets) + 1)
+            self.sums[label_values] = 0.
+
+        bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[label_values] += value
+
+    def render(self) -> List[str]:
+
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+
+        for label_values, bucket_counts in sorted(self.bucket_counts.items()):
+            cumulative_count = 0
+            for upper_bound, bucket_count in zip(self.buckets + ['+Inf'], bucket_counts):
+                cumulative_count += bucket_count
+                bucket_label = f'le="{upper_bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, label_values, bucket_label)} {cumulative_count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, label_values)} {self.sums[label_values]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, label_values)} {cumulative_count}")
+
+        return lines
+
+
+class _NullTimer:
+    """
+    Timer returned while the instrumentation is disabled, entering and exiting it does nothing
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_null_timer = _NullTimer()
+
+
+class _StageTimer:
+
+    __slots__ = ('serving_metrics', 'stage', 'start_time')
+
+    def __init__(self, serving_metrics: 'ServingMetrics', stage: str):
+
+        self.serving_metrics = serving_metrics
+        self.stage = stage
+
+    def __enter__(self):
+
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.serving_metrics.observe_stage(self.stage, time.perf_counter() - self.start_time)
+        return False
+
+
+class ServingMetrics:
+    """
+    Latency histograms of the stages of the prediction pipeline and request counts, error counts and in-flight gauges per endpoint,
+    rendered in the Prometheus text exposition format.
+    If not 'enabled', 'time_stage' returns a shared no-op timer and all recording methods return immediately.
+    """
+
+    def __init__(self, enabled: bool = True):
+
+        self.enabled = enabled
+
+        self.stage_durations = Histogram('prediction_stage_duration_seconds', "Duration of the stages of the prediction pipeline", ['stage'])
+        self.request_durations = Histogram('prediction_request_duration_seconds', "Duration of the requests per endpoint", ['endpoint'])
+        self.requests = Counter('prediction_requests_total', "Number of requests per endpoint", ['endpoint'])
+        self.request_errors = Counter('prediction_request_errors_total', "Number of requests per endpoint that failed or returned an error status", ['endpoint'])
+        self.requests_in_flight = Gauge('prediction_requests_in_flight', "Number of requests per endpoint that are currently processed", ['endpoint'])
+
+        self._lock = threading.Lock()
+
+    def time_stage(self, stage: str) -> Any:
+        """
+        Returns a context manager that records the duration of its block as the duration of 'stage'
+        """
+
+        if not self.enabled:
+            return _null_timer
+
+        return _StageTimer(self, stage)
+
+    def observe_stage(self, stage: str, duration: float):
+
+        with self._lock:
+            self.stage_durations.observe(duration, (stage,))
+
+    def start_request(self, endpoint: str) -> Optional[float]:
+        """
+        Records the start of a request to 'endpoint', returns its start time to be passed to 'end_request'
+        """
+
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            self.requests.inc((endpoint,))
+            self.requests_in_flight.inc((endpoint,))
+
+        return time.perf_counter()
+
+    def end_request(self, endpoint: str, start_time: Optional[float], failed: bool):
+
+        if start_time is None:
+            return
+
+        duration = time.perf_counter() - start_time
+        with self._lock:
+            self.requests_in_flight.dec((endpoint,))
+            self.request_durations.observe(duration, (endpoint,))
+            if failed:
+                self.request_errors.inc((endpoint,))
+
+    def render(self) -> str:
+
+        with self._lock:
+            lines = []
+            for metric in [self.requests, self.request_errors, self.requests_in_flight, self.request_durations, self.stage_durations]:
+                lines += metric.render()
+
+        return "\n".join(lines) + "\n"
+
+
+def get_serving_metrics(project_configs: Dict[str, Any]) -> ServingMetrics:
+    """
+    Creates the serving metrics of a prediction service, enabled according to the settings in 'project_config.yaml'
+    """
+
+    return ServingMetrics(enabled=project_configs.get('ENABLE_SERVING_METRICS', False))
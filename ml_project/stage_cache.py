@@ -0,0 +1,303 @@
+"""
+On-disk cache of the raw and engineered historic datasets.
+
+Usage: pipenv run python -m ml_project.stage_cache list
+       pipenv run python -m ml_project.stage_cache clear [--stage engineered_data]
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from ml_project.config import Config
+from ml_project.data_validation import engineered_data_schema, raw_data_schema
+from ml_project.dtype_optimisation import get_compact_dtype, optimise_dtypes
+from ml_project.feature_engineering.feature_dag import FeatureDag
+from ml_project.feature_engineering.feature_engineering import execute_feature_engineering
+from ml_project.feature_engineering.fused_features import FusedFeatureProcesses
+from ml_project.feature_engineering.parallel_features import ChunkedFeatureProcesses
+from ml_project.historic_data_retrieval import get_parquet_dataset, process_historic_data_into_raw_data, retrieve_from_parquet, retrieve_historic_data
+from ml_project.sql_data_retrieval import get_sql_query, retrieve_from_sql
+from ml_project.utils import get_project_root, setup_logging
+
+logger = logging.getLogger('standard')
+
+# column holding the index of a cached DataFrame, since feather files only store columns
+index_col = '__index__'
+
+# config fields that determine the raw data, the feature processes are fingerprinted separately
+raw_data_config_fields = ['data_filepath', 'historic_data_sql_table', 'historic_data_sql_query', 'historic_data_n_rows', 'historic_data_filters', 'historic_data_compact_dtypes', 'target_col', 'cont_cols', 'cat_cols', 'aux_cols']
+
+
+def get_hash(value: Any) -> str:
+
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_source_fingerprint(filepath: str, content_hash: bool = False) -> Dict[str, Any]:
+    """
+    Identifies the state of a source file by its size and modification time, or by the hash of its content if 'content_hash' is set,
+    e.g. for files that are copied around with new modification times
+    """
+
+    if content_hash:
+        file_hash = hashlib.sha256()
+        with open(filepath, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                file_hash.update(block)
+        return {'filepath': os.path.abspath(filepath), 'sha256': file_hash.hexdigest()}
+
+    file_stat = os.stat(filepath)
+
+    return {'filepath': os.path.abspath(filepath), 'size': file_stat.st_size, 'mtime_ns': file_stat.st_mtime_ns}
+
+
+def get_parquet_source_fingerprint(filepath_parquet: str) -> Dict[str, Any]:
+    """
+    Identifies the state of a parquet source by the fingerprints of all files it resolves to, so that a glob pattern or a directory of
+    partitions is invalidated by a changed, added or removed file
+    """
+
+    return {'filepath': filepath_parquet, 'files': [get_source_fingerprint(filepath) for filepath in sorted(get_parquet_dataset(filepath_parquet).files)]}
+
+
+def get_code_fingerprint(code_object: Any) -> str:
+    """
+    Hash of the source code of a function or class, so that code changes invalidate the cached results of a stage
+    """
+
+    return get_hash(inspect.getsource(code_object))
+
+
+def get_schema_fingerprint(schema: Any) -> List:
+    """
+    Columns, dtypes, nullability and check statistics of a pandera 'DataFrameSchema'
+    """
+
+    return [[name, str(column.dtype), column.nullable, [[check.name, check.statistics] for check in column.checks]] for name, column in schema.columns.items()]
+
+
+def get_feature_processes_fingerprint(feature_processes: List) -> List:
+    """
+    Class, code and parameters of each feature process
+    """
+
+    return [[type(feature_process).__qualname__, get_code_fingerprint(type(feature_process)), dict(vars(feature_process))] for feature_process in feature_processes]
+
+
+def get_sql_source_fingerprint(connection_uri: str) -> Dict[str, Any]:
+    """
+    Identifies a sqlite database by its file, other databases only by their host and database name (without the credentials of the uri),
+    i.e. changes of their tables are not detected and the cache has to be cleared after them
+    """
+
+    parsed_uri = urlparse(connection_uri)
+    if parsed_uri.scheme == 'sqlite':
+        return get_source_fingerprint(connection_uri[len('sqlite:///'):])
+
+    return {'database': f"{parsed_uri.scheme}://{parsed_uri.hostname}:{parsed_uri.port}{parsed_uri.path}"}
+
+
+def get_raw_data_fingerprint(config: Config) -> Dict[str, Any]:
+    """
+    Everything the validated raw data depends on: the source file or database, the relevant config fields, the raw data schema and the retrieval code
+    """
+
+    return {
+        'source': get_parquet_source_fingerprint(config.data_filepath) if config.historic_data_sql_uri is None else get_sql_source_fingerprint(config.historic_data_sql_uri),
+        'config': {field: getattr(config, field) for field in raw_data_config_fields},
+        'schema': get_schema_fingerprint(raw_data_schema),
+        'code': [get_code_fingerprint(function) for function in [get_parquet_dataset, retrieve_from_parquet, retrieve_from_sql, get_sql_query, retrieve_historic_data, process_historic_data_into_raw_data, get_compact_dtype, optimise_dtypes]],
+    }
+
+
+def get_engineered_data_fingerprint(config: Config, feature_processes: List) -> Dict[str, Any]:
+
+    return {
+        'raw_data': get_raw_data_fingerprint(config),
+        'feature_processes': get_feature_processes_fingerprint(feature_processes),
+        'schema': get_schema_fingerprint(engineered_data_schema),
+        'code': [get_code_fingerprint(execute_feature_engineering), get_code_fingerprint(FeatureDag), get_code_fingerprint(FusedFeatureProcesses), get_code_fingerprint(ChunkedFeatureProcesses)],
+    }
+
+
+class StageCache:
+    """
+    Stores the DataFrames produced by pipeline stages as feather files, keyed by a fingerprint of everything the result depends on
+    (source file, config fields, code and parameters of the stage). Each entry has a json file with its stage, size and last access time.
+    If the cache exceeds 'max_size_mb', the least recently used entries are evicted.
+    If not 'enabled', 'get_or_compute' computes the stage without reading or writing the cache.
+    """
+
+    def __init__(self, cache_folderpath: str, max_size_mb: float = 1024., enabled: bool = True):
+
+        self.cache_folderpath = cache_folderpath
+        self.max_size_bytes = int(max_size_mb * 1024 ** 2)
+        self.enabled = enabled
+
+    def _get_data_filepath(self, key: str) -> str:
+        return os.path.join(self.cache_folderpath, f"{key}.feather")
+
+    def _get_metadata_filepath(self, key: str) -> str:
+        return os.path.join(self.cache_folderpath, f"{key}.json")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+
+        try:
+            table = feather.read_table(self._get_data_filepath(key))
+            with open(self._get_metadata_filepath(key), "r") as file:
+                metadata = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        data = table.to_pandas().set_index(index_col)
+        data.index.name = None
+
+        metadata['last_access'] = time.time()
+        self._write_metadata(key, metadata)
+
+        return data
+
+    def _write_metadata(self, key: str, metadata: Dict[str, Any]):
+
+        temporary_filepath = self._get_metadata_filepath(key) + ".tmp"
+        with open(temporary_filepath, "w") as file:
+            json.dump(metadata, file)
+        os.replace(temporary_filepath, self._get_metadata_filepath(key))
+
+    def put(self, key: str, stage: str, data: pd.DataFrame):
+
+        os.makedirs(self.cache_folderpath, exist_ok=True)
+
+        # written to a temporary file first, so that a concurrent or interrupted run never reads a partial file
+        temporary_filepath = self._get_data_filepath(key) + ".tmp"
+        feather.write_feather(data.rename_axis(index_col).reset_index(), temporary_filepath)
+        os.replace(temporary_filepath, self._get_data_filepath(key))
+
+        self._write_metadata(key, {
+            'key': key,
+            'stage': stage,
+            'n_rows': len(data),
+            'size_bytes': os.path.getsize(self._get_data_filepath(key)),
+            'created_at': time.time(),
+            'last_access': time.time(),
+        })
+
+        self.evict()
+
+    def get_or_compute(self, stage: str, fingerprint: Any, compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Returns the cached result of 'stage' for 'fingerprint', or computes it via 'compute' and caches it
+        """
+
+        if not self.enabled:
+            return compute()
+
+        key = f"{stage}_{get_hash(fingerprint)[:24]}"
+
+        start_time = time.perf_counter()
+        data = self.get(key)
+        if data is not None:
+            logger.info(f"Stage cache hit for '{stage}', loaded {len(data)} rows in {(time.perf_counter() - start_time) * 1000:.1f} ms")
+            return data
+
+        logger.info(f"Stage cache miss for '{stage}'")
+        data = compute()
+        self.put(key, stage, data)
+
+        return data
+
+    def list_entries(self) -> List[Dict[str, Any]]:
+
+        if not os.path.isdir(self.cache_folderpath):
+            return []
+
+        entries = []
+        for filename in sorted(os.listdir(self.cache_folderpath)):
+            if filename.endswith(".json"):
+                try:
+                    with open(os.path.join(self.cache_folderpath, filename), "r") as file:
+                        entries.append(json.load(file))
+                except (FileNotFoundError, json.JSONDecodeError):
+                    continue
+
+        return entries
+
+    def remove(self, key: str):
+
+        for filepath in [self._get_data_filepath(key), self._get_metadata_filepath(key)]:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache is not larger than 'max_size_bytes'
+        """
+
+        entries = sorted(self.list_entries(), key=lambda entry: entry['last_access'])
+        cache_size = sum([entry['size_bytes'] for entry in entries])
+
+        for entry in entries:
+            if cache_size <= self.max_size_bytes:
+                break
+            self.remove(entry['key'])
+            cache_size -= entry['size_bytes']
+            logger.info(f"Evicted stage cache entry {entry['key']} ({entry['size_bytes'] / 1024 ** 2:.1f} MB)")
+
+    def clear(self, stage: Optional[str] = None) -> int:
+        """
+        Removes all entries, or only the ones of 'stage', and returns the number of removed entries
+        """
+
+        entries = [entry for entry in self.list_entries() if stage is None or entry['stage'] == stage]
+        for entry in entries:
+            self.remove(entry['key'])
+
+        return len(entries)
+
+
+def get_stage_cache(config: Config) -> StageCache:
+    """
+    Creates the stage cache of a run, disabled if 'config.stage_cache_folderpath' is None
+    """
+
+    return StageCache(cache_folderpath=config.stage_cache_folderpath or "",
+                      max_size_mb=config.stage_cache_max_size_mb,
+                      enabled=config.stage_cache_folderpath is not None,
+                      )
+
+
+def get_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the stage cache")
+    parser.add_argument('command', choices=['list', 'clear'])
+    parser.add_argument('--cache-folderpath', default=os.path.join(get_project_root(), "data/stage_cache"))
+    parser.add_argument('--stage', default=None, help="only clear the entries of this stage, e.g. 'raw_data' or 'engineered_data'")
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+
+    setup_logging('standard')
+    arguments = get_arguments()
+
+    stage_cache = StageCache(arguments.cache_folderpath)
+
+    if arguments.command == 'list':
+        entries = stage_cache.list_entries()
+        for entry in sorted(entries, key=lambda entry: entry['last_access'], reverse=True):
+            logger.info(f"{entry['key']:<40} {entry['stage']:<16} {entry['n_rows']:>10} rows {entry['size_bytes'] / 1024 ** 2:>9.1f} MB  "
+                        f"last access {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['last_access']))}")
+        logger.info(f"{len(entries)} entries, {sum([entry['size_bytes'] for entry in entries]) / 1024 ** 2:.1f} MB in {arguments.cache_folderpath}")
+    else:
+        n_removed_entries = stage_cache.clear(arguments.stage)
+        logger.info(f"Removed {n_removed_entries} entries from {arguments.cache_folderpath}")
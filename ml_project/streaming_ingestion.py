@@ -0,0 +1,329 @@
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import pandas as pd
+import pandera as pa
+
+from ml_project.batch_prediction import RowError, loads_json
+
+logger = logging.getLogger('standard')
+
+# a record together with the offset from which a consumer resumes after having processed it
+OffsetRecord = Tuple[int, Any]
+
+# marks the end of a queue source
+end_of_stream = None
+
+# errors caused by the values of a record (pydantic, the schema checks, unknown categories), other errors fail the stream
+record_error_types = (ValueError, pa.errors.SchemaError, pa.errors.SchemaErrors)
+
+
+@dataclass
+class UndecodableRecord:
+    """
+    Line of a source that is no valid json, yielded in place of its record so that the consumer rejects it instead of the source failing
+    """
+
+    line: str
+    error: str
+
+
+def decode_line(line: bytes) -> Any:
+
+    try:
+        return loads_json(line)
+    except ValueError as error:
+        return UndecodableRecord(line=line.decode(errors='replace').rstrip("\r\n"), error=f"invalid json: {error}")
+
+
+def read_jsonl_records(filepath: str, start_offset: int = 0) -> Iterator[OffsetRecord]:
+    """
+    Yields the records of a json lines file, starting at the byte offset 'start_offset', lines that are no valid json as 'UndecodableRecord'.
+    The offset of a record is the byte offset of the line following it.
+    """
+
+    with open(filepath, "rb") as file:
+        file.seek(start_offset)
+        for line in iter(file.readline, b""):
+            if len(line.strip()) != 0:
+                yield file.tell(), decode_line(line)
+
+
+def read_line_records(lines: Iterable[str], start_offset: int = 0) -> Iterator[OffsetRecord]:
+    """
+    Yields the records of json lines from a non-seekable source, e.g. stdin. The offset of a record is the number of lines read up to it,
+    lines before 'start_offset' are skipped.
+    """
+
+    for line_number, line in enumerate(lines, start=1):
+        if line_number > start_offset and len(line.strip()) != 0:
+            yield line_number, decode_line(line.encode())
+
+
+def read_stdin_records(start_offset: int = 0) -> Iterator[OffsetRecord]:
+
+    return read_line_records(sys.stdin, start_offset)
+
+
+def read_queue_records(record_queue: queue.Queue, start_offset: int = 0) -> Iterator[OffsetRecord]:
+    """
+    Yields the records put into 'record_queue' by a producer, e.g. a socket listener, until 'end_of_stream' is put.
+    The offset of a record is the number of records received up to it, records before 'start_offset' are skipped.
+    """
+
+    n_records = 0
+    while True:
+        record = record_queue.get()
+        if record is end_of_stream:
+            return
+        n_records += 1
+        if n_records > start_offset:
+            yield n_records, record
+
+
+def get_record_source(records_filepath: str, start_offset: int = 0) -> Iterator[OffsetRecord]:
+    """
+    Returns the records of a json lines file, or of stdin if 'records_filepath' is '-'
+    """
+
+    if records_filepath == '-':
+        return read_stdin_records(start_offset)
+
+    return read_jsonl_records(records_filepath, start_offset)
+
+
+@dataclass
+class MicroBatch:
+
+    records: List[Any]
+    offsets: List[int]  # offset of each record, i.e. its id in the stream
+
+    @property
+    def offset(self) -> int:
+        # offset after the last record of the batch
+        return self.offsets[-1]
+
+
+class _SourceError:
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def get_micro_batches(source: Iterable[OffsetRecord],
+                      max_batch_size: int = 100,
+                      max_wait_time: Optional[float] = None,
+                      max_buffered_records: int = 1000,
+                      ) -> Iterator[MicroBatch]:
+    """
+    Groups the records of 'source' into micro-batches that are closed as soon as they hold 'max_batch_size' records
+    or their first record waited 'max_wait_time' seconds (no time bound if None).
+    The source is read by a background thread into a buffer of at most 'max_buffered_records' records; if the consumer falls behind,
+    the buffer fills up and the reading blocks (backpressure) instead of the records piling up in memory.
+    """
+
+    buffer: queue.Queue = queue.Queue(maxsize=max_buffered_records)
+    stop_reading = threading.Event()
+
+    def put(item) -> bool:
+        while not stop_reading.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read_source():
+        try:
+            for offset_record in source:
+                if not put(offset_record):
+                    return
+            put(end_of_stream)
+        except BaseException as error:
+            put(_SourceError(error))
+
+    reader = threading.Thread(target=read_source, name='stream_reader', daemon=True)
+    reader.start()
+
+    try:
+        end_reached = False
+        while not end_reached:
+            item = buffer.get()
+            if item is end_of_stream:
+                return
+            if isinstance(item, _SourceError):
+                raise(item.error)
+
+            offset, record = item
+            records, offsets = [record], [offset]
+            deadline = time.monotonic() + max_wait_time if max_wait_time is not None else None
+
+            while len(records) < max_batch_size:
+                try:
+                    if deadline is None:
+                        item = buffer.get()
+                    else:
+                        item = buffer.get(timeout=max(deadline - time.monotonic(), 0.))
+                except queue.Empty:
+                    break
+
+                if item is end_of_stream:
+                    end_reached = True
+                    break
+                if isinstance(item, _SourceError):
+                    # the records read so far are processed before the error is raised
+                    yield MicroBatch(records=records, offsets=offsets)
+                    raise(item.error)
+
+                offset, record = item
+                records.append(record)
+                offsets.append(offset)
+
+            yield MicroBatch(records=records, offsets=offsets)
+    finally:
+        stop_reading.set()
+
+
+class OffsetCheckpoint:
+    """
+    Stores the offset up to which a stream was consumed, so that a restarted consumer resumes after the last processed micro-batch.
+    The checkpoint file is replaced atomically, a crash while writing leaves the previous checkpoint intact.
+    """
+
+    def __init__(self, checkpoint_filepath: str):
+
+        self.checkpoint_filepath = checkpoint_filepath
+
+    def load(self) -> int:
+
+        if not os.path.exists(self.checkpoint_filepath):
+            return 0
+
+        with open(self.checkpoint_filepath, "r") as file:
+            return json.load(file)['offset']
+
+    def save(self, offset: int):
+
+        checkpoint_folderpath = os.path.dirname(self.checkpoint_filepath)
+        if checkpoint_folderpath:
+            os.makedirs(checkpoint_folderpath, exist_ok=True)
+
+        temporary_filepath = self.checkpoint_filepath + ".tmp"
+        with open(temporary_filepath, "w") as file:
+            json.dump({'offset': offset, 'saved_at': time.time()}, file)
+        os.replace(temporary_filepath, self.checkpoint_filepath)
+
+
+def get_record_errors(row_errors: List[RowError]) -> Dict[int, str]:
+    """
+    Error message of each invalid record from the 'row_errors' of its fields
+    """
+
+    record_errors: Dict[int, str] = {}
+    for row_error in row_errors:
+        message = (f"field '{row_error.field}': " if row_error.field is not None else "") + row_error.message
+        record_errors[row_error.row] = f"{record_errors[row_error.row]}, {message}" if row_error.row in record_errors else message
+
+    return record_errors
+
+
+def predict_micro_batch_records(records: List[Any],
+                                predict_records: Callable[[List[Dict]], Tuple[pd.Series, pd.DataFrame]],
+                                validate_records: Optional[Callable[[List[Any]], List[RowError]]] = None,
+                                ) -> Tuple[Dict[int, Tuple[Any, List[float]]], Dict[int, str]]:
+    """
+    Returns the label and probabilities of each valid record and the error of each invalid record, both by the position of the record.
+    Undecodable records and the records with errors from 'validate_records' are rejected up front, the others are scored as one batch.
+    If the batch fails with one of 'record_error_types' (e.g. on a value check of the schema), its records are scored one by one and only
+    the failing ones are rejected.
+    """
+
+    record_errors = {position: record.error for position, record in enumerate(records) if isinstance(record, UndecodableRecord)}
+
+    if validate_records is not None:
+        decoded_positions = [position for position in range(len(records)) if position not in record_errors]
+        validation_errors = get_record_errors(validate_records([records[position] for position in decoded_positions]))
+        record_errors.update({decoded_positions[row]: message for row, message in validation_errors.items()})
+
+    valid_positions = [position for position in range(len(records)) if position not in record_errors]
+    if len(valid_positions) == 0:
+        return {}, record_errors
+
+    record_predictions: Dict[int, Tuple[Any, List[float]]] = {}
+    try:
+        predictions, prediction_probas = predict_records([records[position] for position in valid_positions])
+        record_predictions.update(zip(valid_positions, zip(predictions.values.tolist(), prediction_probas.values.tolist())))
+    except record_error_types as batch_error:
+        logger.warning(f"Scoring a micro-batch of {len(valid_positions)} records failed ({type(batch_error).__name__}: {batch_error}), scoring its records one by one")
+        for position in valid_positions:
+            try:
+                predictions, prediction_probas = predict_records([records[position]])
+                record_predictions[position] = (predictions.values.tolist()[0], prediction_probas.values.tolist()[0])
+            except record_error_types as error:
+                record_errors[position] = f"{type(error).__name__}: {error}"
+
+    return record_predictions, record_errors
+
+
+def consume_micro_batches(micro_batches: Iterable[MicroBatch],
+                          predict_records: Callable[[List[Dict]], Tuple[pd.Series, pd.DataFrame]],
+                          output_file: TextIO,
+                          checkpoint: Optional[OffsetCheckpoint] = None,
+                          error_file: Optional[TextIO] = None,
+                          validate_records: Optional[Callable[[List[Any]], List[RowError]]] = None,
+                          ) -> Dict[str, float]:
+    """
+    Scores each micro-batch with 'predict_records' (validation, feature engineering and prediction), writes one json line per record
+    with its offset, label and probabilities to 'output_file' and returns the throughput of the stream.
+    Invalid records (see 'predict_micro_batch_records') are written with their offset and error to 'error_file' (logged if None) instead
+    of failing the stream, so that a restarted consumer does not fail on the same record again.
+    The offset of a micro-batch is checkpointed once its predictions and errors are flushed, i.e. records are delivered at least once.
+    """
+
+    n_records, n_rejected_records, n_batches = 0, 0, 0
+
+    start_time = time.perf_counter()
+    for micro_batch in micro_batches:
+        record_predictions, record_errors = predict_micro_batch_records(micro_batch.records, predict_records, validate_records)
+
+        for position, offset in enumerate(micro_batch.offsets):
+            if position in record_predictions:
+                label, probas = record_predictions[position]
+                output_file.write(json.dumps({'offset': offset, 'label': label, 'probas': probas}) + "\n")
+            else:
+                record = micro_batch.records[position]
+                error_record = {'offset': offset, 'record': record.line if isinstance(record, UndecodableRecord) else record, 'error': record_errors[position]}
+                if error_file is not None:
+                    error_file.write(json.dumps(error_record, default=str) + "\n")
+                else:
+                    logger.error(f"Rejected record: {json.dumps(error_record, default=str)}")
+
+        if checkpoint is not None:
+            output_file.flush()
+            if error_file is not None:
+                error_file.flush()
+            checkpoint.save(micro_batch.offset)
+
+        n_records += len(micro_batch.records)
+        n_rejected_records += len(record_errors)
+        n_batches += 1
+    duration = time.perf_counter() - start_time
+
+    stream_summary = {
+        'n_records': n_records,
+        'n_rejected_records': n_rejected_records,
+        'n_batches': n_batches,
+        'duration_s': duration,
+        'records_per_s': n_records / duration if duration > 0 else 0.,
+    }
+    logger.info(f"Scored {n_records} records ({n_rejected_records} rejected) in {n_batches} batches in {duration:.2f}s ({stream_summary['records_per_s']:.1f} records/s)")
+
+    return stream_summary
@@ -1,9 +1,8 @@
 import logging
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
 
-import mlflow
 import pandas as pd
 import yaml
 
@@ -13,6 +12,9 @@ def set_mlflow_experiment(experiment_name: str, sqlite_uri: Optional[str] = None
     Sets tracking_uri for the mlflow metadata database and sets experiment_name
     """
 
+    # imported lazily, since the prediction services import this module but do not need mlflow
+    import mlflow
+
     if sqlite_uri is None:
         sqlite_uri = f'sqlite:///{os.path.join(get_project_root(), "data/mlflow.db")}'
 
@@ -38,15 +40,25 @@ def setup_logging(name: str) -> logging.Logger:
     return logger
 
 
-def get_model_artifacts_filepath() -> str:
+def get_project_configs() -> Dict[str, Any]:
     """
-    Helper function to retrieve the model artifacts filepath from the 'project_config.yaml' file
+    Helper function to retrieve the project-wide settings from the 'project_config.yaml' file
     """
 
     project_configs_filepath = os.path.join(get_project_root(), "project_config.yaml")
     with open(project_configs_filepath, 'r') as stream:
         project_configs = yaml.safe_load(stream)
 
+    return project_configs
+
+
+def get_model_artifacts_filepath() -> str:
+    """
+    Helper function to retrieve the model artifacts filepath from the 'project_config.yaml' file
+    """
+
+    project_configs = get_project_configs()
+
     model_objects_filepath = os.path.join(get_project_root(), project_configs['MODEL_OBJECTS_FILEPATH'])
 
     return model_objects_filepath
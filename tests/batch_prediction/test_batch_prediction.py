@@ -0,0 +1,147 @@
+import json
+import random
+
+import pandas as pd
+import pytest
+
+import ml_project.batch_prediction as batch_prediction
+from ml_project.batch_prediction import BatchSizeError, get_production_data_batch, get_schema_errors_dict, parse_batch_records, parse_production_data_bulk, schema_error_types
+from ml_project.data_validation import ProductionData, raw_data_schema, validate_raw_data_per_instance
+
+
+@pytest.fixture
+def records():
+
+    return [
+        {'pclass': 3, 'sex': 'male', 'age': 22, 'siblings_spouses_aboard': 1, 'parents_children_aboard': 0, 'fare': 7.25},
+        {'pclass': 1, 'sex': 'female', 'age': 38.5, 'siblings_spouses_aboard': 1, 'parents_children_aboard': 0, 'fare': 71.2833},
+    ]
+
+
+def test_parse_batch_records(records):
+
+    json_array = json.dumps(records)
+    json_object = json.dumps({'instances': records})
+    json_lines = "\n".join([json.dumps(record) for record in records]) + "\n"
+
+    assert all([parse_batch_records(body) == records for body in [json_array, json_object, json_lines.encode()]])
+
+
+def test_get_production_data_batch(records):
+
+    production_data = get_production_data_batch(records, max_batch_size=2)
+
+    columns_are_ordered = production_data.columns.tolist() == ['pclass', 'sex', 'age', 'siblings_spouses_aboard', 'parents_children_aboard', 'fare']
+    dtypes_are_coerced = (production_data['age'].dtype == 'float64') and (production_data['pclass'].dtype == 'int64')
+
+    assert all([columns_are_ordered, dtypes_are_coerced])
+
+
+def test_get_production_data_batch_max_batch_size(records):
+
+    with pytest.raises(BatchSizeError):
+        get_production_data_batch(records, max_batch_size=1)
+
+
+def test_oversized_batch_body_is_rejected_before_decoding(records, monkeypatch):
+
+    def decode_batch_records(body):
+        raise(AssertionError("oversized body was decoded"))
+
+    monkeypatch.setattr(batch_prediction, 'decode_batch_records', decode_batch_records)
+    oversized_body = json.dumps(records * batch_prediction.max_record_size_bytes)
+
+    with pytest.raises(BatchSizeError, match="bytes"):
+        parse_production_data_bulk(oversized_body, max_batch_size=2)
+    with pytest.raises(BatchSizeError, match="bytes"):
+        parse_batch_records(oversized_body.encode(), max_batch_size=2)
+    with pytest.raises(BatchSizeError, match="bytes"):
+        batch_prediction.check_batch_body_size(2 * batch_prediction.max_record_size_bytes + 1, max_batch_size=2)
+
+    assert all([
+        parse_batch_records(json.dumps(records), max_batch_size=2) == records,
+        batch_prediction.check_batch_body_size(None, max_batch_size=2) is None,
+    ])
+
+
+def test_parse_production_data_bulk_row_errors(records):
+
+    invalid_records = [records[0], {**records[1], 'age': None}, [1, 2], {key: value for key, value in records[0].items() if key != 'fare'}, records[1]]
+    json_lines = "\n".join([json.dumps(record) for record in invalid_records[:2]]) + "\n{invalid\n" + json.dumps(records[1])
+
+    production_data, row_errors = parse_production_data_bulk(json.dumps(invalid_records))
+    json_lines_production_data, json_lines_row_errors = parse_production_data_bulk(json_lines)
+
+    assert all([
+        production_data.index.tolist() == [0, 4],
+        production_data.to_dict(orient='records') == [ProductionData(**records[0]).dict(), ProductionData(**records[1]).dict()],
+        [(row_error.row, row_error.field) for row_error in row_errors] == [(1, 'age'), (2, None), (3, 'fare')],
+        row_errors[2].message == "field required",
+        json_lines_production_data.index.tolist() == [0, 3],
+        [(row_error.row, row_error.field) for row_error in json_lines_row_errors] == [(1, 'age'), (2, None)],
+    ])
+
+    with pytest.raises(ValueError, match="row 1 field 'age'"):
+        get_production_data_batch(invalid_records[:2])
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_parse_production_data_bulk_equals_production_data(records, monkeypatch, use_orjson):
+
+    if not use_orjson:
+        monkeypatch.setattr(batch_prediction, 'orjson', None)
+
+    # valid values followed by values that are converted or rejected by 'ProductionData'
+    field_values = {
+        'pclass': [1, 3, '2', 2.0, 2.7, True, None, 'a', 2 ** 70],
+        'sex': ['male', 'female', 1, 2.5, None, ['male']],
+        'age': [22., 38, '22.5', True, None, 'a', 1e300],
+        'siblings_spouses_aboard': [0, 1, '1', None],
+        'parents_children_aboard': [0, 2, 1.5, {}],
+        'fare': [7.25, 71, '7.5', None],
+    }
+    random_generator = random.Random(3)
+    random_records = [{field: random_generator.choice(values[:2] if random_generator.random() < 0.7 else values) for field, values in field_values.items()}
+                      for _ in range(300)]
+
+    production_data, row_errors = parse_production_data_bulk(json.dumps(random_records))
+
+    expected_rows, expected_invalid_rows = {}, set()
+    for row, record in enumerate(json.loads(json.dumps(random_records))):
+        try:
+            instance = ProductionData(**record).dict()
+            if abs(instance['pclass']) >= 2 ** 63:
+                expected_invalid_rows.add(row)
+            else:
+                expected_rows[row] = instance
+        except Exception:
+            expected_invalid_rows.add(row)
+
+    expected_production_data = pd.DataFrame.from_dict(expected_rows, orient='index')
+
+    pd.testing.assert_frame_equal(production_data, expected_production_data, check_index_type=False)
+    assert all([
+        {row_error.row for row_error in row_errors} == expected_invalid_rows,
+        len(expected_invalid_rows) != 0,
+    ])
+
+
+def test_schema_errors_dict_has_row_positions(records):
+
+    out_of_range_records = [records[0], {**records[1], 'age': -5}, records[0]]
+    production_data, row_errors = parse_production_data_bulk(json.dumps(out_of_range_records))
+
+    with pytest.raises(schema_error_types) as error_info:
+        validate_raw_data_per_instance(production_data)
+    with pytest.raises(schema_error_types) as lazy_error_info:
+        raw_data_schema(production_data.assign(sex=['male', 'male', 'unknown']), lazy=True)
+
+    schema_errors_dict = get_schema_errors_dict(error_info.value)
+    lazy_schema_errors_dict = get_schema_errors_dict(lazy_error_info.value)
+
+    assert all([
+        row_errors == [],
+        [(row_error['row'], row_error['field']) for row_error in schema_errors_dict['row_errors']] == [(1, 'age')],
+        "-5.0" in schema_errors_dict['row_errors'][0]['message'],
+        [(row_error['row'], row_error['field']) for row_error in lazy_schema_errors_dict['row_errors']] == [(1, 'age'), (2, 'sex')],
+    ])
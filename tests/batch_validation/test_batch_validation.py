@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_project.batch_validation import validate_as_batch
+from ml_project.data_validation import engineered_data_schema, raw_data_schema, validate_engineered_data_as_batch
+
+
+@pytest.fixture
+def engineered_data():
+
+    return pd.DataFrame({
+        'survived': [0, 1, 1, 1, 0, 0],
+        'pclass': [3, 1, 3, 1, 3, 3],
+        'sex': ['male', 'female', 'female', 'female', 'male', None],
+        'age': [22., 38., 26., 35., 35., np.nan],
+        'siblings_spouses_aboard': [1, 1, 0, 1, 0, 0],
+        'parents_children_aboard': [0, 0, 0, 0, 0, 0],
+        'fare': [7.25, 71.2833, 7.925, 53.1, 8.05, 8.4583],
+        'relatives_aboard': [1, 1, 0, 1, 0, 0],
+    })
+
+
+def get_check(report: pd.DataFrame, column: str, check: str) -> pd.Series:
+
+    return report[(report['column'] == column) & (report['check'] == check)].iloc[0]
+
+
+def test_valid_data_passes_all_checks(config, engineered_data):
+
+    report = validate_engineered_data_as_batch(config, engineered_data)
+    compact_report = validate_engineered_data_as_batch(config, engineered_data.astype({'sex': 'category', 'pclass': 'int8', 'fare': 'float32'}))
+
+    assert all([
+        report['passed'].all(),
+        compact_report['passed'].all(),
+        get_check(report, 'fare', 'max_value')['observed'] == 71.2833,
+        get_check(report, 'survived', 'min_n_target_classes')['observed'] == 2,
+        set(report['check']) >= {'dtype', 'not_nullable', 'min_value', 'max_value', 'allowed_values', 'min_n_rows', 'unique_index'},
+    ])
+
+
+def test_all_failures_are_reported(engineered_data):
+
+    engineered_data['survived'] = [0, 1, 1, 2, 0, 0]
+    engineered_data['sex'] = ['male', 'female', 'unknown', 'female', 'unknown', 'male']
+    engineered_data['fare'] = [7.25, 71.2833, 1000., 53.1, 2., 8.4583]
+    engineered_data['pclass'] = ['3', '1', '3', '1', '3', '3']
+    engineered_data.index = [0, 1, 2, 3, 4, 4]
+    engineered_data = engineered_data.drop(columns=['relatives_aboard'])
+
+    report = validate_as_batch(engineered_data, [raw_data_schema, engineered_data_schema], max_null_rate=0.1)
+    failed_checks = set(zip(report.loc[~report['passed'], 'column'], report.loc[~report['passed'], 'check']))
+
+    assert all([
+        failed_checks == {('survived', 'allowed_values'), ('sex', 'allowed_values'), ('fare', 'min_value'), ('fare', 'max_value'), ('pclass', 'dtype'),
+                          ('age', 'max_null_rate'), ('relatives_aboard', 'required'), ('', 'unique_index')},
+        get_check(report, 'sex', 'allowed_values')['n_failures'] == 2,
+        get_check(report, 'sex', 'allowed_values')['failure_examples'] == ['unknown'],
+        get_check(report, 'fare', 'max_value')['failure_examples'] == [1000.],
+        get_check(report, 'survived', 'allowed_values')['observed'] == [2],
+    ])
+
+
+def test_sampled_validation(engineered_data):
+
+    large_data = engineered_data.iloc[np.resize(np.arange(len(engineered_data)), 1000)].reset_index(drop=True)
+    large_data.loc[:499, 'fare'] = 1000.
+
+    report = validate_as_batch(large_data, [raw_data_schema, engineered_data_schema], sample_size=100)
+    fare_check = get_check(report, 'fare', 'max_value')
+
+    assert all([
+        fare_check['n_checked_rows'] == 100,
+        0 < fare_check['n_failures'] < 100,
+        get_check(report, '', 'min_n_rows')['observed'] == 1000,
+    ])
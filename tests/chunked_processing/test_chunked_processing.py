@@ -0,0 +1,88 @@
+import dataclasses
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_project.chunked_processing import execute_chunked_feature_engineering, execute_chunked_historic_predictions, read_chunked_predictions
+from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
+from ml_project.historic_data_retrieval import (get_cont_cols_fill_values, get_cont_cols_fill_values_from_chunks, process_historic_data_into_raw_data, retrieve_historic_data,
+                                                retrieve_historic_data_chunks)
+from ml_project.modelling_process.data_processing import get_processed_data
+from ml_project.modelling_process.model_functions import get_model, train_model
+from ml_project.modelling_process.modelling_process import split_features_and_target
+from ml_project.prediction_process import get_predictions
+
+
+@pytest.fixture
+def config(config, titanic_data, tmp_path):
+
+    # several row groups, which the chunk sizes of the tests do not line up with
+    data = pd.concat([titanic_data]*4, ignore_index=True).assign(name='name')
+    data.to_parquet(tmp_path / "data.parquet", row_group_size=20)
+
+    return dataclasses.replace(config, data_filepath=str(tmp_path / "data.parquet"), historic_data_n_rows=None)
+
+
+@pytest.fixture
+def engineered_data(config):
+
+    raw_data = process_historic_data_into_raw_data(config, retrieve_historic_data(config))
+    engineered_data, _ = execute_feature_engineering(config, raw_data, get_feature_processes(config))
+
+    return engineered_data
+
+
+def test_retrieve_historic_data_chunks(config):
+
+    chunks = list(retrieve_historic_data_chunks(config, chunk_size=25))
+
+    assert all([
+        max([len(chunk) for chunk in chunks]) <= 25,
+        pd.concat(chunks).equals(retrieve_historic_data(config)),
+    ])
+
+
+def test_cont_cols_fill_values_from_chunks(config):
+
+    historic_data = retrieve_historic_data(config)
+    # the chunk with the missing age does not contain the global minimum age
+    historic_data.loc[45, 'age'] = np.nan
+    chunks = [historic_data.iloc[start:start + 7] for start in range(0, len(historic_data), 7)]
+
+    cont_cols_fill_values = get_cont_cols_fill_values_from_chunks(config, iter(chunks))
+    raw_data_chunks = [process_historic_data_into_raw_data(config, chunk, cont_cols_fill_values) for chunk in chunks]
+
+    assert all([
+        cont_cols_fill_values.equals(get_cont_cols_fill_values(config, historic_data)),
+        pd.concat(raw_data_chunks).loc[45, 'age'] == 2. - 999999,
+    ])
+
+
+def test_chunked_feature_engineering_matches_in_memory_run(config, engineered_data, tmp_path):
+
+    output_filepath = str(tmp_path / "engineered_data.parquet")
+    n_rows = execute_chunked_feature_engineering(config, output_filepath, chunk_size=7)
+
+    chunked_engineered_data = pd.read_parquet(output_filepath)
+
+    assert n_rows == 72
+    pd.testing.assert_frame_equal(chunked_engineered_data, engineered_data.reset_index(drop=True))
+
+
+def test_chunked_historic_predictions_match_in_memory_run(config, engineered_data, tmp_path):
+
+    data_x, data_y = split_features_and_target(config, engineered_data)
+    data_x_processed, _, preprocessing_objects = get_processed_data(config, None, data_x)
+    model = train_model(config, get_model(config, {'max_depth': 3}), data_x_processed, data_y)
+    predictions, prediction_probas = get_predictions(config, model, data_x_processed)
+
+    output_filepath = str(tmp_path / "predictions.parquet")
+    execute_chunked_historic_predictions(config, model, preprocessing_objects, output_filepath, chunk_size=7)
+    chunked_data_y, chunked_predictions, chunked_prediction_probas = read_chunked_predictions(config, output_filepath)
+
+    assert all([
+        chunked_data_y.tolist() == data_y.tolist(),
+        chunked_predictions.tolist() == predictions.tolist(),
+        np.allclose(chunked_prediction_probas[1].values, prediction_probas[1].values),
+    ])
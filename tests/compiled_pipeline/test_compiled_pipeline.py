@@ -0,0 +1,90 @@
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from ml_project.compiled_pipeline import CompiledPipeline, get_compiled_pipeline
+from ml_project.data_validation import ProductionData
+from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
+from ml_project.feature_engineering.feature_processes import Feature1Feature2Ratio
+from ml_project.modelling_process.data_processing import get_processed_data
+from ml_project.prediction_process import get_predictions
+
+
+@pytest.fixture
+def model_artifacts(config, train_titanic_model):
+
+    return train_titanic_model(config)
+
+
+def test_compiled_pipeline_matches_standard_path(config, titanic_data, model_artifacts):
+
+    model, preprocessing_objects = model_artifacts
+    compiled_pipeline = get_compiled_pipeline(config, model, preprocessing_objects)
+
+    raw_data = titanic_data[config.features]
+    data_x, _ = execute_feature_engineering(config, raw_data.copy(), get_feature_processes(config))
+    data_x_processed, _, _ = get_processed_data(config, preprocessing_objects, data_x)
+    predictions, prediction_probas = get_predictions(config, model, data_x_processed)
+
+    for row_index, row in raw_data.iterrows():
+        compiled_predictions, compiled_prediction_probas = compiled_pipeline.predict(ProductionData(**row.to_dict()))
+
+        assert compiled_predictions[0] == predictions.loc[row_index]
+        assert np.array_equal(compiled_prediction_probas[0], prediction_probas.loc[row_index].values)
+
+
+def test_compiled_pipeline_keeps_warning_filters(config, titanic_data, model_artifacts):
+
+    model, preprocessing_objects = model_artifacts
+    warning_filters = list(warnings.filters)
+
+    with warnings.catch_warnings(record=True) as caught_warnings:
+        warnings.simplefilter("always")
+        compiled_pipeline = get_compiled_pipeline(config, model, preprocessing_objects)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(compiled_pipeline.predict, [ProductionData(**row.to_dict()) for _, row in titanic_data[config.features].iterrows()]))
+        recorded_warning_filters = list(warnings.filters)
+
+    assert all([
+        list(warnings.filters) == warning_filters,
+        recorded_warning_filters[0][0] == "always" and len(recorded_warning_filters) == len(warning_filters) + 1,  # no filter is added by the predictions
+        not any(["valid feature names" in str(caught_warning.message) for caught_warning in caught_warnings]),
+        list(model.feature_names_in_) == preprocessing_objects.features,  # the model of the standard path keeps its feature names
+    ])
+
+
+def test_compiled_pipeline_unknown_category(config, titanic_data, model_artifacts):
+
+    model, preprocessing_objects = model_artifacts
+    compiled_pipeline = get_compiled_pipeline(config, model, preprocessing_objects)
+    compiled_pipeline.validate_data = False
+
+    production_data = ProductionData(**{**titanic_data[config.features].iloc[0].to_dict(), 'sex': 'unknown'})
+
+    with pytest.raises(ValueError):
+        compiled_pipeline.predict(production_data)
+
+
+def test_compiled_pipeline_zero_denominator_matches_standard_path(config, titanic_data, train_titanic_model):
+
+    feature_processes = get_feature_processes(config) + [Feature1Feature2Ratio(feature1_col='fare', feature2_col='age')]
+    model, preprocessing_objects = train_titanic_model(config, feature_processes=feature_processes)
+    compiled_pipeline = CompiledPipeline(config, model, preprocessing_objects, feature_processes)
+
+    raw_data = titanic_data[config.features].iloc[:3].assign(age=0.)
+    engineered_data, engineered_columns = execute_feature_engineering(config, raw_data.copy(), feature_processes)
+
+    for row_index, row in raw_data.iterrows():
+        production_data = ProductionData(**row.to_dict())
+        values = compiled_pipeline.get_engineered_values(production_data)
+
+        assert all([values[column] == engineered_data.loc[row_index, column] for column in engineered_columns])
+        assert values['fare_age_ratio'] == np.inf
+
+        # the model rejects the infinite feature in both paths instead of the compiled path raising a ZeroDivisionError
+        with pytest.raises(ValueError):
+            compiled_pipeline.predict(production_data)
+    with pytest.raises(ValueError):
+        get_predictions(config, model, get_processed_data(config, preprocessing_objects, engineered_data)[0])
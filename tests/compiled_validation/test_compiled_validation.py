@@ -0,0 +1,99 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pandera as pa
+import pytest
+
+from ml_project.compiled_validation import CompiledValidator
+from ml_project.data_validation import engineered_data_schema, raw_data_schema
+
+# two valid values followed by edge cases of each column, combined randomly into instances
+column_values = {
+    'survived': [0, 1, 2, -1, None, 1., True, np.int64(1)],
+    'pclass': [1, 3, 0, 4, None, 2., True, np.int64(2), np.int32(2)],
+    'sex': ['male', 'female', 'unknown', '', None, 1, np.nan],
+    'age': [0., 22.5, 100., -0.5, 100.5, np.nan, None, 22, np.float64(30.), np.float32(30.), np.inf],
+    'siblings_spouses_aboard': [0, 5, 6, -1, None, 1.],
+    'parents_children_aboard': [0, 2, 6, None],
+    'fare': [7., 263., 6.99, 300., np.nan, '8.'],
+    'relatives_aboard': [0, 10, 11, -1, None, 3.],
+}
+
+
+def get_outcome(validate, data) -> str:
+
+    try:
+        validate(data)
+        return 'valid'
+    except pa.errors.SchemaError as error:
+        return str(error)
+
+
+def get_random_instances(columns, n_instances: int, seed: int):
+
+    random_generator = random.Random(seed)
+    instances = []
+    for _ in range(n_instances):
+        # most values are valid, so that a share of the instances is valid as a whole
+        instance = {column: random_generator.choice(column_values[column][:2] if random_generator.random() < 0.8 else column_values[column]) for column in columns}
+        if random_generator.random() < 0.05:
+            del instance[random_generator.choice(columns)]
+        instances.append(instance)
+
+    return instances
+
+
+@pytest.mark.parametrize('schema', [raw_data_schema, engineered_data_schema])
+def test_same_decisions_and_errors_as_schema_for_instances(schema):
+
+    validator = CompiledValidator(schema)
+    instances = get_random_instances(list(schema.columns), n_instances=120, seed=1)
+
+    outcomes = [(get_outcome(validator.validate_values, instance), get_outcome(schema, pd.DataFrame([instance]))) for instance in instances]
+
+    assert all([
+        all([compiled_outcome == schema_outcome for compiled_outcome, schema_outcome in outcomes]),
+        any([compiled_outcome == 'valid' for compiled_outcome, _ in outcomes]),
+        any([compiled_outcome != 'valid' for compiled_outcome, _ in outcomes]),
+    ])
+
+
+def test_same_decisions_and_errors_as_schema_for_dataframes():
+
+    validator = CompiledValidator(raw_data_schema)
+    random_generator = random.Random(2)
+    valid_column_values = {'survived': [0, 1], 'pclass': [1, 2, 3], 'sex': ['male', 'female'], 'age': [1., 50., np.nan], 'siblings_spouses_aboard': [0, 5],
+                           'parents_children_aboard': [0, 3], 'fare': [7., 100.]}
+
+    outcomes = []
+    for _ in range(40):
+        data = pd.DataFrame([{column: random_generator.choice(values) for column, values in valid_column_values.items()} for _ in range(5)])
+        if random_generator.random() < 0.7:
+            column = random_generator.choice(list(raw_data_schema.columns))
+            data.loc[random_generator.randrange(5), column] = random_generator.choice(column_values[column])
+        outcomes.append((get_outcome(validator.validate_data, data), get_outcome(raw_data_schema, data)))
+
+    assert all([
+        all([compiled_outcome == schema_outcome for compiled_outcome, schema_outcome in outcomes]),
+        any([compiled_outcome == 'valid' for compiled_outcome, _ in outcomes]),
+        any([compiled_outcome != 'valid' for compiled_outcome, _ in outcomes]),
+    ])
+
+
+def test_valid_data_does_not_reach_schema():
+
+    validator = CompiledValidator(raw_data_schema)
+    instance = {'pclass': 1, 'sex': 'male', 'age': 22., 'siblings_spouses_aboard': 1, 'parents_children_aboard': 0, 'fare': 7.25}
+
+    assert all([
+        validator.accepts_values(instance),
+        validator.accepts_data(pd.DataFrame([instance, instance])),
+        not validator.accepts_values({**instance, 'sex': None}),
+    ])
+
+
+def test_unsupported_schema_is_not_compiled():
+
+    with pytest.raises(Exception):
+        CompiledValidator(pa.DataFrameSchema({'name': pa.Column(str, checks=pa.Check.str_length(1, 10))}))
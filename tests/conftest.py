@@ -0,0 +1,91 @@
+from typing import Any, Callable, List, Optional, Tuple
+
+import pandas as pd
+import pytest
+
+from ml_project.config import Config
+from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
+from ml_project.model_export import export_model_artifacts
+from ml_project.modelling_process.data_processing import PreprocessingObjects, get_processed_data
+from ml_project.modelling_process.model_functions import get_model, train_model
+
+
+@pytest.fixture
+def config(tmp_path) -> Config:
+    """
+    Config of the titanic dataset shared by the tests, the model artifacts are exported to the temporary directory of the test
+    """
+
+    return Config(
+        historic_or_production_data='historic',
+        local_or_deployed='local',
+        target_col='survived',
+        cont_cols=['age', 'siblings_spouses_aboard', 'parents_children_aboard', 'fare'],
+        cat_cols=['sex', 'pclass'],
+        aux_cols=[],
+        data_filepath="", # not relevant for most tests
+        export_filepath=str(tmp_path / "model_titanic.pkl"),
+    )
+
+
+@pytest.fixture
+def titanic_data() -> pd.DataFrame:
+
+    return pd.DataFrame({
+        'pclass': [1, 2, 3, 3, 1, 2]*3,
+        'sex': ['male', 'female', 'male', 'female', 'female', 'male']*3,
+        'age': [22., 38., 26., 35., 54., 2.]*3,
+        'siblings_spouses_aboard': [1, 1, 0, 1, 0, 3]*3,
+        'parents_children_aboard': [0, 0, 0, 2, 0, 1]*3,
+        'fare': [7.25, 71.28, 7.92, 53.1, 51.86, 21.07]*3,
+        'survived': [0, 1, 1, 1, 0, 0]*3,
+    })
+
+
+@pytest.fixture
+def process_titanic_data(titanic_data) -> Callable[..., Tuple[pd.DataFrame, PreprocessingObjects]]:
+    """
+    Returns a function engineering and processing the titanic data like the modelling process
+    """
+
+    def _process_titanic_data(config: Config, feature_processes: Optional[List] = None) -> Tuple[pd.DataFrame, PreprocessingObjects]:
+
+        feature_processes = feature_processes if feature_processes is not None else get_feature_processes(config)
+        data_x, _ = execute_feature_engineering(config, titanic_data.drop(columns=[config.target_col]), feature_processes)
+        data_x_processed, _, preprocessing_objects = get_processed_data(config, None, data_x)
+
+        return data_x_processed, preprocessing_objects
+
+    return _process_titanic_data
+
+
+@pytest.fixture
+def train_titanic_model(titanic_data, process_titanic_data) -> Callable[..., Tuple[Any, PreprocessingObjects]]:
+    """
+    Returns a function training a model of the given depth on the titanic data
+    """
+
+    def _train_titanic_model(config: Config, max_depth: int = 3, feature_processes: Optional[List] = None) -> Tuple[Any, PreprocessingObjects]:
+
+        data_x_processed, preprocessing_objects = process_titanic_data(config, feature_processes)
+        model = train_model(config, get_model(config, {'max_depth': max_depth}), data_x_processed, titanic_data[config.target_col])
+
+        return model, preprocessing_objects
+
+    return _train_titanic_model
+
+
+@pytest.fixture
+def export_titanic_model(train_titanic_model) -> Callable[..., Tuple[Any, PreprocessingObjects]]:
+    """
+    Returns a function training a model of the given depth on the titanic data and exporting its artifacts to the export filepath of the config
+    """
+
+    def _export_titanic_model(config: Config, max_depth: int = 3) -> Tuple[Any, PreprocessingObjects]:
+
+        model, preprocessing_objects = train_titanic_model(config, max_depth)
+        export_model_artifacts(config, model, preprocessing_objects)
+
+        return model, preprocessing_objects
+
+    return _export_titanic_model
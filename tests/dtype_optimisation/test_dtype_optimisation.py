@@ -0,0 +1,103 @@
+import dataclasses
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_project.data_validation import raw_data_schema, validate_engineered_data_per_instance, validate_raw_data_per_instance
+from ml_project.dtype_optimisation import get_compact_dtypes, get_memory_report, optimise_dtypes
+from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
+from ml_project.modelling_process.data_processing import PreprocessingObjects, apply_categorical_encoding
+
+
+@pytest.fixture
+def config(config):
+
+    return dataclasses.replace(config, historic_data_compact_dtypes=True)
+
+
+@pytest.fixture
+def raw_data():
+
+    return pd.DataFrame({
+        'age': [22., 38., 26., 35.],
+        'siblings_spouses_aboard': [1, 1, 0, 5],
+        'parents_children_aboard': [0, 0, 0, 5],
+        'fare': [7.25, 71.2833, 7.925, 53.1],
+        'sex': ['male', 'female', 'female', 'male'],
+        'pclass': [3, 1, 3, 1],
+        'survived': [0, 1, 1, 1],
+    })
+
+
+def test_compact_dtypes_from_schema():
+
+    compact_dtypes = get_compact_dtypes(raw_data_schema)
+
+    assert all([
+        compact_dtypes['survived'] == np.int8,
+        compact_dtypes['pclass'] == np.int8,
+        compact_dtypes['siblings_spouses_aboard'] == np.int8,
+        compact_dtypes['age'] == np.float32,
+        list(compact_dtypes['sex'].categories) == ['female', 'male'],
+    ])
+
+
+def test_optimised_data_is_valid_and_smaller(raw_data):
+
+    optimised_data = optimise_dtypes(raw_data, raw_data_schema)
+    validate_raw_data_per_instance(optimised_data, compact_dtypes=True)
+
+    memory_report = get_memory_report(raw_data, optimised_data)
+
+    assert all([
+        (optimised_data[['pclass', 'survived']].values == raw_data[['pclass', 'survived']].values).all(),
+        (optimised_data['sex'].astype(str) == raw_data['sex']).all(),
+        np.allclose(optimised_data['fare'], raw_data['fare']),
+        memory_report.loc['total', 'optimised_memory_bytes'] < memory_report.loc['total', 'memory_bytes'],
+        memory_report.loc['pclass', 'reduction_percentage'] == 87.5,
+    ])
+
+
+def test_values_outside_of_schema_keep_dtype(raw_data):
+
+    raw_data['siblings_spouses_aboard'] = [1, 1, 0, 1000]
+    raw_data['sex'] = ['male', 'female', 'female', '<missing>']
+
+    optimised_data = optimise_dtypes(raw_data, raw_data_schema)
+
+    assert all([
+        optimised_data['siblings_spouses_aboard'].dtype == np.int64,
+        optimised_data['sex'].dtype == object,
+        optimised_data['pclass'].dtype == np.int8,
+    ])
+
+
+def test_compact_dtypes_validation_checks_dtype_kind(raw_data):
+
+    optimised_data = optimise_dtypes(raw_data, raw_data_schema)
+
+    with pytest.raises(Exception):
+        validate_raw_data_per_instance(optimised_data.astype({'age': str}), compact_dtypes=True)
+
+    with pytest.raises(Exception):
+        validate_raw_data_per_instance(optimised_data)
+
+
+def test_downstream_processing_keeps_compact_dtypes(config, raw_data):
+
+    optimised_data = optimise_dtypes(raw_data, raw_data_schema)
+
+    engineered_data, engineered_feature_columns = execute_feature_engineering(config, optimised_data, get_feature_processes(config))
+    validate_engineered_data_per_instance(engineered_data[engineered_feature_columns], compact_dtypes=True)
+
+    encoded_data, _, preprocessing_objects = apply_categorical_encoding(config, PreprocessingObjects(), engineered_data.drop(columns=[config.target_col]))
+    expected_encoded_data, _, _ = apply_categorical_encoding(config, PreprocessingObjects(), raw_data.drop(columns=[config.target_col]))
+
+    assert all([
+        engineered_data['relatives_aboard'].dtype == np.int8,
+        engineered_data['relatives_aboard'].tolist() == [1, 1, 0, 10],
+        encoded_data['age'].dtype == np.float32,
+        preprocessing_objects.one_hot_encoders['sex'].categories_[0].tolist() == ['female', 'male'],
+        (encoded_data[['sex_female', 'sex_male', 'pclass_1', 'pclass_3']].values == expected_encoded_data[['sex_female', 'sex_male', 'pclass_1', 'pclass_3']].values).all(),
+    ])
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_project.feature_engineering.feature_dag import FeatureDag
+from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes, get_required_columns
+from ml_project.feature_engineering.feature_processes import Feature1Feature2Ratio, Feature1Feature2Sum
+
+
+@pytest.fixture
+def data():
+
+    return pd.DataFrame({
+        'a': [0, 1, 2, 3],
+        'b': [10, 11, 12, 13],
+        'c': [1., 2., 0., 4.],
+    })
+
+
+@pytest.fixture
+def feature_processes():
+
+    # 'a_b_c_ratio' is declared before the sum it depends on
+    return [
+        Feature1Feature2Ratio(feature1_col='a_b_sum', feature2_col='c', column_name='a_b_c_ratio'),
+        Feature1Feature2Sum(feature1_col='a', feature2_col='b', column_name='a_b_sum'),
+        Feature1Feature2Ratio(feature1_col='a', feature2_col='c', column_name='a_c_ratio'),
+    ]
+
+
+def test_feature_dag_order_and_levels(feature_processes):
+
+    feature_dag = FeatureDag(feature_processes)
+
+    assert all([
+        feature_dag.order == [1, 0, 2],
+        feature_dag.get_levels({0, 1, 2}) == [[1, 2], [0]],
+        feature_dag.get_required_positions(['a_b_c_ratio', 'a']) == {0, 1},
+        feature_dag.get_required_positions([]) == set(),
+    ])
+
+
+def test_feature_dag_errors(feature_processes, data):
+
+    with pytest.raises(Exception, match="cycle"):
+        FeatureDag([Feature1Feature2Sum(feature1_col='a', feature2_col='y', column_name='x'),
+                    Feature1Feature2Sum(feature1_col='x', feature2_col='b', column_name='y')])
+
+    with pytest.raises(Exception, match="is produced by"):
+        FeatureDag(feature_processes + [Feature1Feature2Sum(feature1_col='a', feature2_col='c', column_name='a_b_sum')])
+
+    with pytest.raises(Exception, match=r"\['d'\]"):
+        FeatureDag([Feature1Feature2Sum(feature1_col='a', feature2_col='d')]).execute(data)
+
+
+def test_feature_dag_execute(feature_processes, data):
+
+    sequential_data, engineered_columns, durations = FeatureDag(feature_processes).execute(data.copy())
+    parallel_data, parallel_engineered_columns, _ = FeatureDag(feature_processes).execute(data.copy(), max_workers=2, parallel_min_n_rows=0)
+    pruned_data, pruned_engineered_columns, pruned_durations = FeatureDag(feature_processes).execute(data.copy(), required_columns=['a_c_ratio'])
+
+    assert all([
+        engineered_columns == ['a_b_sum', 'a_b_c_ratio', 'a_c_ratio'],
+        np.allclose(sequential_data['a_b_c_ratio'], [10., 6., np.inf, 4.]),
+        list(durations) == ['Feature1Feature2Sum(a_b_sum)', 'Feature1Feature2Ratio(a_b_c_ratio)', 'Feature1Feature2Ratio(a_c_ratio)'],
+        parallel_engineered_columns == engineered_columns,
+        parallel_data.equals(sequential_data),
+        pruned_engineered_columns == ['a_c_ratio'],
+        pruned_data.columns.tolist() == ['a', 'b', 'c', 'a_c_ratio'],
+        list(pruned_durations) == ['Feature1Feature2Ratio(a_c_ratio)'],
+    ])
+
+
+def test_execute_feature_engineering_required_features(config):
+
+    raw_data = pd.DataFrame({'pclass': [1, 3], 'sex': ['male', 'female'], 'age': [22., 38.], 'siblings_spouses_aboard': [1, 0], 'parents_children_aboard': [0, 2], 'fare': [7.25, 71.28]})
+    model_features = ['age', 'siblings_spouses_aboard', 'parents_children_aboard', 'fare', 'sex_female', 'sex_male', 'pclass_1', 'pclass_3']
+
+    data, engineered_feature_columns = execute_feature_engineering(config, raw_data.copy(), get_feature_processes(config))
+    pruned_data, pruned_engineered_feature_columns = execute_feature_engineering(config, raw_data.copy(), get_feature_processes(config), required_features=model_features)
+
+    assert all([
+        engineered_feature_columns == ['relatives_aboard'],
+        data['relatives_aboard'].tolist() == [1, 2],
+        pruned_engineered_feature_columns == [],
+        pruned_data.equals(raw_data),
+        get_required_columns(config, model_features) == model_features + ['sex', 'pclass'],
+    ])
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_project.feature_engineering.feature_dag import FeatureDag
+from ml_project.feature_engineering.feature_processes import Feature1Feature2Ratio, Feature1Feature2Sum
+from ml_project.feature_engineering.fused_features import FusedFeatureProcesses
+
+dtypes = ['int8', 'int16', 'int64', 'uint8', 'float32', 'float64']
+
+
+def get_random_data(random_generator: np.random.Generator, n_rows: int) -> pd.DataFrame:
+    """
+    Columns of all 'dtypes' with many zeros, and negative, missing and infinite values in the float columns
+    """
+
+    data = {}
+    for dtype in dtypes:
+        values = random_generator.integers(-3, 4, size=n_rows)
+        if dtype.startswith('uint'):
+            values = np.abs(values)
+        values = values.astype(dtype)
+        if dtype.startswith('float'):
+            values[random_generator.random(n_rows) < 0.1] = np.nan
+            values[random_generator.random(n_rows) < 0.05] = -np.inf
+            values = values * random_generator.choice([1., 0.5, -0.25], size=n_rows).astype(dtype)
+        data[dtype] = values
+
+    return pd.DataFrame(data, index=random_generator.permutation(n_rows))
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_fused_features_equal_execute(seed):
+
+    random_generator = np.random.default_rng(seed)
+    data = get_random_data(random_generator, 200)
+
+    feature_processes = []
+    for _ in range(12):
+        feature1_col, feature2_col = random_generator.choice(dtypes, size=2)
+        feature_processes.append(Feature1Feature2Sum(feature1_col=feature1_col, feature2_col=feature2_col, column_name=f"sum_{len(feature_processes)}"))
+        feature_processes.append(Feature1Feature2Ratio(feature1_col=feature1_col, feature2_col=feature2_col, column_name=f"ratio_{len(feature_processes)}"))
+    # ratios of engineered columns, which are inputs of the fused evaluation as well
+    feature_processes.append(Feature1Feature2Ratio(feature1_col='sum_0', feature2_col='ratio_1', column_name='ratio_of_engineered'))
+
+    expected_data, expected_columns, _ = FeatureDag(feature_processes).execute(data.copy())
+    fused_data, fused_columns, durations = FeatureDag(feature_processes).execute(data, fused=True)
+
+    pd.testing.assert_frame_equal(fused_data, expected_data)
+    assert all([
+        fused_columns == expected_columns,
+        len(durations) == len(feature_processes),
+        data.columns.tolist() == dtypes,
+    ])
+
+
+def test_fused_features_remaining_processes():
+
+    data = pd.DataFrame({
+        'a': [1, 2, 0],
+        'b': pd.array([1, None, 0], dtype='Int64'),
+        'c': pd.Categorical([1, 2, 3]),
+        'd': [True, False, True],
+        'e': [0., 2., 0.],
+    })
+    feature_processes = [
+        Feature1Feature2Ratio(feature1_col='a', feature2_col='e'),
+        Feature1Feature2Sum(feature1_col='a', feature2_col='b'),
+        Feature1Feature2Sum(feature1_col='a', feature2_col='d'),
+        Feature1Feature2Sum(feature1_col='a_b_sum', feature2_col='e', column_name='a_b_e_sum'),
+        Feature1Feature2Sum(feature1_col='a', feature2_col='a_e_ratio', column_name='a_a_e_ratio_sum'),
+    ]
+
+    fused_feature_processes = FusedFeatureProcesses(feature_processes, data.dtypes.to_dict())
+    expected_data, _, _ = FeatureDag(feature_processes).execute(data.copy())
+    fused_data, fused_columns, _ = FeatureDag(feature_processes).execute(data, fused=True)
+
+    pd.testing.assert_frame_equal(fused_data[expected_data.columns], expected_data)
+    assert all([
+        fused_feature_processes.output_columns == ['a_e_ratio', 'a_a_e_ratio_sum'],
+        [feature_process.column_name for feature_process in fused_feature_processes.remaining_processes] == ['a_b_sum', 'a_d_sum', 'a_b_e_sum'],
+        fused_columns == ['a_e_ratio', 'a_a_e_ratio_sum', 'a_b_sum', 'a_d_sum', 'a_b_e_sum'],
+        fused_data['a_e_ratio'].tolist()[:2] == [np.inf, 1.],
+        np.isnan(fused_data['a_e_ratio'].iloc[2]),
+    ])
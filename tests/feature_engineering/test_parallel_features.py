@@ -0,0 +1,92 @@
+import os
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_project.feature_engineering.feature_dag import FeatureDag
+from ml_project.feature_engineering.feature_processes import Feature1Feature2Ratio, Feature1Feature2Sum
+from ml_project.feature_engineering.parallel_features import ChunkedFeatureProcesses
+
+
+class FeatureStandardisation:
+    """
+    Standardises a feature with the mean and standard deviation of all rows
+    """
+
+    requires_full_data = True
+
+    def __init__(self, feature_col: str):
+
+        self.feature_col = feature_col
+        self.column_name = f"{feature_col}_standardised"
+
+    @property
+    def input_columns(self) -> List[str]:
+        return [self.feature_col]
+
+    @property
+    def output_columns(self) -> List[str]:
+        return [self.column_name]
+
+    def execute(self, data: pd.DataFrame) -> pd.DataFrame:
+
+        data[self.column_name] = (data[self.feature_col] - data[self.feature_col].mean()) / data[self.feature_col].std()
+
+        return data
+
+
+@pytest.fixture
+def data():
+
+    random_generator = np.random.default_rng(0)
+    n_rows = 50
+
+    return pd.DataFrame({
+        'a': random_generator.integers(-3, 4, size=n_rows).astype('int8'),
+        'b': random_generator.integers(0, 3, size=n_rows),
+        'c': random_generator.choice([0., 1.5, np.nan, -2.], size=n_rows).astype('float32'),
+        'd': random_generator.choice(['x', 'y'], size=n_rows),
+    }, index=random_generator.permutation(n_rows) + 100)
+
+
+@pytest.fixture
+def feature_processes():
+
+    return [
+        Feature1Feature2Sum(feature1_col='a', feature2_col='b'),
+        Feature1Feature2Ratio(feature1_col='a_b_sum', feature2_col='c'),
+        FeatureStandardisation(feature_col='a_b_sum'),
+        Feature1Feature2Sum(feature1_col='a_b_sum_standardised', feature2_col='c'),
+        Feature1Feature2Sum(feature1_col='d', feature2_col='d'),
+        Feature1Feature2Ratio(feature1_col='b', feature2_col='a'),
+    ]
+
+
+def test_chunked_feature_processes(feature_processes, data):
+
+    chunked_feature_processes = ChunkedFeatureProcesses(feature_processes, data.dtypes.to_dict())
+
+    assert all([
+        chunked_feature_processes.output_columns == ['a_b_sum', 'a_b_sum_c_ratio', 'b_a_ratio'],
+        [feature_process.column_name for feature_process in chunked_feature_processes.remaining_processes] == ['a_b_sum_standardised', 'a_b_sum_standardised_c_sum', 'd_d_sum'],
+        chunked_feature_processes.input_columns == ['a', 'b', 'c'],
+    ])
+
+
+def test_feature_dag_execute_in_chunks(feature_processes, data):
+
+    shared_memory_files = set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+    expected_data, expected_columns, _ = FeatureDag(feature_processes).execute(data.copy())
+    chunked_data, chunked_columns, durations = FeatureDag(feature_processes).execute(data, chunk_workers=2, chunk_size=7)
+
+    pd.testing.assert_frame_equal(chunked_data[expected_data.columns], expected_data)
+    assert all([
+        sorted(chunked_columns) == sorted(expected_columns),
+        chunked_columns[:3] == ['a_b_sum', 'a_b_sum_c_ratio', 'b_a_ratio'],
+        len(durations) == len(feature_processes),
+        data.columns.tolist() == ['a', 'b', 'c', 'd'],
+        (set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()) == shared_memory_files,
+    ])
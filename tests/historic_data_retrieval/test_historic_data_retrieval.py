@@ -1,7 +1,8 @@
 import pandas as pd
+import pyarrow.parquet as pq
 import pytest
 
-from ml_project.historic_data_retrieval import retrieve_from_parquet
+from ml_project.historic_data_retrieval import get_parquet_dataset, read_parquet_fragments, retrieve_from_parquet
 
 
 @pytest.fixture
@@ -27,4 +28,65 @@ def test_retrieve_from_parquet(filepath_parquet, data):
 
     retrieved_data = retrieve_from_parquet(filepath_parquet)
 
-    assert retrieved_data.equals(data)
\ No newline at end of file
+    assert retrieved_data.equals(data)
+
+@pytest.fixture
+def filepath_parquet_row_groups(tmpdir):
+
+    filepath = tmpdir.join('data_row_groups.parquet')
+    pd.DataFrame({
+        'cont1': list(range(1000)),
+        'cat1': ['A', 'B', 'B', 'C'] * 250,
+        'cat2': ['text'] * 1000,
+    }).to_parquet(filepath, row_group_size=100)
+
+    return str(filepath)
+
+
+def test_retrieve_from_parquet_pushdown(filepath_parquet_row_groups):
+
+    first_rows = retrieve_from_parquet(filepath_parquet_row_groups, columns=['cont1', 'cat1'], n_rows=150)
+    filtered_rows = retrieve_from_parquet(filepath_parquet_row_groups, columns=['cont1'], n_rows=None, filters=[('cont1', '>=', 500), ('cat1', '==', 'C')])
+
+    assert all([
+        list(first_rows.columns) == ['cont1', 'cat1'],
+        first_rows['cont1'].tolist() == list(range(150)),
+        list(filtered_rows.columns) == ['cont1'],
+        filtered_rows['cont1'].tolist() == list(range(503, 1000, 4)),
+    ])
+
+
+@pytest.fixture
+def partitioned_folderpath(tmpdir):
+
+    for date in ['2023-01-01', '2023-01-02', '2023-01-03']:
+        folderpath = tmpdir.mkdir(f"date={date}")
+        for part in range(2):
+            pd.DataFrame({'cont1': [part * 10 + value for value in range(5)], 'cat1': ['A'] * 5}).to_parquet(folderpath.join(f"part_{part}.parquet"))
+
+    return str(tmpdir)
+
+
+def test_retrieve_from_partitioned_parquet(partitioned_folderpath):
+
+    data = retrieve_from_parquet(partitioned_folderpath, n_rows=None, filters=[('date', '>=', '2023-01-02')], max_workers=4)
+    glob_data = retrieve_from_parquet(f"{partitioned_folderpath}/date=2023-01-0[23]/*.parquet", columns=['cont1', 'date'], n_rows=None)
+
+    assert all([
+        len(data) == 20,
+        data['date'].unique().tolist() == ['2023-01-02', '2023-01-03'],
+        data['cont1'].tolist() == (list(range(5)) + list(range(10, 15))) * 2,
+        glob_data.equals(data[['cont1', 'date']]),
+    ])
+
+
+def test_read_parquet_fragments_prunes_partitions(partitioned_folderpath):
+
+    dataset = get_parquet_dataset(partitioned_folderpath)
+    table, read_timings = read_parquet_fragments(dataset, columns=['cont1'], filter_expression=pq.filters_to_expression([('date', '==', '2023-01-03')]))
+
+    assert all([
+        table.num_rows == 10,
+        len(read_timings) == 2,
+        all(['date=2023-01-03' in read_timing['filepath'] and read_timing['n_rows'] == 5 for read_timing in read_timings]),
+    ])
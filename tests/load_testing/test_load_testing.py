@@ -0,0 +1,81 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from ml_project.batch_prediction import get_production_data_batch
+from ml_project.data_validation import validate_raw_data_per_instance
+from ml_project.load_testing import LoadGenerator, get_synthetic_records, read_records, save_load_test_results
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    # mockup prediction service, failing for records of the first class
+
+    def do_POST(self):
+
+        record = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        status_code = 500 if record['pclass'] == 1 else 200
+
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps({'label': 0}).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def service_url():
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PredictionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}/predict"
+
+    server.shutdown()
+
+
+def test_synthetic_records_satisfy_raw_data_schema():
+
+    records = get_synthetic_records(500, seed=0)
+
+    validate_raw_data_per_instance(get_production_data_batch(records))
+
+
+def test_read_records(tmp_path):
+
+    records = get_synthetic_records(3, seed=0)
+    records_filepath = tmp_path / "records.jsonl"
+    records_filepath.write_text("\n".join([json.dumps(record) for record in records]))
+
+    assert read_records(str(records_filepath)) == records
+
+
+@pytest.mark.parametrize('rate', [None, 200.])
+def test_load_generator(service_url, rate):
+
+    records = [{**record, 'pclass': pclass} for record, pclass in zip(get_synthetic_records(4, seed=0), [1, 2, 3, 3])]
+    load_generator = LoadGenerator(url=service_url, records=records, concurrency=4, rate=rate)
+
+    summary = load_generator.run(n_requests=40)
+
+    assert all([
+        summary['n_requests'] == 40,
+        summary['n_errors'] == 10,
+        summary['error_rate'] == 0.25,
+        summary['latency_p50_ms'] <= summary['latency_p99_ms'],
+    ])
+
+
+def test_save_load_test_results(tmp_path):
+
+    results_filepath = str(tmp_path / "results" / "results.jsonl")
+    for label in ['before', 'after']:
+        save_load_test_results(results_filepath, {'label': label}, {'throughput_per_s': 1.})
+
+    results = pd.read_json(results_filepath, lines=True)
+
+    assert [settings['label'] for settings in results['settings']] == ['before', 'after']
@@ -0,0 +1,87 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from ml_project.data_validation import ProductionData
+from ml_project.micro_batching import MicroBatcher
+
+
+@pytest.fixture
+def production_data():
+
+    return [ProductionData(pclass=1, sex='male', age=float(age), siblings_spouses_aboard=0, parents_children_aboard=0, fare=10.)
+            for age in range(10)]
+
+
+def predict_batch(data: pd.DataFrame):
+    # mockup prediction behaviour by returning the age as label, rejecting negative ages
+
+    if (data['age'] < 0).any():
+        raise(ValueError("negative age"))
+
+    predictions = data['age']
+    prediction_probas = pd.DataFrame({0: data['age'] / 10, 1: 1 - data['age'] / 10})
+
+    return predictions, prediction_probas
+
+
+async def run_concurrent_requests(micro_batcher, production_data):
+
+    await micro_batcher.start()
+    results = await asyncio.gather(*[micro_batcher.predict(instance) for instance in production_data], return_exceptions=True)
+    await micro_batcher.stop()
+
+    return results
+
+
+def test_micro_batcher(production_data):
+
+    micro_batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait_time=0.05)
+
+    results = asyncio.run(run_concurrent_requests(micro_batcher, production_data))
+
+    results_belong_to_their_request = all([label == instance.age for (label, _), instance in zip(results, production_data)])
+    batches_are_bounded = max(micro_batcher.stats.batch_sizes) == 4
+    all_requests_counted = micro_batcher.stats.get_summary()['n_requests'] == len(production_data)
+
+    assert all([results_belong_to_their_request, batches_are_bounded, all_requests_counted])
+
+
+def test_micro_batcher_invalid_request(production_data):
+
+    production_data[3] = production_data[3].copy(update={'age': -1.})
+    micro_batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait_time=0.05)
+
+    results = asyncio.run(run_concurrent_requests(micro_batcher, production_data))
+
+    only_invalid_request_failed = [isinstance(result, ValueError) for result in results] == [index == 3 for index in range(len(production_data))]
+
+    assert only_invalid_request_failed
+
+
+def test_micro_batcher_continues_after_batch_error(production_data):
+
+    n_calls = 0
+
+    def inconsistent_predict_batch(data: pd.DataFrame):
+        # the outputs of the first batch miss a row, which fails outside of 'predict_batch' when the rows are distributed
+        nonlocal n_calls
+        n_calls += 1
+        predictions, prediction_probas = predict_batch(data)
+        return (predictions.iloc[:-1], prediction_probas.iloc[:-1]) if n_calls == 1 else (predictions, prediction_probas)
+
+    async def run_failing_and_later_requests():
+        await micro_batcher.start()
+        failing_results = await asyncio.wait_for(asyncio.gather(*[micro_batcher.predict(instance) for instance in production_data[:4]], return_exceptions=True), timeout=5)
+        later_results = await asyncio.wait_for(asyncio.gather(*[micro_batcher.predict(instance) for instance in production_data[4:]], return_exceptions=True), timeout=5)
+        await micro_batcher.stop()
+        return failing_results, later_results
+
+    micro_batcher = MicroBatcher(inconsistent_predict_batch, max_batch_size=4, max_wait_time=0.05)
+    failing_results, later_results = asyncio.run(run_failing_and_later_requests())
+
+    assert all([
+        all([isinstance(result, IndexError) for result in failing_results]),
+        [label for label, _ in later_results] == [instance.age for instance in production_data[4:]],
+    ])
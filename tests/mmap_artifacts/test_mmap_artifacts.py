@@ -0,0 +1,68 @@
+import dataclasses
+import os
+
+import numpy as np
+import pytest
+
+from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
+from ml_project.mmap_artifacts import MappedRandomForestClassifier, get_mmap_version_folderpath, n_kept_previous_versions
+from ml_project.model_export import export_model_artifacts, get_model_artifacts_identity, load_model_artifacts
+from ml_project.modelling_process.data_processing import get_processed_data
+from ml_project.prediction_process import get_predictions
+
+
+@pytest.fixture
+def config(config, tmp_path):
+
+    return dataclasses.replace(config, export_filepath=str(tmp_path / "model_titanic"), export_format='mmap')
+
+
+def test_mmap_artifacts_match_exported_model(config, titanic_data, process_titanic_data, export_titanic_model):
+
+    model, preprocessing_objects = export_titanic_model(config)
+    data_x_processed, _ = process_titanic_data(config)
+    loaded_model, loaded_preprocessing_objects, loaded_config = load_model_artifacts(config.export_filepath)
+
+    data_x, _ = execute_feature_engineering(config, titanic_data.drop(columns=[config.target_col]), get_feature_processes(config))
+    loaded_data_x_processed, _, _ = get_processed_data(loaded_config, loaded_preprocessing_objects, data_x)
+    predictions, prediction_probas = get_predictions(config, model, data_x_processed)
+    loaded_predictions, loaded_prediction_probas = get_predictions(loaded_config, loaded_model, loaded_data_x_processed)
+
+    assert all([
+        isinstance(loaded_model, MappedRandomForestClassifier),
+        isinstance(loaded_model.threshold, np.memmap),
+        loaded_config == config,
+        loaded_preprocessing_objects.features == preprocessing_objects.features,
+        loaded_data_x_processed.equals(data_x_processed),
+        loaded_predictions.equals(predictions),
+        np.array_equal(loaded_prediction_probas.values, prediction_probas.values),
+        get_model_artifacts_identity(config.export_filepath) == get_model_artifacts_identity(config.export_filepath),
+    ])
+
+
+def test_mmap_artifacts_reject_unsupported_model(config, titanic_data):
+
+    with pytest.raises(Exception):
+        export_model_artifacts(config, model=object(), preprocessing_objects=get_processed_data(config, None, titanic_data[config.features])[2])
+
+
+def test_mmap_artifacts_reexport_keeps_mapped_version(config, process_titanic_data, export_titanic_model):
+
+    data_x_processed, _ = process_titanic_data(config)
+
+    export_titanic_model(config, max_depth=4)
+    mapped_model, _, _ = load_model_artifacts(config.export_filepath)
+    mapped_prediction_probas = mapped_model.predict_proba(data_x_processed).copy()
+    mapped_version_folderpath = get_mmap_version_folderpath(config.export_filepath)
+
+    # smaller arrays, which would cut off the mapped ones if they were overwritten in place
+    for max_depth in [1, 2, 1]:
+        export_titanic_model(config, max_depth)
+    reloaded_model, _, _ = load_model_artifacts(config.export_filepath)
+
+    assert all([
+        np.array_equal(mapped_model.predict_proba(data_x_processed), mapped_prediction_probas),
+        get_mmap_version_folderpath(config.export_filepath) != mapped_version_folderpath,
+        len(reloaded_model.threshold) < len(mapped_model.threshold),
+        len(os.listdir(os.path.dirname(mapped_version_folderpath))) == 1 + n_kept_previous_versions,
+    ])
@@ -0,0 +1,126 @@
+import dataclasses
+import os
+import time
+
+import numpy as np
+import pytest
+
+import ml_project.model_export as model_export
+from ml_project.mmap_artifacts import get_mmap_version_folderpath
+from ml_project.model_export import get_model_artifacts_identity
+from ml_project.model_manager import ModelManager, ModelVersion, warmup_production_data
+
+
+def warmup(model_version: ModelVersion):
+
+    model_version.compiled_pipeline.predict(warmup_production_data)
+
+
+def test_model_manager_reload(config, export_titanic_model):
+
+    export_titanic_model(config, max_depth=2)
+    model_manager = ModelManager(config.export_filepath, warmup=warmup, use_compiled_pipeline=True)
+    in_flight_model_version = model_manager.model_version
+
+    export_titanic_model(config, max_depth=4)
+    model_manager.reload(wait=True)
+
+    assert all([
+        model_manager.n_reloads == 1,
+        model_manager.model_version.version != in_flight_model_version.version,
+        model_manager.model_version.model.max_depth == 4,
+        in_flight_model_version.model.max_depth == 2,  # requests holding the previous version are not affected by the swap
+    ])
+
+
+def test_model_manager_keeps_model_version_on_failed_reload(config, export_titanic_model):
+
+    export_titanic_model(config, max_depth=2)
+    model_manager = ModelManager(config.export_filepath, warmup=warmup, use_compiled_pipeline=True)
+    model_version = model_manager.model_version
+
+    with open(config.export_filepath, "wb") as file:
+        file.write(b"partially written artifacts")
+    model_manager.reload(wait=True)
+
+    assert all([
+        model_manager.model_version is model_version,
+        model_manager.n_reloads == 0,
+        model_manager.last_reload_error is not None,
+    ])
+
+
+def test_model_manager_watches_artifacts(config, export_titanic_model):
+
+    export_titanic_model(config, max_depth=2)
+    model_manager = ModelManager(config.export_filepath, warmup=warmup, use_compiled_pipeline=True, watch_interval=0.05)
+    model_manager.start_watching()
+
+    time.sleep(0.1)
+    export_titanic_model(config, max_depth=4)
+
+    for _ in range(100):
+        if model_manager.n_reloads != 0:
+            break
+        time.sleep(0.05)
+    model_manager.stop_watching()
+
+    assert model_manager.model_version.model.max_depth == 4
+
+
+def test_model_manager_reloads_reexported_mmap_artifacts(config, export_titanic_model, tmp_path):
+
+    mmap_config = dataclasses.replace(config, export_filepath=str(tmp_path / "model_titanic"), export_format='mmap')
+    export_titanic_model(mmap_config, max_depth=4)
+    model_manager = ModelManager(mmap_config.export_filepath, warmup=warmup, use_compiled_pipeline=True, watch_interval=0.05)
+    in_flight_model_version = model_manager.model_version
+    _, in_flight_prediction_probas = in_flight_model_version.compiled_pipeline.predict(warmup_production_data)
+    model_manager.start_watching()
+
+    # re-exported while the first version is served, the watcher only reloads once the new version is published completely
+    export_titanic_model(mmap_config, max_depth=1)
+    for _ in range(100):
+        if model_manager.n_reloads != 0:
+            break
+        time.sleep(0.05)
+    model_manager.stop_watching()
+
+    _, served_prediction_probas = in_flight_model_version.compiled_pipeline.predict(warmup_production_data)
+    _, reloaded_prediction_probas = model_manager.model_version.compiled_pipeline.predict(warmup_production_data)
+
+    assert all([
+        model_manager.n_reloads == 1,
+        model_manager.last_reload_error is None,
+        model_manager.model_version.version != in_flight_model_version.version,
+        np.array_equal(served_prediction_probas, in_flight_prediction_probas),  # the mapped arrays of the served version are not overwritten
+        not np.array_equal(reloaded_prediction_probas, in_flight_prediction_probas),
+        os.path.isdir(get_mmap_version_folderpath(mmap_config.export_filepath)),
+    ])
+
+
+def test_model_manager_labels_pickle_artifacts_replaced_while_loading(config, export_titanic_model, monkeypatch):
+
+    export_titanic_model(config, max_depth=2)
+    loads = model_export.pickle.loads
+    n_loads = 0
+
+    def loads_after_concurrent_export(model_objects_bytes):
+        # a new export replaces the pickle file after it was read and before it is deserialised
+        nonlocal n_loads
+        n_loads += 1
+        if n_loads == 1:
+            export_titanic_model(config, max_depth=4)
+        return loads(model_objects_bytes)
+
+    monkeypatch.setattr(model_export.pickle, 'loads', loads_after_concurrent_export)
+    model_manager = ModelManager(config.export_filepath, warmup=warmup, use_compiled_pipeline=True)
+    loaded_model_version = model_manager.model_version
+    model_manager.reload(wait=True)
+
+    assert all([
+        loaded_model_version.model.max_depth == 2,
+        loaded_model_version.version != get_model_artifacts_identity(config.export_filepath),  # labelled with the hash of the bytes it was loaded from
+        model_manager.n_reloads == 1,  # thus the replaced artifacts are not mistaken for the served version
+        model_manager.model_version.model.max_depth == 4,
+        model_manager.model_version.version == get_model_artifacts_identity(config.export_filepath),
+    ])
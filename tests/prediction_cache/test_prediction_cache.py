@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from ml_project.data_validation import ProductionData
+from ml_project.prediction_cache import PredictionCache
+
+
+@pytest.fixture
+def production_data():
+
+    return [ProductionData(pclass=pclass, sex='male', age=30., siblings_spouses_aboard=0, parents_children_aboard=0, fare=10.)
+            for pclass in [1, 2, 3]]
+
+
+def predict(production_data: ProductionData):
+    # mockup prediction behaviour by returning the pclass as label
+
+    return production_data.pclass, np.array([0.25, 0.75])
+
+
+def test_prediction_cache_hits_and_evictions(production_data):
+
+    prediction_cache = PredictionCache(model_identity='model_1', max_entries=2)
+
+    for instance in production_data + production_data[-1:]:
+        prediction_cache.get_or_predict(instance, predict)
+
+    stats = prediction_cache.get_stats()
+
+    assert [stats['hits'], stats['misses'], stats['evictions'], stats['entries']] == [1, 3, 1, 2]
+
+
+def test_prediction_cache_key_contains_model_identity(production_data):
+
+    key_model_1 = PredictionCache(model_identity='model_1').get_key(production_data[0])
+    key_model_2 = PredictionCache(model_identity='model_2').get_key(production_data[0])
+    key_same_data = PredictionCache(model_identity='model_1').get_key(ProductionData(**production_data[0].dict()))
+
+    assert key_model_1 != key_model_2 and key_model_1 == key_same_data
+
+
+def test_prediction_cache_memory_cap(production_data):
+
+    prediction_cache = PredictionCache(model_identity='model_1', max_memory_bytes=600)
+
+    for instance in production_data:
+        prediction_cache.get_or_predict(instance, predict)
+
+    assert 0 < prediction_cache.memory_bytes <= 600 and prediction_cache.evictions > 0
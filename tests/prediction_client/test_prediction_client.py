@@ -0,0 +1,122 @@
+import dataclasses
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from ml_project.load_testing import get_synthetic_records
+from ml_project.prediction_client import PredictionClient
+from ml_project.prediction_process import get_server_predictions
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    # mockup prediction service predicting the class of a record as label, the first request of each record fails with 503
+    # and '/predict_batch' only exists if 'has_batch_endpoint' is set
+
+    has_batch_endpoint = True
+    n_failures = 1
+    requests_by_path: dict = {}
+    lock = threading.Lock()
+
+    def do_POST(self):
+
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.lock:
+            n_requests = self.requests_by_path.get(self.path, 0)
+            self.requests_by_path[self.path] = n_requests + 1
+
+        if self.path == '/predict_batch' and self.has_batch_endpoint:
+            status_code, response = 200, {'labels': [record['pclass'] for record in payload], 'probas': [[0.5, 0.5]] * len(payload)}
+        elif self.path == '/predict':
+            status_code, response = (503, {}) if n_requests < self.n_failures else (200, {'label': payload['pclass'], 'probas': [0.5, 0.5]})
+        else:
+            status_code, response = 404, {}
+
+        body = json.dumps(response).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def service_url():
+
+    PredictionHandler.requests_by_path = {}
+    PredictionHandler.has_batch_endpoint = True
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PredictionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}/predict"
+
+    server.shutdown()
+
+
+@pytest.fixture
+def config(config):
+
+    return dataclasses.replace(config, historic_or_production_data='production')
+
+
+@pytest.fixture
+def records():
+    return get_synthetic_records(25, seed=0)
+
+
+def test_predict_retries_unavailable_service(service_url, records):
+
+    with PredictionClient(service_url, backoff_factor=0.) as prediction_client:
+        label, probas = prediction_client.predict(records[0])
+
+    assert all([
+        label == records[0]['pclass'],
+        probas == [0.5, 0.5],
+        PredictionHandler.requests_by_path['/predict'] == 2,
+    ])
+
+
+def test_predict_many_keeps_order(service_url, records):
+
+    with PredictionClient(service_url, max_concurrency=4, backoff_factor=0.) as prediction_client:
+        predictions = prediction_client.predict_many(records)
+
+    assert [label for label, _ in predictions] == [record['pclass'] for record in records]
+
+
+@pytest.mark.parametrize('has_batch_endpoint', [True, False])
+def test_predict_many_in_batches(service_url, records, has_batch_endpoint):
+
+    PredictionHandler.has_batch_endpoint = has_batch_endpoint
+
+    with PredictionClient(service_url, batch_size=10, backoff_factor=0.) as prediction_client:
+        predictions = prediction_client.predict_many(records)
+        predictions_after_check = prediction_client.predict_many(records)
+
+    assert all([
+        [label for label, _ in predictions] == [record['pclass'] for record in records],
+        predictions_after_check == predictions,
+        PredictionHandler.requests_by_path['/predict_batch'] == (6 if has_batch_endpoint else 1),
+        ('/predict' in PredictionHandler.requests_by_path) != has_batch_endpoint,
+    ])
+
+
+def test_get_server_predictions(service_url, records, config):
+
+    config = config.set_value('prediction_service_url', service_url)
+    data = pd.DataFrame(records, index=range(10, 10 + len(records)))
+
+    label, _ = get_server_predictions(config, data=data.iloc[0])
+    predictions, prediction_probas = get_server_predictions(config, data=data)
+
+    assert all([
+        label == records[0]['pclass'],
+        predictions.index.equals(data.index),
+        predictions.tolist() == data['pclass'].tolist(),
+        prediction_probas.shape == (len(records), 2),
+    ])
@@ -0,0 +1,75 @@
+import dataclasses
+import io
+import json
+
+import pytest
+
+from ml_project.load_testing import get_synthetic_records
+from ml_project.prediction_session import PredictionSession
+
+
+@pytest.fixture
+def config(config):
+
+    return dataclasses.replace(config, historic_or_production_data='production')
+
+
+@pytest.fixture
+def prediction_session(config, export_titanic_model):
+
+    export_titanic_model(config)
+
+    return PredictionSession(config, use_compiled_pipeline=True)
+
+
+@pytest.fixture
+def records():
+    return get_synthetic_records(30, seed=0)
+
+
+def test_predict_record_matches_predict_records(prediction_session, records):
+
+    predictions, prediction_probas = prediction_session.predict_records(records)
+    single_predictions = [prediction_session.predict_record(record) for record in records]
+
+    assert all([
+        [label for label, _ in single_predictions] == predictions.tolist(),
+        all([probas == pytest.approx(expected_probas) for (_, probas), expected_probas in zip(single_predictions, prediction_probas.values.tolist())]),
+    ])
+
+
+def test_predict_stream(prediction_session, records):
+
+    output_file = io.StringIO()
+    stream_summary = prediction_session.predict_stream(iter(records), output_file, batch_size=8)
+    output_records = [json.loads(line) for line in output_file.getvalue().splitlines()]
+
+    predictions, _ = prediction_session.predict_records(records)
+
+    assert all([
+        stream_summary['n_records'] == 30,
+        stream_summary['n_batches'] == 4,
+        stream_summary['records_per_s'] > 0,
+        [output_record['label'] for output_record in output_records] == predictions.tolist(),
+    ])
+
+
+def test_predict_stream_rejects_invalid_records(prediction_session, records):
+
+    # a record of a wrong type and a record failing a value check of the schema among valid records
+    stream_records = records[:5] + [{**records[5], 'age': "unknown"}] + records[6:10] + [{**records[10], 'age': 150.}] + records[11:]
+    output_file, error_file = io.StringIO(), io.StringIO()
+    stream_summary = prediction_session.predict_stream(iter(stream_records), output_file, batch_size=8, error_file=error_file)
+    output_records = [json.loads(line) for line in output_file.getvalue().splitlines()]
+    error_records = [json.loads(line) for line in error_file.getvalue().splitlines()]
+
+    predictions, _ = prediction_session.predict_records(records[:5] + records[6:10] + records[11:])
+
+    assert all([
+        stream_summary['n_rejected_records'] == 2,
+        [output_record['label'] for output_record in output_records] == predictions.tolist(),
+        [output_record['offset'] for output_record in output_records] == [offset for offset in range(1, 31) if offset not in [6, 11]],
+        [error_record['offset'] for error_record in error_records] == [6, 11],
+        error_records[0]['error'].startswith("field 'age'"),
+        error_records[1]['error'].startswith("SchemaError"),
+    ])
@@ -0,0 +1,38 @@
+import json
+import subprocess
+import sys
+
+from ml_project.utils import get_project_root
+
+# modules of the 'ml_project' package imported by the prediction services and the prediction use cases
+serving_modules = [
+    'ml_project.batch_prediction',
+    'ml_project.compiled_pipeline',
+    'ml_project.config',
+    'ml_project.data_validation',
+    'ml_project.feature_engineering.feature_engineering',
+    'ml_project.micro_batching',
+    'ml_project.mmap_artifacts',
+    'ml_project.model_manager',
+    'ml_project.model_export',
+    'ml_project.modelling_process.data_processing',
+    'ml_project.modelling_process.modelling_process',
+    'ml_project.prediction_cache',
+    'ml_project.prediction_client',
+    'ml_project.prediction_executor',
+    'ml_project.prediction_process',
+    'ml_project.production_data_retrieval',
+    'ml_project.serving_metrics',
+    'ml_project.utils',
+]
+
+
+def test_serving_modules_do_not_import_lazy_dependencies():
+    # imported in a fresh interpreter, since the test session may already have imported the dependencies
+
+    code = "import json, sys\n" + "".join([f"import {module_name}\n" for module_name in serving_modules]) + \
+           "print(json.dumps([name for name in ['mlflow', 'shap', 'skopt', 'evidently'] if name in sys.modules]))"
+
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], cwd=get_project_root(), capture_output=True, text=True, check=True).stdout
+
+    assert json.loads(output.splitlines()[-1]) == []
@@ -0,0 +1,52 @@
+from ml_project.serving_metrics import Histogram, ServingMetrics
+
+
+def test_histogram_buckets_are_cumulative():
+
+    histogram = Histogram('duration_seconds', "Duration", ['stage'], buckets=[0.1, 1.])
+    for value in [0.05, 0.1, 0.5, 2.]:
+        histogram.observe(value, ('prediction',))
+
+    lines = histogram.render()
+
+    assert lines[2:] == [
+        'duration_seconds_bucket{stage="prediction",le="0.1"} 2',
+        'duration_seconds_bucket{stage="prediction",le="1.0"} 3',
+        'duration_seconds_bucket{stage="prediction",le="+Inf"} 4',
+        'duration_seconds_sum{stage="prediction"} 2.65',
+        'duration_seconds_count{stage="prediction"} 4',
+    ]
+
+
+def test_serving_metrics_records_stages_and_requests():
+
+    serving_metrics = ServingMetrics(enabled=True)
+
+    with serving_metrics.time_stage('prediction'):
+        pass
+    serving_metrics.end_request('/predict', serving_metrics.start_request('/predict'), failed=False)
+    serving_metrics.end_request('/predict', serving_metrics.start_request('/predict'), failed=True)
+
+    metrics = serving_metrics.render()
+
+    assert all([
+        'prediction_stage_duration_seconds_count{stage="prediction"} 1' in metrics,
+        'prediction_requests_total{endpoint="/predict"} 2.0' in metrics,
+        'prediction_request_errors_total{endpoint="/predict"} 1.0' in metrics,
+        'prediction_requests_in_flight{endpoint="/predict"} 0.0' in metrics,
+    ])
+
+
+def test_disabled_serving_metrics_record_nothing():
+
+    serving_metrics = ServingMetrics(enabled=False)
+
+    with serving_metrics.time_stage('prediction'):
+        pass
+    serving_metrics.end_request('/predict', serving_metrics.start_request('/predict'), failed=True)
+
+    assert all([
+        len(serving_metrics.stage_durations.bucket_counts) == 0,
+        len(serving_metrics.requests.values) == 0,
+        serving_metrics.time_stage('prediction') is serving_metrics.time_stage('validate_raw_data'),
+    ])
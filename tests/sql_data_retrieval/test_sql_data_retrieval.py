@@ -0,0 +1,124 @@
+import dataclasses
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_project.data_validation import raw_data_schema
+from ml_project.historic_data_retrieval import retrieve_historic_data, retrieve_historic_data_chunks
+from ml_project.sql_data_retrieval import SqlConnectionPool, get_arrow_schema, get_sql_query, retrieve_from_sql, retrieve_sql_chunks
+
+
+@pytest.fixture
+def data():
+
+    return pd.DataFrame({
+        'survived': [0, 1, 1, 1, 0, 0],
+        'pclass': [3, 1, 3, 1, 3, 3],
+        'name': ['a', 'b', 'c', 'd', 'e', 'f'],
+        'sex': ['male', 'female', 'female', 'female', 'male', 'male'],
+        'age': [22., 38., 26., 35., 35., np.nan],
+        'siblings_spouses_aboard': [1, 1, 0, 1, 0, 0],
+        'parents_children_aboard': [0, 0, 0, 0, 0, 0],
+        'fare': [7.25, 71.2833, 7.925, 53.1, 8.05, 8.4583],
+    })
+
+
+@pytest.fixture
+def connection_uri(tmp_path, data):
+
+    filepath_database = tmp_path / "historic_data.db"
+    with sqlite3.connect(filepath_database) as connection:
+        data.to_sql('titanic', connection, index=False)
+
+    return f"sqlite:///{filepath_database}"
+
+
+@pytest.fixture
+def config(config, tmp_path, connection_uri):
+
+    return dataclasses.replace(config, data_filepath=str(tmp_path / "missing.parquet"), historic_data_n_rows=None, historic_data_sql_uri=connection_uri, historic_data_sql_table='titanic')
+
+
+def test_sql_query_with_projection_filters_and_limit():
+
+    sql_query, parameters = get_sql_query(table='public.titanic', columns=['pclass', 'age'], n_rows=10, filters=[('pclass', '==', 1), ('sex', 'in', ['male', 'female'])])
+    query_sql_query, _ = get_sql_query(query="SELECT * FROM titanic", columns=['age'], paramstyle='format', filters=[('age', '>', 30)])
+
+    assert all([
+        sql_query == 'SELECT "pclass", "age" FROM "public"."titanic" WHERE "pclass" = ? AND "sex" IN (?, ?) LIMIT 10',
+        parameters == [1, 'male', 'female'],
+        query_sql_query == 'SELECT "age" FROM (SELECT * FROM titanic) AS source WHERE "age" > %s',
+    ])
+
+    with pytest.raises(Exception):
+        get_sql_query(table='titanic', filters=[('age', 'like', 30)])
+
+
+def test_retrieve_from_sql(connection_uri, data):
+
+    columns = list(raw_data_schema.columns)
+    connection_pool = SqlConnectionPool(connection_uri)
+
+    retrieved_data = retrieve_from_sql(connection_pool, table='titanic', columns=columns, n_rows=None, chunk_size=4, arrow_schema=get_arrow_schema(raw_data_schema, columns))
+    filtered_data = retrieve_from_sql(connection_pool, table='titanic', columns=['pclass', 'age'], n_rows=1, filters=[('pclass', '==', 3), ('age', '>', 22.)])
+    empty_data = retrieve_from_sql(connection_pool, table='titanic', columns=columns, filters=[('pclass', '==', 2)], arrow_schema=get_arrow_schema(raw_data_schema, columns))
+
+    pd.testing.assert_frame_equal(retrieved_data, data[columns])
+    assert all([
+        filtered_data.to_dict(orient='records') == [{'pclass': 3, 'age': 26.}],
+        len(empty_data) == 0,
+        list(empty_data.columns) == columns,
+        empty_data['pclass'].dtype == np.int64,
+    ])
+
+
+def test_retrieve_sql_chunks(connection_uri, data):
+
+    chunks = list(retrieve_sql_chunks(SqlConnectionPool(connection_uri), chunk_size=4, table='titanic', columns=['pclass', 'fare']))
+
+    assert all([
+        [len(chunk) for chunk in chunks] == [4, 2],
+        chunks[1].index.tolist() == [4, 5],
+    ])
+    pd.testing.assert_frame_equal(pd.concat(chunks), data[['pclass', 'fare']])
+
+
+def test_connection_pool_reuses_connections(connection_uri):
+
+    connection_pool = SqlConnectionPool(connection_uri, max_connections=2)
+    connection_ids = []
+    lock = threading.Lock()
+
+    def query():
+        with connection_pool.connection() as connection:
+            with lock:
+                connection_ids.append(id(connection))
+            connection.execute("SELECT COUNT(*) FROM titanic").fetchall()
+
+    threads = [threading.Thread(target=query) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with pytest.raises(sqlite3.OperationalError):
+        with connection_pool.connection() as connection:
+            connection.execute("SELECT * FROM missing_table")
+
+    assert all([
+        len(connection_ids) == 8,
+        len(set(connection_ids)) <= 2,
+        connection_pool._n_connections <= 1,
+    ])
+
+
+def test_historic_data_from_sql(config, data):
+
+    historic_data = retrieve_historic_data(config)
+    historic_data_chunks = list(retrieve_historic_data_chunks(config, chunk_size=5))
+
+    pd.testing.assert_frame_equal(historic_data, data[list(raw_data_schema.columns)])
+    pd.testing.assert_frame_equal(pd.concat(historic_data_chunks), historic_data)
@@ -0,0 +1,123 @@
+import dataclasses
+import os
+
+import pandas as pd
+import pytest
+
+from ml_project.feature_engineering.feature_engineering import get_feature_processes
+from ml_project.stage_cache import StageCache, get_engineered_data_fingerprint, get_raw_data_fingerprint
+
+
+@pytest.fixture
+def config(config, tmp_path):
+
+    data_filepath = tmp_path / "data.parquet"
+    pd.DataFrame({'age': [22., 38.], 'fare': [7.25, 71.28]}).to_parquet(data_filepath)
+
+    return dataclasses.replace(config, data_filepath=str(data_filepath))
+
+
+@pytest.fixture
+def data():
+
+    return pd.DataFrame({
+        'pclass': [1, 2, 3],
+        'sex': ['male', 'female', 'male'],
+        'age': [22., 38., None],
+    }, index=[5, 7, 9])
+
+
+def test_stage_cache_hit(tmp_path, data):
+
+    stage_cache = StageCache(str(tmp_path / "cache"))
+    n_computations = 0
+
+    def compute():
+        nonlocal n_computations
+        n_computations += 1
+        return data.copy()
+
+    first_data = stage_cache.get_or_compute('raw_data', {'source': 1}, compute)
+    cached_data = stage_cache.get_or_compute('raw_data', {'source': 1}, compute)
+    stage_cache.get_or_compute('raw_data', {'source': 2}, compute)
+
+    assert all([
+        n_computations == 2,
+        len(stage_cache.list_entries()) == 2,
+    ])
+    pd.testing.assert_frame_equal(first_data, data)
+    pd.testing.assert_frame_equal(cached_data, data)
+
+
+def test_disabled_stage_cache_computes(tmp_path, data):
+
+    stage_cache = StageCache(str(tmp_path / "cache"), enabled=False)
+    stage_cache.get_or_compute('raw_data', {'source': 1}, lambda: data)
+
+    assert not os.path.exists(tmp_path / "cache")
+
+
+def test_fingerprints_change_with_source_config_and_feature_processes(config):
+
+    feature_processes = get_feature_processes(config)
+    raw_data_fingerprint = get_raw_data_fingerprint(config)
+    engineered_data_fingerprint = get_engineered_data_fingerprint(config, feature_processes)
+
+    os.utime(config.data_filepath, ns=(0, 0))
+    source_changed_fingerprint = get_raw_data_fingerprint(config)
+    filters_changed_fingerprint = get_raw_data_fingerprint(config.set_value('historic_data_filters', [('age', '>', 30)]))
+
+    feature_processes[0].feature2_col = 'fare'
+    feature_processes_changed_fingerprint = get_engineered_data_fingerprint(config, feature_processes)
+
+    assert all([
+        source_changed_fingerprint != raw_data_fingerprint,
+        filters_changed_fingerprint != source_changed_fingerprint,
+        feature_processes_changed_fingerprint['feature_processes'] != engineered_data_fingerprint['feature_processes'],
+    ])
+
+
+@pytest.mark.parametrize('data_filepath', ['data', 'data/*/*.parquet'])
+def test_raw_data_fingerprint_changes_with_partition(config, tmp_path, data_filepath):
+
+    for pclass in [1, 2, 3]:
+        os.makedirs(tmp_path / "data" / f"pclass={pclass}")
+        pd.DataFrame({'age': [22., 38.], 'fare': [7.25, 71.28]}).to_parquet(tmp_path / "data" / f"pclass={pclass}" / "part-0.parquet")
+    config = config.set_value('data_filepath', str(tmp_path / data_filepath))
+    raw_data_fingerprint = get_raw_data_fingerprint(config)
+
+    pd.DataFrame({'age': [54.], 'fare': [51.86]}).to_parquet(tmp_path / "data" / "pclass=2" / "part-0.parquet")
+    partition_changed_fingerprint = get_raw_data_fingerprint(config)
+    pd.DataFrame({'age': [2.], 'fare': [21.07]}).to_parquet(tmp_path / "data" / "pclass=2" / "part-1.parquet")
+    partition_added_fingerprint = get_raw_data_fingerprint(config)
+
+    assert all([
+        len(raw_data_fingerprint['source']['files']) == 3,
+        partition_changed_fingerprint != raw_data_fingerprint,
+        partition_added_fingerprint != partition_changed_fingerprint,
+        len(partition_added_fingerprint['source']['files']) == 4,
+        get_raw_data_fingerprint(config) == partition_added_fingerprint,
+    ])
+
+
+def test_stage_cache_eviction_and_clear(tmp_path, data):
+
+    stage_cache = StageCache(str(tmp_path / "cache"))
+    for source in range(3):
+        stage_cache.get_or_compute('raw_data', {'source': source}, lambda: data)
+    stage_cache.get_or_compute('engineered_data', {'source': 0}, lambda: data)
+
+    # the least recently used entry is evicted first, the entry of source 0 was used after the one of source 1
+    stage_cache.get_or_compute('raw_data', {'source': 0}, lambda: data)
+    entry_size = stage_cache.list_entries()[0]['size_bytes']
+    stage_cache.max_size_bytes = 3 * entry_size
+    stage_cache.evict()
+
+    remaining_entries = stage_cache.list_entries()
+    n_removed_entries = stage_cache.clear('raw_data')
+
+    assert all([
+        len(remaining_entries) == 3,
+        n_removed_entries == 2,
+        [entry['stage'] for entry in stage_cache.list_entries()] == ['engineered_data'],
+    ])
@@ -0,0 +1,166 @@
+import io
+import json
+import queue
+import time
+from typing import Dict, List
+
+import pandas as pd
+import pytest
+
+from ml_project.batch_prediction import RowError
+from ml_project.streaming_ingestion import (OffsetCheckpoint, UndecodableRecord, consume_micro_batches, end_of_stream, get_micro_batches, read_jsonl_records,
+                                            read_line_records, read_queue_records)
+
+
+@pytest.fixture
+def records_filepath(tmp_path):
+
+    records_filepath = tmp_path / "records.jsonl"
+    records_filepath.write_text("".join([json.dumps({'id': record_id}) + "\n" for record_id in range(10)]) + "\n")
+
+    return str(records_filepath)
+
+
+def predict_records(records: List[Dict]):
+    # mockup prediction stage predicting the id of a record as label
+
+    predictions = pd.Series([record['id'] for record in records])
+
+    return predictions, pd.DataFrame({0: [0.5] * len(records), 1: [0.5] * len(records)})
+
+
+def test_read_jsonl_records_resumes_from_offset(records_filepath):
+
+    offset_records = list(read_jsonl_records(records_filepath))
+    resumed_records = [record for _, record in read_jsonl_records(records_filepath, start_offset=offset_records[3][0])]
+
+    assert all([
+        [record['id'] for _, record in offset_records] == list(range(10)),
+        [record['id'] for record in resumed_records] == list(range(4, 10)),
+        [record['id'] for _, record in read_line_records(io.StringIO(open(records_filepath).read()), start_offset=4)] == list(range(4, 10)),
+    ])
+
+
+def test_micro_batches_are_size_bounded(records_filepath):
+
+    micro_batches = list(get_micro_batches(read_jsonl_records(records_filepath), max_batch_size=4))
+
+    assert all([
+        [len(micro_batch.records) for micro_batch in micro_batches] == [4, 4, 2],
+        [record['id'] for micro_batch in micro_batches for record in micro_batch.records] == list(range(10)),
+    ])
+
+
+def test_micro_batches_are_time_bounded():
+
+    record_queue: queue.Queue = queue.Queue()
+    micro_batches = get_micro_batches(read_queue_records(record_queue), max_batch_size=100, max_wait_time=0.05)
+
+    for record_id in range(3):
+        record_queue.put({'id': record_id})
+    first_micro_batch = next(micro_batches)
+
+    record_queue.put({'id': 3})
+    record_queue.put(end_of_stream)
+
+    assert all([
+        [record['id'] for record in first_micro_batch.records] == [0, 1, 2],
+        first_micro_batch.offset == 3,
+        [[record['id'] for record in micro_batch.records] for micro_batch in micro_batches] == [[3]],
+    ])
+
+
+def test_micro_batches_apply_backpressure():
+
+    n_read_records = 0
+
+    def source():
+        nonlocal n_read_records
+        for record_id in range(1000):
+            n_read_records += 1
+            yield record_id, {'id': record_id}
+
+    micro_batches = get_micro_batches(source(), max_batch_size=2, max_buffered_records=5)
+    next(micro_batches)
+    time.sleep(0.2)
+
+    # the reader stops once the buffer is full: 2 consumed, 5 buffered and one waiting to be buffered
+    assert n_read_records <= 8
+
+    micro_batches.close()
+
+
+def test_micro_batches_raise_source_errors():
+
+    def source():
+        yield 1, {'id': 0}
+        raise(ValueError("corrupt record"))
+
+    with pytest.raises(ValueError, match="corrupt record"):
+        list(get_micro_batches(source(), max_batch_size=1))
+
+
+def test_consumer_resumes_from_checkpoint(records_filepath, tmp_path):
+
+    checkpoint = OffsetCheckpoint(str(tmp_path / "checkpoints" / "offset.json"))
+    output_filepath = tmp_path / "predictions.jsonl"
+    n_calls = 0
+
+    def failing_predict_records(records: List[Dict]):
+        nonlocal n_calls
+        n_calls += 1
+        if n_calls == 2:
+            raise(RuntimeError("consumer crashed"))
+        return predict_records(records)
+
+    with open(output_filepath, "w") as output_file, pytest.raises(RuntimeError):
+        consume_micro_batches(get_micro_batches(read_jsonl_records(records_filepath, checkpoint.load()), max_batch_size=4),
+                              failing_predict_records, output_file, checkpoint)
+
+    with open(output_filepath, "a") as output_file:
+        stream_summary = consume_micro_batches(get_micro_batches(read_jsonl_records(records_filepath, checkpoint.load()), max_batch_size=4),
+                                               predict_records, output_file, checkpoint)
+
+    labels = [json.loads(line)['label'] for line in output_filepath.read_text().splitlines()]
+
+    assert all([
+        labels == list(range(10)),
+        stream_summary['n_records'] == 6,
+        stream_summary['n_batches'] == 2,
+    ])
+
+
+def test_consumer_rejects_invalid_records(tmp_path):
+
+    records_filepath = tmp_path / "records.jsonl"
+    records_filepath.write_text("\n".join([json.dumps({'id': 0}), "{'id': 1", json.dumps({'id': 2}), json.dumps({'id': -3}), json.dumps({'name': 4}), json.dumps({'id': 5})]) + "\n")
+    checkpoint = OffsetCheckpoint(str(tmp_path / "offset.json"))
+
+    def validate_records(records: List[Dict]):
+        return [RowError(row=row, field='id', message="field required") for row, record in enumerate(records) if 'id' not in record]
+
+    def strict_predict_records(records: List[Dict]):
+        if any([record['id'] < 0 for record in records]):
+            raise(ValueError("negative id"))
+        return predict_records(records)
+
+    with open(tmp_path / "predictions.jsonl", "w") as output_file, open(tmp_path / "errors.jsonl", "w") as error_file:
+        stream_summary = consume_micro_batches(get_micro_batches(read_jsonl_records(str(records_filepath)), max_batch_size=4),
+                                               strict_predict_records, output_file, checkpoint, error_file=error_file, validate_records=validate_records)
+
+    offset_records = list(read_jsonl_records(str(records_filepath)))
+    output_records = [json.loads(line) for line in (tmp_path / "predictions.jsonl").read_text().splitlines()]
+    error_records = [json.loads(line) for line in (tmp_path / "errors.jsonl").read_text().splitlines()]
+
+    assert all([
+        isinstance(offset_records[1][1], UndecodableRecord),
+        [output_record['label'] for output_record in output_records] == [0, 2, 5],
+        [output_record['offset'] for output_record in output_records] == [offset_records[position][0] for position in [0, 2, 5]],
+        [error_record['offset'] for error_record in error_records] == [offset_records[position][0] for position in [1, 3, 4]],
+        error_records[0]['record'] == "{'id': 1" and error_records[0]['error'].startswith("invalid json"),
+        error_records[1]['error'] == "ValueError: negative id",
+        error_records[2] == {'offset': offset_records[4][0], 'record': {'name': 4}, 'error': "field 'id': field required"},
+        stream_summary['n_records'] == 6,
+        stream_summary['n_rejected_records'] == 3,
+        checkpoint.load() == offset_records[-1][0],  # the checkpoint advances past the rejected records
+    ])
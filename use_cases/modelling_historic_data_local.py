@@ -1,9 +1,15 @@
 import logging
+import os
+from typing import List
 
 import mlflow
+import pandas as pd
 from mlflow import log_metrics
 
-from ml_project.data_validation import validate_engineered_data_as_batch, validate_engineered_data_per_instance, validate_raw_data_per_instance
+from ml_project.chunked_processing import execute_chunked_feature_engineering
+from ml_project.config import Config
+from ml_project.data_validation import raw_data_schema, validate_engineered_data_as_batch, validate_engineered_data_per_instance, validate_raw_data_per_instance
+from ml_project.dtype_optimisation import get_optimised_data
 from ml_project.evaluation import evaluate_model, evaluate_predictions
 from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
 from ml_project.historic_data_retrieval import process_historic_data_into_raw_data, retrieve_historic_data
@@ -11,20 +17,14 @@ from ml_project.ml_monitoring import create_drift_dashboard
 from ml_project.model_export import export_model_artifacts
 from ml_project.modelling_process.modelling_process import get_optimised_model, get_processed_data, split_features_and_target, split_into_modelling_and_holdout_data
 from ml_project.prediction_process import get_predictions
-from ml_project.utils import set_mlflow_experiment, setup_logging
+from ml_project.stage_cache import get_engineered_data_fingerprint, get_raw_data_fingerprint, get_stage_cache
+from ml_project.utils import get_project_root, set_mlflow_experiment, setup_logging
 from use_cases.use_case_config import config
 
 logger = logging.getLogger('standard')
 
 
-def execute_modelling_historic_data_local(config):
-
-    ######
-    ### setup the run
-    logger.info("Setup mlflow experiment")
-    set_mlflow_experiment(experiment_name=config.mlflow_experiment)
-    ###
-    ######
+def retrieve_raw_data(config: Config) -> pd.DataFrame:
 
     ######
     ### Historic data retrieval
@@ -35,15 +35,62 @@ def execute_modelling_historic_data_local(config):
     ###
     ######
 
+    if config.historic_data_compact_dtypes:
+        ######
+        ### Conversion into the compact dtypes of the raw data schema
+        logger.info("Optimise dtypes of raw data")
+        raw_data = get_optimised_data(raw_data, raw_data_schema)
+        ###
+        ######
+
+    return raw_data
+
+
+def execute_validated_feature_engineering(config: Config, raw_data: pd.DataFrame, feature_processes: List) -> pd.DataFrame:
+
     ######
     ### Feature engineering
     logger.info("Run feature engineering")
-    feature_processes = get_feature_processes(config)
     engineered_data, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes)
-    validate_engineered_data_per_instance(engineered_data[engineered_feature_columns])
+    validate_engineered_data_per_instance(engineered_data[engineered_feature_columns], compact_dtypes=config.historic_data_compact_dtypes)
     ###
     ######
 
+    return engineered_data
+
+
+def execute_modelling_historic_data_local(config):
+
+    ######
+    ### setup the run
+    logger.info("Setup mlflow experiment")
+    set_mlflow_experiment(experiment_name=config.mlflow_experiment)
+    ###
+    ######
+
+    if config.historic_data_chunk_size is not None:
+        ######
+        ### Historic data retrieval and feature engineering chunk by chunk, only the engineered data is loaded at once
+        logger.info(f"Retrieve historical data and run feature engineering in chunks of {config.historic_data_chunk_size} rows")
+        engineered_data_filepath = os.path.join(get_project_root(), "output/engineered_data/engineered_data.parquet")
+        execute_chunked_feature_engineering(config, engineered_data_filepath, config.historic_data_chunk_size)
+        engineered_data = pd.read_parquet(engineered_data_filepath)
+        ###
+        ######
+    else:
+        ######
+        ### Historic data retrieval and feature engineering, reused from the stage cache if source data, config and code are unchanged
+        stage_cache = get_stage_cache(config)
+        feature_processes = get_feature_processes(config)
+
+        def get_engineered_data():
+            raw_data = stage_cache.get_or_compute('raw_data', get_raw_data_fingerprint(config), lambda: retrieve_raw_data(config))
+            return execute_validated_feature_engineering(config, raw_data, feature_processes)
+
+        engineered_data = stage_cache.get_or_compute('engineered_data', get_engineered_data_fingerprint(config, feature_processes), get_engineered_data)
+        ###
+        ######
+
     ######
     ### Modelling process
     logger.info("Start modelling process")
@@ -1,7 +1,10 @@
 import logging
+import os
 
+from ml_project.chunked_processing import execute_chunked_historic_predictions, read_chunked_predictions
 from ml_project.config import Config
-from ml_project.data_validation import validate_engineered_data_per_instance, validate_raw_data_per_instance
+from ml_project.data_validation import raw_data_schema, validate_engineered_data_per_instance, validate_raw_data_per_instance
+from ml_project.dtype_optimisation import get_optimised_data
 from ml_project.evaluation import evaluate_predictions
 from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
 from ml_project.historic_data_retrieval import process_historic_data_into_raw_data, retrieve_historic_data
@@ -9,12 +12,39 @@ from ml_project.model_export import load_model_artifacts
 from ml_project.modelling_process.data_processing import get_processed_data
 from ml_project.modelling_process.modelling_process import split_features_and_target
 from ml_project.prediction_process import get_predictions
-from ml_project.utils import setup_logging
+from ml_project.utils import get_project_root, setup_logging
 from use_cases.use_case_config import config
 
 logger = logging.getLogger('standard')
 
 
+def execute_chunked_predicting_historical_data_local(config: Config, output_filepath: str):
+
+    assert config.historic_data_chunk_size is not None
+
+    ######
+    ### Loading of model artifacts
+    logger.info("Loading model artifacts")
+    model, preprocessing_objects, _ = load_model_artifacts(model_objects_filepath=config.export_filepath)
+    ###
+    ######
+
+    ######
+    ### Historic data retrieval, feature engineering and predictions chunk by chunk
+    logger.info(f"Predict historical data in chunks of {config.historic_data_chunk_size} rows")
+    execute_chunked_historic_predictions(config, model, preprocessing_objects, output_filepath, config.historic_data_chunk_size)
+    ###
+    ######
+
+    ######
+    ### Evaluate final model on holdout test data
+    logger.info("Evaluate holdout_test predictions and final model")
+    test_data_y, test_predictions, test_prediction_probas = read_chunked_predictions(config, output_filepath)
+    evaluate_predictions(config, test_data_y, test_predictions, test_prediction_probas)
+    ###
+    ######
+
+
 def execute_predicting_historical_data_local(config: Config):
 
     ######
@@ -26,14 +56,13 @@ def execute_predicting_historical_data_local(config: Config):
     ###
     ######
 
-    ######
-    ### Feature engineering
-    logger.info("Run feature engineering")
-    feature_processes = get_feature_processes(config)
-    test_data, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes)
-    validate_engineered_data_per_instance(test_data[engineered_feature_columns])
-    ###
-    ######
+    if config.historic_data_compact_dtypes:
+        ######
+        ### Conversion into the compact dtypes of the raw data schema
+        logger.info("Optimise dtypes of raw data")
+        raw_data = get_optimised_data(raw_data, raw_data_schema)
+        ###
+        ######
 
     ######
     ### Loading of model artifacts
@@ -42,6 +71,16 @@ def execute_predicting_historical_data_local(config: Config):
     ###
     ######
 
+    ######
+    ### Feature engineering
+    logger.info("Run feature engineering")
+    feature_processes = get_feature_processes(config)
+    # the model artifacts are loaded first, so that only the features the model uses are engineered
+    test_data, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes, required_features=preprocessing_objects.features)
+    validate_engineered_data_per_instance(test_data[engineered_feature_columns], compact_dtypes=config.historic_data_compact_dtypes)
+    ###
+    ######
+
     ######
     ### Evaluate final model on holdout test data
     logger.info("Evaluate holdout_test predictions and final model")
@@ -57,4 +96,8 @@ if __name__ == '__main__':
 
     setup_logging('standard')
 
-    execute_predicting_historical_data_local(config)
\ No newline at end of file
+    if config.historic_data_chunk_size is not None:
+        # for historic data that does not fit into memory, the predictions are streamed to a parquet file
+        execute_chunked_predicting_historical_data_local(config, os.path.join(get_project_root(), "output/predictions/historic_predictions.parquet"))
+    else:
+        execute_predicting_historical_data_local(config)
\ No newline at end of file
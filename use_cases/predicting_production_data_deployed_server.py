@@ -21,7 +21,8 @@ def execute_predicting_production_data_local_server(config: Config, json_string)
 
     ######
     ### Retrieve predictions
-    predictions, prediction_probas = get_server_predictions(config, data=production_data.iloc[0])
+    # the instances of a chunk are sent concurrently over pooled connections
+    predictions, prediction_probas = get_server_predictions(config, data=production_data)
     ###
     ######
 
@@ -32,4 +33,4 @@ if __name__ == '__main__':
 
     setup_logging('standard')
 
-    run_production_simulator(config, execute_predicting_production_data_local_server)
\ No newline at end of file
+    run_production_simulator(config, execute_predicting_production_data_local_server, chunk_size=100)
\ No newline at end of file
@@ -1,12 +1,13 @@
+import argparse
 import logging
+from contextlib import nullcontext
+from functools import partial
+from typing import Optional
 
 from ml_project.config import Config
-from ml_project.data_validation import validate_engineered_data_per_instance, validate_raw_data_per_instance
-from ml_project.feature_engineering.feature_engineering import execute_feature_engineering, get_feature_processes
-from ml_project.model_export import load_model_artifacts
-from ml_project.modelling_process.modelling_process import get_processed_data
-from ml_project.prediction_process import get_predictions
-from ml_project.production_data_retrieval import process_production_input_data_into_raw_data, retrieve_production_data, run_production_simulator
+from ml_project.prediction_session import PredictionSession
+from ml_project.production_data_retrieval import retrieve_production_data, run_production_simulator
+from ml_project.streaming_ingestion import OffsetCheckpoint, consume_micro_batches, get_micro_batches, get_record_source
 from ml_project.utils import setup_logging
 from use_cases.use_case_config import config
 
@@ -14,7 +15,15 @@ logger = logging.getLogger('standard')
 
 
 
-def execute_predicting_production_data_local(config: Config, json_string: str):
+def execute_predicting_production_data_local(config: Config, json_string: str, prediction_session: Optional[PredictionSession] = None):
+
+    ######
+    ### Model loading
+    if prediction_session is None:
+        # the model objects are loaded and the feature processes are built once per session, pass a session to reuse them across calls
+        prediction_session = PredictionSession(config)
+    ###
+    ######
 
     ######
     ### Production data retrieval
@@ -22,40 +31,71 @@ def execute_predicting_production_data_local(config: Config, json_string: str):
     production_data = retrieve_production_data(config,
                                                json_string=json_string,
                                                )
-    raw_data = process_production_input_data_into_raw_data(config, production_data)
-    validate_raw_data_per_instance(raw_data)
     ###
     ######
 
     ######
-    ### Feature engineering
-    logger.info("Run feature engineering")
-    feature_processes = get_feature_processes(config)
-    data_x, engineered_feature_columns = execute_feature_engineering(config, raw_data, feature_processes)
-    validate_engineered_data_per_instance(data_x[engineered_feature_columns])
+    ### Retrieve predictions
+    # validation, feature engineering and preprocessing of the production data
+    predictions, prediction_probas = prediction_session.predict_batch(production_data)
     ###
     ######
 
+    return predictions, prediction_probas
+
+
+def execute_stream_predicting_production_data_local(config: Config,
+                                                    prediction_session: PredictionSession,
+                                                    records_filepath: str,
+                                                    output_filepath: str,
+                                                    batch_size: int = 100,
+                                                    max_wait_time: Optional[float] = None,
+                                                    checkpoint_filepath: Optional[str] = None,
+                                                    errors_filepath: Optional[str] = None,
+                                                    ):
+
     ######
-    ### Model loading
-    logger.info("Loading model objects")
-    model, preprocessing_objects, _ = load_model_artifacts(model_objects_filepath=config.export_filepath)
+    ### Stream ingestion
+    # records are read from a json lines file or stdin ('-') into size- or time-bounded micro-batches,
+    # with a checkpoint a restarted run resumes after the last scored micro-batch and appends to the predictions
+    checkpoint = OffsetCheckpoint(checkpoint_filepath) if checkpoint_filepath is not None else None
+    start_offset = checkpoint.load() if checkpoint is not None else 0
+    micro_batches = get_micro_batches(get_record_source(records_filepath, start_offset), max_batch_size=batch_size, max_wait_time=max_wait_time)
     ###
     ######
 
     ######
-    ### Retrieve predictions
-    logger.info("Evaluate holdout_test predictions")
-    data_x_prepared, _, _ = get_processed_data(config, preprocessing_objects, data_x)
-    predictions, prediction_probas = get_predictions(config, model, data_x_prepared)
+    ### Stream processing
+    # validation, feature engineering and predictions per micro-batch, predictions are written as json lines,
+    # invalid records are written with their error to the errors file and skipped
+    file_mode = "a" if start_offset != 0 else "w"
+    with open(output_filepath, file_mode) as output_file, (open(errors_filepath, file_mode) if errors_filepath is not None else nullcontext()) as error_file:
+        stream_summary = consume_micro_batches(micro_batches, prediction_session.predict_records, output_file, checkpoint,
+                                               error_file=error_file, validate_records=prediction_session.validate_records)
     ###
     ######
 
-    return predictions, prediction_probas
+    return stream_summary
 
 
 if __name__ == '__main__':
 
     setup_logging('standard')
 
-    run_production_simulator(config, execute_predicting_production_data_local)
+    parser = argparse.ArgumentParser(description="Local predictions of production data")
+    parser.add_argument('--records-filepath', default=None, help="json lines file ('-' for stdin) of records to score in stream mode, simulated production data if not provided")
+    parser.add_argument('--output-filepath', default="predictions.jsonl", help="json lines file of the predictions in stream mode")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--max-wait-time', type=float, default=None, help="seconds after which a micro-batch is scored even if it is not full")
+    parser.add_argument('--errors-filepath', default="prediction_errors.jsonl", help="json lines file of the invalid records and their errors in stream mode")
+    parser.add_argument('--checkpoint-filepath', default=None, help="file of the consumed offset, to resume an interrupted stream")
+    arguments = parser.parse_args()
+
+    prediction_session = PredictionSession(config)
+
+    if arguments.records_filepath is not None:
+        execute_stream_predicting_production_data_local(config, prediction_session, arguments.records_filepath, arguments.output_filepath,
+                                                        batch_size=arguments.batch_size, max_wait_time=arguments.max_wait_time, checkpoint_filepath=arguments.checkpoint_filepath,
+                                                        errors_filepath=arguments.errors_filepath)
+    else:
+        run_production_simulator(config, partial(execute_predicting_production_data_local, prediction_session=prediction_session))
@@ -16,7 +16,8 @@ def execute_predicting_production_data_local_server(config: Config, json_string)
                                                json_string=json_string,
                                                )
 
-    predictions, prediction_probas = get_server_predictions(config, data=production_data.iloc[0])
+    # the instances of a chunk are sent concurrently over pooled connections
+    predictions, prediction_probas = get_server_predictions(config, data=production_data)
 
     return predictions, prediction_probas
 
@@ -27,4 +28,4 @@ if __name__ == '__main__':
 
     config.prediction_service_url = "http://127.0.0.1:8000/predict"
 
-    run_production_simulator(config, execute_predicting_production_data_local_server)
\ No newline at end of file
+    run_production_simulator(config, execute_predicting_production_data_local_server, chunk_size=100)
\ No newline at end of file
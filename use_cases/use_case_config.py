@@ -10,6 +10,7 @@ config = Config(historic_or_production_data='historic',
                 cont_cols=['age', 'siblings_spouses_aboard', 'parents_children_aboard', 'fare'],
                 cat_cols=['sex', 'pclass'],
                 data_filepath=os.path.join(get_project_root(), "data/data/titanic.parquet"),
+                stage_cache_folderpath=os.path.join(get_project_root(), "data/stage_cache"),
                 export_model_artifacts=True,
                 n_hyperparameter_optimisation_runs=1,
                 mlflow_experiment='exp1',